@@ -0,0 +1,255 @@
+"""
+Loads the epics of a team planning problem from Azure DevOps.
+
+Team members and the work day range stay in the problem JSON, which gets an
+"azureDevOps" section instead of (or on top of) "epics":
+
+    "azureDevOps": {
+        "organizationUrl": "https://dev.azure.com/my-organization",
+        "project": "MyProject",
+        "workItemType": "Epic",
+        "filter": "[System.State] NOT IN ('Closed', 'Removed')",   # extra WIQL condition
+        "fields": {
+            "product": "System.AreaPath",                          # last path segment is the product
+            "priority": "Microsoft.VSTS.Common.Priority",
+            "startDate": "Microsoft.VSTS.Scheduling.StartDate",
+            "deadLine": "Microsoft.VSTS.Scheduling.TargetDate"
+        },
+        "workloadFields": {                                        # profile: days of work field
+            "Dev": "Custom.DevWorkload",
+            "QA": "Custom.QAWorkload"
+        },
+        "cacheFile": "my-problem.azure-devops-cache.json",
+        "recording": "recorded-work-items.json",                   # optional, no server calls
+        "pageSize": 5000,
+        "batchSize": 200,
+        "concurrency": 8
+    }
+
+Work item ids come from WIQL queries paged on the id, the work items from
+get_work_items_batch calls of up to 200 ids run concurrently. Work items are
+kept in the cache file with their revision: on the next load only new items
+and items changed since the last sync are fetched again.
+"""
+import json
+import math
+import os
+import re
+import types
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+
+CACHE_VERSION = 1
+DEFAULT_FIELDS = {
+    'product': 'System.AreaPath',
+    'priority': 'Microsoft.VSTS.Common.Priority',
+    'startDate': 'Microsoft.VSTS.Scheduling.StartDate',
+    'deadLine': 'Microsoft.VSTS.Scheduling.TargetDate'
+}
+# Changes saved while a sync runs are caught by the next one
+SYNC_MARGIN = timedelta(minutes=5)
+
+
+def work_item_tracking_client(organization_url, personal_access_token):
+    # Imported here, recordings are loaded without the Azure DevOps SDK
+    from azure.devops.connection import Connection
+    from msrest.authentication import BasicAuthentication
+    credentials = BasicAuthentication('', personal_access_token)
+    connection = Connection(base_url=organization_url, creds=credentials)
+    return connection.clients.get_work_item_tracking_client()
+
+
+def sdk_request_models():
+    from azure.devops.released.work_item_tracking import TeamContext, Wiql, WorkItemBatchGetRequest
+    return types.SimpleNamespace(TeamContext=TeamContext, Wiql=Wiql, WorkItemBatchGetRequest=WorkItemBatchGetRequest)
+
+
+class RecordedWorkItemClient:
+    """
+    Stand-in for the work item tracking client serving work items recorded in a
+    JSON file as [{"id": 1, "rev": 3, "fields": {...}}, ...]. Only the id paging
+    and changed date conditions of the loader's WIQL queries are applied.
+    """
+
+    # The requests are only read, plain namespaces stand for the SDK models
+    request_models = types.SimpleNamespace(TeamContext=types.SimpleNamespace, Wiql=types.SimpleNamespace,
+                                           WorkItemBatchGetRequest=types.SimpleNamespace)
+    ID_CONDITION = re.compile(r'\[System\.Id\] > (\d+)')
+    CHANGED_CONDITION = re.compile(r"\[System\.ChangedDate\] >= '([^']+)'")
+
+    def __init__(self, work_items):
+        self.work_items = {work_item['id']: work_item for work_item in work_items}
+        self.queries = 0
+        self.batches = 0
+
+    @staticmethod
+    def from_file(file_path):
+        with open(file_path, 'r') as file:
+            return RecordedWorkItemClient(json.loads(file.read()))
+
+    def query_by_wiql(self, wiql, team_context=None, time_precision=None, top=None):
+        self.queries = self.queries + 1
+        last_id = self.ID_CONDITION.search(wiql.query)
+        changed_since = self.CHANGED_CONDITION.search(wiql.query)
+        ids = sorted(work_item_id for work_item_id, work_item in self.work_items.items()
+                     if (last_id is None or work_item_id > int(last_id.group(1)))
+                     and (changed_since is None or work_item['fields'].get('System.ChangedDate', '') >= changed_since.group(1)))
+        if top is not None:
+            ids = ids[:top]
+        return types.SimpleNamespace(work_items=[types.SimpleNamespace(id=work_item_id) for work_item_id in ids])
+
+    def get_work_items_batch(self, work_item_get_request, project=None):
+        self.batches = self.batches + 1
+        return [types.SimpleNamespace(
+                    id=work_item_id,
+                    rev=self.work_items[work_item_id]['rev'],
+                    fields={field: value for field, value in self.work_items[work_item_id]['fields'].items()
+                            if field in work_item_get_request.fields})
+                for work_item_id in work_item_get_request.ids if work_item_id in self.work_items]
+
+
+class WorkItemLoader:
+
+    def __init__(self, client, settings, cache_path=None):
+        self.client = client
+        self.models = getattr(client, 'request_models', None) or sdk_request_models()
+        self.settings = settings
+        self.cache_path = cache_path
+        self.project = settings['project']
+        self.page_size = settings.get('pageSize', 5000)
+        self.batch_size = min(settings.get('batchSize', 200), 200)
+        self.concurrency = settings.get('concurrency', 8)
+        fields = dict(DEFAULT_FIELDS, **settings.get('fields', {}))
+        self.fields = sorted(set(['System.Id', 'System.Title', 'System.ChangedDate']
+                                 + list(fields.values()) + list(settings.get('workloadFields', {}).values())))
+
+    def query_ids(self, condition=None):
+        """Ids of the matching work items, one WIQL query per page of ids"""
+        conditions = [
+            '[System.TeamProject] = @project',
+            f"[System.WorkItemType] = '{self.settings.get('workItemType', 'Epic')}'"
+        ]
+        if 'filter' in self.settings:
+            conditions.append(f"({self.settings['filter']})")
+        if condition is not None:
+            conditions.append(condition)
+
+        ids = []
+        while True:
+            paging = f"[System.Id] > {ids[-1] if len(ids) > 0 else 0}"
+            query = f"SELECT [System.Id] FROM WorkItems WHERE {' AND '.join(conditions + [paging])} ORDER BY [System.Id]"
+            result = self.client.query_by_wiql(self.models.Wiql(query=query),
+                                               team_context=self.models.TeamContext(project=self.project),
+                                               time_precision=True, top=self.page_size)
+            page = [reference.id for reference in result.work_items or []]
+            ids.extend(page)
+            if len(page) < self.page_size:
+                return ids
+
+    def fetch_batch(self, ids):
+        request = self.models.WorkItemBatchGetRequest(ids=ids, fields=self.fields, error_policy='omit')
+        # Omitted (deleted or forbidden) work items come back as None
+        return [{'id': work_item.id, 'rev': work_item.rev, 'fields': work_item.fields}
+                for work_item in self.client.get_work_items_batch(request, project=self.project)
+                if work_item is not None]
+
+    def fetch(self, ids):
+        batches = [ids[index:index + self.batch_size] for index in range(0, len(ids), self.batch_size)]
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            return [work_item for batch in executor.map(self.fetch_batch, batches) for work_item in batch]
+
+    def read_cache(self):
+        if self.cache_path is None or not os.path.exists(self.cache_path):
+            return None
+        with open(self.cache_path, 'r') as file:
+            cache = json.loads(file.read())
+        if cache.get('version') != CACHE_VERSION or cache.get('project') != self.project \
+                or cache.get('fields') != self.fields:
+            return None
+        return cache
+
+    def write_cache(self, cache):
+        if self.cache_path is None:
+            return
+        temporary_path = f"{self.cache_path}.tmp"
+        with open(temporary_path, 'w') as file:
+            file.write(json.dumps(cache))
+        os.replace(temporary_path, self.cache_path)
+
+    def load(self):
+        """Work items as {"id", "rev", "fields"}, by id"""
+        sync_time = datetime.now(timezone.utc) - SYNC_MARGIN
+        cache = self.read_cache()
+        ids = self.query_ids()
+
+        cached_items = {}
+        to_fetch = ids
+        if cache is not None:
+            cached_items = {int(work_item_id): work_item for work_item_id, work_item in cache['items'].items()}
+            changed = set(self.query_ids(f"[System.ChangedDate] >= '{cache['syncedAt']}'"))
+            to_fetch = [work_item_id for work_item_id in ids if work_item_id not in cached_items or work_item_id in changed]
+
+        for work_item in self.fetch(to_fetch):
+            cached = cached_items.get(work_item['id'])
+            if cached is None or work_item['rev'] >= cached['rev']:
+                cached_items[work_item['id']] = work_item
+
+        # Work items no longer matching the query are dropped
+        work_items = [cached_items[work_item_id] for work_item_id in ids if work_item_id in cached_items]
+        self.write_cache({
+            'version': CACHE_VERSION,
+            'project': self.project,
+            'fields': self.fields,
+            'syncedAt': sync_time.strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'items': {str(work_item['id']): work_item for work_item in work_items}
+        })
+        return work_items
+
+
+def epics_from_work_items(work_items, settings):
+    fields = dict(DEFAULT_FIELDS, **settings.get('fields', {}))
+    epic_defs = []
+    names = set()
+    for work_item in work_items:
+        values = work_item['fields']
+        workloads = {}
+        for profile, field in settings.get('workloadFields', {}).items():
+            if values.get(field) is not None and float(values[field]) > 0:
+                workloads[profile] = int(math.ceil(float(values[field])))
+        # Nothing to plan
+        if len(workloads) == 0:
+            continue
+
+        name = values.get('System.Title', str(work_item['id']))
+        if name in names:
+            name = f"{name} #{work_item['id']}"
+        names.add(name)
+        product = values.get(fields['product'])
+        if fields['product'] == 'System.AreaPath' and product is not None:
+            product = product.split('\\')[-1]
+
+        epic_def = {
+            'name': name,
+            'product': product,
+            'priority': int(values.get(fields['priority']) or 10),
+            'workloads': workloads
+        }
+        if values.get(fields['startDate']) is not None:
+            epic_def['startDate'] = str(values[fields['startDate']])[:10]
+        if values.get(fields['deadLine']) is not None:
+            epic_def['deadLine'] = str(values[fields['deadLine']])[:10]
+        epic_defs.append(epic_def)
+    return epic_defs
+
+
+def load_epics(settings, personal_access_token=None, default_cache_path=None, client=None):
+    if client is None and 'recording' in settings:
+        client = RecordedWorkItemClient.from_file(settings['recording'])
+    if client is None:
+        personal_access_token = personal_access_token or os.environ.get('AZURE_DEVOPS_PAT')
+        if personal_access_token is None:
+            raise ValueError('An Azure DevOps personal access token is needed, as argument or AZURE_DEVOPS_PAT')
+        client = work_item_tracking_client(settings['organizationUrl'], personal_access_token)
+    loader = WorkItemLoader(client, settings, settings.get('cacheFile', default_cache_path))
+    return epics_from_work_items(loader.load(), settings)
@@ -0,0 +1,112 @@
+"""
+Columnar export of a team planning solution, one entry per planning item:
+
+    itemId      item id
+    epic        index in epics
+    product     index in products
+    profile     index in profiles
+    workDay     work day ordinal (date.toordinal), -1 when unassigned
+    teamMember  team member id, index in teamMembers, -1 when unassigned
+
+.npz files hold these int32 arrays plus the epics, products, profiles and
+teamMembers name arrays. .parquet files hold the int32 columns, the name lists
+are stored as JSON in the "dictionaries" schema metadata.
+
+numpy is needed for both formats, pyarrow for Parquet.
+"""
+import json
+from datetime import date
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+COLUMNS = ['itemId', 'epic', 'product', 'profile', 'workDay', 'teamMember']
+DICTIONARIES = {'epic': 'epics', 'product': 'products', 'profile': 'profiles', 'teamMember': 'teamMembers'}
+
+
+def require(module, name):
+    if module is None:
+        raise ImportError(f"{name} is required for columnar exports, install it with: pip install {name}")
+    return module
+
+
+def codes(values):
+    # Dictionary encoding in order of first appearance
+    dictionary = {}
+    return [dictionary.setdefault(value, len(dictionary)) for value in values], list(dictionary.keys())
+
+
+def solution_columns(solution):
+    require(numpy, 'numpy')
+    items = sorted(solution.planning_items, key=lambda item: item.id)
+    columns = {
+        'itemId': [item.id for item in items],
+        'workDay': [-1 if item.work_day is None else item.work_day.ordinal for item in items],
+        'teamMember': [-1 if item.team_member is None else item.team_member.id for item in items],
+        'teamMembers': [team_member.name for team_member in sorted(solution.team_members, key=lambda m: m.id)]
+    }
+    for attribute, dictionary_name in [('epic', 'epics'), ('product', 'products'), ('profile', 'profiles')]:
+        columns[attribute], columns[dictionary_name] = codes(getattr(item, attribute) for item in items)
+
+    for column in COLUMNS:
+        columns[column] = numpy.asarray(columns[column], dtype=numpy.int32)
+    for dictionary_name in DICTIONARIES.values():
+        columns[dictionary_name] = numpy.asarray(columns[dictionary_name], dtype=str)
+    return columns
+
+
+def write_npz(file, columns):
+    # Not compressed, loading is a plain read of every array
+    require(numpy, 'numpy').savez(file, **columns)
+
+
+def write_parquet(file, columns):
+    require(pyarrow, 'pyarrow')
+    dictionaries = {name: columns[name].tolist() for name in DICTIONARIES.values()}
+    table = pyarrow.table({column: columns[column] for column in COLUMNS})
+    table = table.replace_schema_metadata({'dictionaries': json.dumps(dictionaries)})
+    pyarrow.parquet.write_table(table, file)
+
+
+def load_columns(file_path):
+    """Columns as written by write_npz or write_parquet, as numpy arrays"""
+    require(numpy, 'numpy')
+    if file_path.endswith('.npz'):
+        with numpy.load(file_path) as content:
+            return {name: content[name] for name in content.files}
+
+    require(pyarrow, 'pyarrow')
+    table = pyarrow.parquet.read_table(file_path)
+    columns = {column: table.column(column).to_numpy() for column in COLUMNS}
+    dictionaries = json.loads(table.schema.metadata[b'dictionaries'])
+    for name, values in dictionaries.items():
+        columns[name] = numpy.asarray(values, dtype=str)
+    return columns
+
+
+def decode(columns, column):
+    """Names of a dictionary encoded column, None where unassigned"""
+    names = columns[DICTIONARIES[column]]
+    return [None if code < 0 else str(names[code]) for code in columns[column].tolist()]
+
+
+def columns_to_assignments(columns):
+    # Same rows as outputs.read_assignments reads from a csv or json output
+    epics, products, profiles, team_members = (decode(columns, column)
+                                               for column in ['epic', 'product', 'profile', 'teamMember'])
+    return [{
+        'date': date.fromordinal(work_day).isoformat(),
+        'product': products[index],
+        'epicName': epics[index],
+        'profile': profiles[index],
+        'teamMember': team_members[index]
+    } for index, work_day in enumerate(columns['workDay'].tolist()) if work_day >= 0 and team_members[index] is not None]
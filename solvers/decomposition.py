@@ -0,0 +1,198 @@
+"""
+Splits a team planning problem into independent sub-problems.
+
+Members and workloads (product, profile) form a bipartite eligibility graph.
+Every constraint is about a single item or a single member, so members and
+workloads of different connected components never interact: each component is
+solved on its own, in parallel worker processes when asked, and the
+assignments are merged back into one TeamPlanning whose score is the sum of the
+component scores.
+"""
+import argparse
+import contextlib
+import multiprocessing
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+
+def add_decomposition_arguments(parser):
+    parser.add_argument('--decompose', action='store_true',
+                        help='solve the independent member/workload groups separately')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='with --decompose, groups solved at once in their own process')
+
+
+def find(parents, node):
+    while parents[node] != node:
+        parents[node] = parents[parents[node]]
+        node = parents[node]
+    return node
+
+
+def eligibility_components(problem):
+    """Components as {"members": [TeamMember], "workloads": [(product, profile)], "items": [PlanningItem]}"""
+    eligibility = problem.eligibility
+    member_count = len(problem.team_members)
+    items_by_workload = {}
+    for item in problem.planning_items:
+        items_by_workload.setdefault(item.workload_id, []).append(item)
+
+    # Union-find over members (0..m-1) and workload ids (m..)
+    parents = {}
+    for team_member in problem.team_members:
+        parents[team_member.id] = team_member.id
+    for workload_id in items_by_workload:
+        parents[member_count + workload_id] = member_count + workload_id
+    for workload_id in items_by_workload:
+        for team_member in problem.team_members:
+            if eligibility.is_eligible(team_member.id, workload_id):
+                parents[find(parents, team_member.id)] = find(parents, member_count + workload_id)
+
+    components = {}
+    for workload_id, items in items_by_workload.items():
+        component = components.setdefault(find(parents, member_count + workload_id),
+                                          {'members': [], 'workloads': [], 'items': []})
+        component['workloads'].append((items[0].product, items[0].profile))
+        component['items'].extend(items)
+    for team_member in problem.team_members:
+        root = find(parents, team_member.id)
+        # Members eligible for nothing have nothing to do
+        if root in components:
+            components[root]['members'].append(team_member)
+
+    # Largest first, so that parallel runs start with the longest solves
+    return sorted(components.values(), key=lambda component: -len(component['items']))
+
+
+def component_report(components):
+    report = []
+    for index, component in enumerate(components):
+        demand = len(component['items'])
+        # Both in items, a day of work may be split into several
+        capacity = sum(team_member.capacity[work_day.id] for team_member in component['members']
+                       for work_day in team_member.available_days)
+        report.append({
+            'component': index,
+            'members': [team_member.name for team_member in component['members']],
+            'workloads': [f"{product}/{profile}" for product, profile in sorted(component['workloads'])],
+            'demand': demand,
+            'capacity': capacity,
+            'load': demand / capacity if capacity > 0 else None
+        })
+    return report
+
+
+def print_component_report(report, file=sys.stderr):
+    print('component;members;workloads;demand;capacity;load', file=file)
+    for component in report:
+        load = 'N/A' if component['load'] is None else f"{component['load']:.0%}"
+        print(f"{component['component']};{len(component['members'])};{', '.join(component['workloads'])};"
+              f"{component['demand']};{component['capacity']};{load}", file=file)
+
+
+def component_content(problem_content, component):
+    # Same problem with only the component's members and workloads
+    member_names = set(team_member.name for team_member in component['members'])
+    workloads = set(component['workloads'])
+    epics = []
+    for epic_def in problem_content['epics']:
+        epic_workloads = {profile: workload for profile, workload in epic_def['workloads'].items()
+                          if (epic_def['product'], profile) in workloads}
+        if len(epic_workloads) > 0:
+            epics.append(dict(epic_def, workloads=epic_workloads))
+    return dict(problem_content,
+                teamMembers=[member for member in problem_content['teamMembers'] if member['name'] in member_names],
+                epics=epics)
+
+
+def solve_content(problem_class, problem_content, arguments):
+    problem = problem_class()
+    problem.arguments = arguments
+    problem.load_from_content(problem_content)
+    with contextlib.redirect_stdout(sys.stderr):
+        solution = problem.solve()
+    return {
+        'assignments': solution.to_json()['assignments'],
+        'hard': solution.score.getHardScore() if solution.score is not None else 0,
+        'soft': solution.score.getSoftScore() if solution.score is not None else 0,
+        'termination': problem.termination_report.reasons(solution.score),
+        'seconds': problem.timings.get('solve', 0)
+    }
+
+
+def solve_component(problem_content, arguments):
+    # Worker process entry point, imported here so that only workers start a JVM
+    from team_planning_solver import PlanningProblem
+    return solve_content(PlanningProblem, problem_content, arguments)
+
+
+class DecompositionReport:
+    """Stands for the TerminationReport of a decomposed solve"""
+
+    def __init__(self, results, elapsed):
+        self.results = results
+        self.elapsed_seconds = elapsed
+
+    def elapsed(self):
+        return self.elapsed_seconds
+
+    def reasons(self, score):
+        return [f"component {index}: {', '.join(result['termination'])}" for index, result in enumerate(self.results)]
+
+    def summary(self, score):
+        return f"Terminated after {self.elapsed():.1f}s, {len(self.results)} components: {'; '.join(self.reasons(score))}"
+
+
+def merge(problem, results):
+    # The n-th assignment of an epic/profile goes to its n-th item
+    work_days_by_date = {work_day.date.isoformat(): work_day for work_day in problem.work_days}
+    team_members_by_name = {team_member.name: team_member for team_member in problem.team_members}
+    items_by_workload = {}
+    for item in problem.planning_items:
+        items_by_workload.setdefault((item.epic, item.profile), deque()).append(item)
+    for result in results:
+        for assignment in result['assignments']:
+            item = items_by_workload[(assignment['epicName'], assignment['profile'])].popleft()
+            item.set_work_day(work_days_by_date[assignment['date']])
+            item.set_team_member(team_members_by_name[assignment['teamMember']])
+
+
+def solve_decomposed(problem, score_of):
+    """Solves problem component by component, score_of(hard, soft) builds the merged score"""
+    components = eligibility_components(problem)
+    report = component_report(components)
+    print(f"{len(components)} independent components", file=sys.stderr)
+    print_component_report(report)
+
+    # Only with --skip-capacity-checks: their items could not be given to anyone
+    memberless = [component for component in report if len(component['members']) == 0]
+    if len(memberless) > 0:
+        raise ValueError('No team member is eligible for the workloads of '
+                         + ', '.join(f"component {component['component']} ({', '.join(component['workloads'])})"
+                                     for component in memberless)
+                         + ', solve without --decompose')
+
+    # Sub-problems are solved plainly, outputs and progress belong to the merged solve
+    arguments = argparse.Namespace(**dict(vars(problem.arguments), decompose=False, progress=None, snapshot_dir=None))
+    contents = [component_content(problem.problem_content, component) for component in components]
+
+    start = time.perf_counter()
+    workers = min(problem.arguments.workers, len(contents))
+    if workers <= 1:
+        results = [solve_content(type(problem), content, arguments) for content in contents]
+    else:
+        # Forking a process that may hold a JVM is unsafe, workers start fresh
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+            results = list(executor.map(solve_component, contents, [arguments] * len(contents)))
+    elapsed = time.perf_counter() - start
+
+    for item in problem.planning_items:
+        item.set_work_day(None)
+        item.set_team_member(None)
+    merge(problem, results)
+    problem.termination_report = DecompositionReport(results, elapsed)
+    problem.timings['solve'] = elapsed
+    problem.components = report
+    return score_of(sum(result['hard'] for result in results), sum(result['soft'] for result in results))
@@ -0,0 +1,67 @@
+"""
+Compares the original pairwise focus constraint with the grouped one on
+scaled-up copies of a team planning problem.
+
+Usage: python focus_benchmark.py <problem.json> [seconds] [scale ...]
+"""
+import copy
+import json
+import sys
+import time
+from optapy import solver_factory_create
+import optapy.config
+from optapy.types import Duration
+
+from team_planning_solver import PlanningProblem, planning_constraints, pairwise_focus_planning_constraints
+
+
+def scale_problem_content(problem_content, scale):
+    # Same work day range, `scale` copies of every team member and epic so the
+    # demand / capacity ratio stays the same
+    scaled_content = copy.deepcopy(problem_content)
+    scaled_content['title'] = f"{problem_content['title']} x{scale}"
+    scaled_content['teamMembers'] = []
+    scaled_content['epics'] = []
+    for copy_index in range(scale):
+        for team_member_def in problem_content['teamMembers']:
+            scaled_content['teamMembers'].append(dict(team_member_def, name=f"{team_member_def['name']}#{copy_index}"))
+        for epic_def in problem_content['epics']:
+            scaled_content['epics'].append(dict(epic_def, name=f"{epic_def['name']}#{copy_index}"))
+    return scaled_content
+
+
+def run(problem_content, constraint_provider, seconds):
+    problem = PlanningProblem()
+    problem.load_from_content(problem_content)
+
+    solver_config = problem.solver_config() \
+        .withScoreDirectorFactory(optapy.config.score.director.ScoreDirectorFactoryConfig()
+                                  .withConstraintProviderClass(constraint_provider)) \
+        .withTerminationSpentLimit(Duration.ofSeconds(seconds))
+
+    solver = solver_factory_create(solver_config).buildSolver()
+    start = time.perf_counter()
+    solution = solver.solve(problem.create_problem())
+    elapsed = time.perf_counter() - start
+    return {
+        'items': len(problem.planning_items),
+        'score': solution.score.toString(),
+        'scoreCalculationCount': solver.getSolverScope().getScoreCalculationCount(),
+        'seconds': elapsed
+    }
+
+
+if __name__ == '__main__':
+    with open(sys.argv[1], 'r') as file:
+        problem_content = json.loads(file.read())
+    seconds = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    scales = [int(scale) for scale in sys.argv[3:]] or [1, 2, 4, 8]
+
+    formulations = [('pairwise', pairwise_focus_planning_constraints), ('grouped', planning_constraints)]
+    print('scale;items;focus;score;scoreCalculations;scoreCalculationsPerSecond')
+    for scale in scales:
+        scaled_content = scale_problem_content(problem_content, scale)
+        for name, constraint_provider in formulations:
+            result = run(scaled_content, constraint_provider, seconds)
+            print(f"{scale};{result['items']};{name};{result['score']};{result['scoreCalculationCount']};"
+                  f"{int(result['scoreCalculationCount'] / result['seconds'])}")
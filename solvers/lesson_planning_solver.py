@@ -1,4 +1,35 @@
+"""
+Lesson planning (school timetabling) problem solver.
+
+Timetable format, see lesson-planning-problems/:
+
+    {
+        "title": "My school",
+        "timeslots": [{"dayOfWeek": "MONDAY", "startTime": "08:30", "endTime": "09:30"}],
+        "rooms": [{"name": "Room A"}],
+        "lessons": [{"subject": "Math", "teacher": "A. Turing", "studentGroup": "9th grade"}],
+        "solver": {...}     # optional, see termination.py and phases.py
+    }
+
+Usage:
+    python lesson_planning_solver.py <timetable.json> [--output-dir DIR] [solver options ...]
+    python lesson_planning_solver.py <directory> [--output-dir DIR] [solver options ...]
+        solves every timetable of the directory in the same process, the JVM
+        and the solver factories are built once
+
+Solving stops as soon as no lesson conflicts anymore, or at the termination
+limits. Solutions are written to <output dir>/<name>.solution.json, a single
+timetable is printed as JSON without --output-dir. Directories default to
+<directory>/solutions.
+"""
 from datetime import time
+import argparse
+import contextlib
+import json
+import os
+import signal
+import sys
+import time as timer
 from optapy import problem_fact, \
                     planning_id, \
                     planning_entity, \
@@ -13,9 +44,23 @@ from optapy import problem_fact, \
                     solver_factory_create
 from optapy.constraint import Joiners, ConstraintFactory
 from optapy.score import HardSoftScore
-from optapy.types import Duration
 import optapy.config
 
+from termination import add_termination_arguments, termination_settings, apply_termination, TerminationReport
+from phases import add_phase_arguments, solver_settings_with_preset, phase_settings, apply_phases
+from problem_schema import ProblemError
+
+
+DAYS_OF_WEEK = ['MONDAY', 'TUESDAY', 'WEDNESDAY', 'THURSDAY', 'FRIDAY', 'SATURDAY', 'SUNDAY']
+KEYS = {
+    '': {'title', 'timeslots', 'rooms', 'lessons', 'solver'},
+    'timeslots': {'dayOfWeek', 'startTime', 'endTime'},
+    'rooms': {'name'},
+    'lessons': {'subject', 'teacher', 'studentGroup'}
+}
+# No soft constraint: a timetable without conflicts cannot be improved
+DEFAULT_BEST_SCORE_LIMIT = '0hard/*soft'
+
 
 @problem_fact
 class Room:
@@ -51,16 +96,46 @@ class Timeslot:
                 f"end_time={self.end_time})")
 
 
+class TimetableNames:
+    """
+    Lookup tables of the subjects, teachers and student groups of a timetable:
+    lessons only keep their small int ids, names are read back from here for
+    the outputs. Lesson cannot have __slots__, the JPype proxy optapy wraps it
+    in conflicts with their instance layout.
+    """
+    __slots__ = ('subjects', 'teachers', 'student_groups')
+
+    def __init__(self, subjects, teachers, student_groups):
+        self.subjects = subjects
+        self.teachers = teachers
+        self.student_groups = student_groups
+
+
 @planning_entity
 class Lesson:
-    def __init__(self, id, subject, teacher, student_group, timeslot=None, room=None):
+    # The conflict joins compare the interned ids, names are looked up in
+    # the timetable's TimetableNames shared by all its lessons
+    def __init__(self, id, subject_id, teacher_id, student_group_id, names, timeslot=None, room=None):
         self.id = id
-        self.subject = subject
-        self.teacher = teacher
-        self.student_group = student_group
+        self.subject_id = subject_id
+        self.teacher_id = teacher_id
+        self.student_group_id = student_group_id
+        self.names = names
         self.timeslot = timeslot
         self.room = room
 
+    @property
+    def subject(self):
+        return self.names.subjects[self.subject_id]
+
+    @property
+    def teacher(self):
+        return self.names.teachers[self.teacher_id]
+
+    @property
+    def student_group(self):
+        return self.names.student_groups[self.student_group_id]
+
     @planning_id
     def get_id(self):
         return self.id
@@ -96,20 +171,23 @@ class Lesson:
 def define_constraints(constraint_factory: ConstraintFactory):
     return [
         # Hard constraints
-        # room_conflict(constraint_factory),
-        # teacher_conflict(constraint_factory),
-        # student_group_conflict(constraint_factory),
+        room_conflict(constraint_factory),
+        teacher_conflict(constraint_factory),
+        student_group_conflict(constraint_factory),
         # Soft constraints are only implemented in the optapy-quickstarts code
     ]
 
+# for_each only matches lessons with a timeslot and a room, joins compare the
+# int ids of timeslots, rooms, teachers and groups
+
 def room_conflict(constraint_factory: ConstraintFactory):
     # A room can accommodate at most one lesson at the same time.
     return constraint_factory.for_each(Lesson) \
             .join(Lesson,
                   # ... in the same timeslot ...
-                  Joiners.equal(lambda lesson: lesson.timeslot),
+                  Joiners.equal(lambda lesson: lesson.timeslot.id),
                   # ... in the same room ...
-                  Joiners.equal(lambda lesson: lesson.room),
+                  Joiners.equal(lambda lesson: lesson.room.id),
                   # ... and the pair is unique (different id, no reverse pairs) ...
                   Joiners.less_than(lambda lesson: lesson.id)
              ) \
@@ -119,8 +197,8 @@ def teacher_conflict(constraint_factory: ConstraintFactory):
     # A teacher can teach at most one lesson at the same time.
     return constraint_factory.for_each(Lesson) \
                 .join(Lesson,
-                      Joiners.equal(lambda lesson: lesson.timeslot),
-                      Joiners.equal(lambda lesson: lesson.teacher),
+                      Joiners.equal(lambda lesson: lesson.timeslot.id),
+                      Joiners.equal(lambda lesson: lesson.teacher_id),
                       Joiners.less_than(lambda lesson: lesson.id)
                 ) \
                 .penalize("Teacher conflict", HardSoftScore.ONE_HARD)
@@ -129,8 +207,8 @@ def student_group_conflict(constraint_factory: ConstraintFactory):
     # A student can attend at most one lesson at the same time.
     return constraint_factory.for_each(Lesson) \
             .join(Lesson,
-                  Joiners.equal(lambda lesson: lesson.timeslot),
-                  Joiners.equal(lambda lesson: lesson.student_group),
+                  Joiners.equal(lambda lesson: lesson.timeslot.id),
+                  Joiners.equal(lambda lesson: lesson.student_group_id),
                   Joiners.less_than(lambda lesson: lesson.id)
             ) \
             .penalize("Student group conflict", HardSoftScore.ONE_HARD)
@@ -142,7 +220,7 @@ def format_list(a_list):
 
 @planning_solution
 class TimeTable:
-  
+
     def __init__(self, timeslot_list, room_list, lesson_list, score=None):
         self.timeslot_list = timeslot_list
         self.room_list = room_list
@@ -170,6 +248,21 @@ class TimeTable:
     def set_score(self, score):
         self.score = score
 
+    def to_json(self, title=None):
+        return {
+            'title': title,
+            'score': self.score.toString() if self.score is not None else None,
+            'lessons': [{
+                'subject': lesson.subject,
+                'teacher': lesson.teacher,
+                'studentGroup': lesson.student_group,
+                'dayOfWeek': lesson.timeslot.day_of_week if lesson.timeslot is not None else None,
+                'startTime': lesson.timeslot.start_time.strftime('%H:%M') if lesson.timeslot is not None else None,
+                'endTime': lesson.timeslot.end_time.strftime('%H:%M') if lesson.timeslot is not None else None,
+                'room': lesson.room.name if lesson.room is not None else None
+            } for lesson in self.lesson_list]
+        }
+
     def __str__(self):
         return (
             f"TimeTable("
@@ -179,63 +272,203 @@ class TimeTable:
             f"score={str(self.score.toString()) if self.score is not None else 'None'}"
             f")"
         )
-    
-
-def generate_problem():
-    timeslot_list = [
-        Timeslot(1, "MONDAY", time(hour=8, minute=30), time(hour=9, minute=30)),
-        Timeslot(2, "MONDAY", time(hour=9, minute=30), time(hour=10, minute=30)),
-        Timeslot(3, "MONDAY", time(hour=10, minute=30), time(hour=11, minute=30)),
-        Timeslot(4, "MONDAY", time(hour=13, minute=30), time(hour=14, minute=30)),
-        Timeslot(5, "MONDAY", time(hour=14, minute=30), time(hour=15, minute=30)),
-        Timeslot(6, "TUESDAY", time(hour=8, minute=30), time(hour=9, minute=30)),
-        Timeslot(7, "TUESDAY", time(hour=9, minute=30), time(hour=10, minute=30)),
-        Timeslot(8, "TUESDAY", time(hour=10, minute=30), time(hour=11, minute=30)),
-        Timeslot(9, "TUESDAY", time(hour=13, minute=30), time(hour=14, minute=30)),
-        Timeslot(10, "TUESDAY", time(hour=14, minute=30), time(hour=15, minute=30)),
-    ]
-    room_list = [
-        Room(1, "Room A"),
-        Room(2, "Room B"),
-        Room(3, "Room C")
-    ]
-    lesson_list = [
-        Lesson(1, "Math", "A. Turing", "9th grade"),
-        Lesson(2, "Math", "A. Turing", "9th grade"),
-        Lesson(3, "Physics", "M. Curie", "9th grade"),
-        Lesson(4, "Chemistry", "M. Curie", "9th grade"),
-        Lesson(5, "Biology", "C. Darwin", "9th grade"),
-        Lesson(6, "History", "I. Jones", "9th grade"),
-        Lesson(7, "English", "I. Jones", "9th grade"),
-        Lesson(8, "English", "I. Jones", "9th grade"),
-        Lesson(9, "Spanish", "P. Cruz", "9th grade"),
-        Lesson(10, "Spanish", "P. Cruz", "9th grade"),
-        Lesson(11, "Math", "A. Turing", "10th grade"),
-        Lesson(12, "Math", "A. Turing", "10th grade"),
-        Lesson(13, "Math", "A. Turing", "10th grade"),
-        Lesson(14, "Physics", "M. Curie", "10th grade"),
-        Lesson(15, "Chemistry", "M. Curie", "10th grade"),
-        Lesson(16, "French", "M. Curie", "10th grade"),
-        Lesson(17, "Geography", "C. Darwin", "10th grade"),
-        Lesson(18, "History", "I. Jones", "10th grade"),
-        Lesson(19, "English", "P. Cruz", "10th grade"),
-        Lesson(20, "Spanish", "P. Cruz", "10th grade"),
-    ]
-    lesson = lesson_list[0]
-    lesson.set_timeslot(timeslot_list[0])
-    lesson.set_room(room_list[0])
-
-    return TimeTable(timeslot_list, room_list, lesson_list)
 
 
-solver_config = optapy.config.solver.SolverConfig() \
-    .withEntityClasses(Lesson) \
-    .withSolutionClass(TimeTable) \
-    .withConstraintProviderClass(define_constraints) \
-    .withTerminationSpentLimit(Duration.ofSeconds(30))
+def intern(names, ids, name):
+    # Id of name in the names lookup table, appended on first use
+    if name not in ids:
+        ids[name] = len(names)
+        names.append(name)
+    return ids[name]
+
+
+def check_timetable(content):
+    """Errors of a timetable, as paths and messages, before anything is built"""
+    if not isinstance(content, dict):
+        return [f"timetable: expected an object, got {type(content).__name__}"]
+    errors = [f"{key}: unknown key" for key in sorted(set(content) - KEYS[''])]
+    for section in ['timeslots', 'rooms', 'lessons']:
+        if not isinstance(content.get(section), list) or len(content[section]) == 0:
+            errors.append(f"{section}: expected a non empty list")
+            continue
+        for index, element in enumerate(content[section]):
+            path = f"{section}[{index}]"
+            if not isinstance(element, dict):
+                errors.append(f"{path}: expected an object")
+                continue
+            errors.extend(f"{path}.{key}: unknown key" for key in sorted(set(element) - KEYS[section]))
+            for key in sorted(KEYS[section]):
+                if not isinstance(element.get(key), str):
+                    errors.append(f"{path}.{key}: expected a string")
+            if section != 'timeslots':
+                continue
+            if isinstance(element.get('dayOfWeek'), str) and element['dayOfWeek'] not in DAYS_OF_WEEK:
+                errors.append(f"{path}.dayOfWeek: expected one of {', '.join(DAYS_OF_WEEK)}")
+            times = []
+            for key in ['startTime', 'endTime']:
+                try:
+                    times.append(time.fromisoformat(element[key]))
+                except (KeyError, TypeError, ValueError):
+                    errors.append(f"{path}.{key}: expected a HH:MM time")
+            if len(times) == 2 and times[1] <= times[0]:
+                errors.append(f"{path}.endTime: not after {path}.startTime")
+    names = [room.get('name') for room in content.get('rooms') or [] if isinstance(room, dict)]
+    errors.extend(f"rooms: {name} is listed twice" for name in sorted(set(name for name in names
+                                                                               if names.count(name) > 1)))
+    return errors
+
+
+def load_timetable(content):
+    errors = check_timetable(content)
+    if len(errors) > 0:
+        raise ProblemError(errors)
+
+    timeslot_list = [Timeslot(timeslot_id, timeslot['dayOfWeek'],
+                              time.fromisoformat(timeslot['startTime']), time.fromisoformat(timeslot['endTime']))
+                     for timeslot_id, timeslot in enumerate(content['timeslots'])]
+    room_list = [Room(room_id, room['name']) for room_id, room in enumerate(content['rooms'])]
+    names = TimetableNames([], [], [])
+    subject_ids, teacher_ids, student_group_ids = {}, {}, {}
+    lesson_list = [Lesson(lesson_id,
+                          intern(names.subjects, subject_ids, lesson['subject']),
+                          intern(names.teachers, teacher_ids, lesson['teacher']),
+                          intern(names.student_groups, student_group_ids, lesson['studentGroup']),
+                          names)
+                   for lesson_id, lesson in enumerate(content['lessons'])]
+    return TimeTable(timeslot_list, room_list, lesson_list)
 
-solution = solver_factory_create(solver_config) \
-    .buildSolver() \
-    .solve(generate_problem())
 
-print(solution)
\ No newline at end of file
+def load_timetable_file(file_path):
+    with open(file_path, 'r') as file:
+        try:
+            content = json.load(file)
+        except json.JSONDecodeError as e:
+            raise ProblemError([f"{file_path}: invalid JSON, {e}"])
+    return content, load_timetable(content)
+
+
+def parse_arguments(args):
+    parser = argparse.ArgumentParser(description='Solves lesson planning problems')
+    parser.add_argument('source', help='timetable JSON file, or a directory of them')
+    parser.add_argument('--output-dir', help='write <name>.solution.json files there instead of printing them')
+    add_termination_arguments(parser)
+    add_phase_arguments(parser)
+    return parser.parse_args(args[1:])
+
+
+class LessonPlanningSolver:
+    """Solves timetables one after the other, reusing the solver factories of identical settings"""
+
+    def __init__(self, arguments):
+        self.arguments = arguments
+        self.solver_factories = {}
+        self.solver = None
+
+    def settings(self, content):
+        solver_settings = solver_settings_with_preset(self.arguments, content.get('solver', {}))
+        settings = termination_settings(self.arguments, solver_settings.get('termination', {}), 30)
+        if settings.get('compositionStyle', 'OR') == 'OR':
+            settings.setdefault('bestScoreLimit', DEFAULT_BEST_SCORE_LIMIT)
+        return settings, phase_settings(self.arguments, solver_settings.get('phases', {}))
+
+    def solver_factory(self, settings, phases):
+        key = json.dumps({'termination': settings, 'phases': phases}, sort_keys=True)
+        if key not in self.solver_factories:
+            solver_config = optapy.config.solver.SolverConfig() \
+                .withEntityClasses(Lesson) \
+                .withSolutionClass(TimeTable) \
+                .withConstraintProviderClass(define_constraints)
+            solver_config = apply_termination(solver_config, settings)
+            solver_config = apply_phases(solver_config, phases, settings, ['timeslot', 'room'])
+            self.solver_factories[key] = solver_factory_create(solver_config)
+        return self.solver_factories[key]
+
+    def solve(self, content, timetable):
+        settings, phases = self.settings(content)
+        self.solver = self.solver_factory(settings, phases).buildSolver()
+        termination_report = TerminationReport(settings).listen(self.solver)
+        termination_report.start()
+        try:
+            solution = self.solver.solve(timetable)
+        finally:
+            termination_report.stop()
+            self.solver = None
+        return solution, termination_report
+
+    def terminate_early(self):
+        if self.solver is not None:
+            self.solver.terminateEarly()
+
+
+def write_solution(solution, title, output_directory, name):
+    if output_directory is None:
+        print(json.dumps(solution.to_json(title), indent=4))
+        return
+    file_path = os.path.join(output_directory, f"{name}.solution.json")
+    with open(file_path, 'w') as file:
+        file.write(json.dumps(solution.to_json(title), indent=4))
+    print(f"Written {file_path}", file=sys.stderr)
+
+
+def solve_file(solver, file_path, output_directory):
+    name = os.path.splitext(os.path.basename(file_path))[0]
+    start = timer.perf_counter()
+    content, timetable = load_timetable_file(file_path)
+    with contextlib.redirect_stdout(sys.stderr):
+        solution, termination_report = solver.solve(content, timetable)
+    write_solution(solution, content.get('title', name), output_directory, name)
+    return {
+        'timetable': name,
+        'score': solution.score.toString() if solution.score is not None else 'N/A',
+        'seconds': timer.perf_counter() - start,
+        'termination': ', '.join(termination_report.reasons(solution.score))
+    }
+
+
+def print_summary(results, file=sys.stderr):
+    print('timetable;score;seconds;termination', file=file)
+    for result in results:
+        print(f"{result['timetable']};{result['score']};{result['seconds']:.1f};{result['termination']}", file=file)
+
+
+def main(args):
+    arguments = parse_arguments(args)
+    if arguments.output_dir is None and os.path.isdir(arguments.source):
+        arguments.output_dir = os.path.join(arguments.source, 'solutions')
+    if arguments.output_dir is not None:
+        os.makedirs(arguments.output_dir, exist_ok=True)
+    solver = LessonPlanningSolver(arguments)
+    # Ctrl-C stops the current solve and still writes its best solution
+    signal.signal(signal.SIGINT, lambda signal_number, frame: solver.terminate_early())
+
+    if not os.path.isdir(arguments.source):
+        try:
+            result = solve_file(solver, arguments.source, arguments.output_dir)
+        # Invalid timetables (ProblemError) and invalid solver settings
+        except ValueError as e:
+            print(e, file=sys.stderr)
+            return 2
+        print(f"Final score : {result['score']}, {result['termination']} after {result['seconds']:.1f}s", file=sys.stderr)
+        return 0
+
+    file_paths = sorted(os.path.join(arguments.source, file_name)
+                        for file_name in os.listdir(arguments.source) if file_name.endswith('.json'))
+    results = []
+    for file_path in file_paths:
+        try:
+            result = solve_file(solver, file_path, arguments.output_dir)
+        except Exception as e:
+            result = {
+                'timetable': os.path.splitext(os.path.basename(file_path))[0],
+                'score': 'ERROR',
+                'seconds': 0,
+                'termination': str(e).replace('\n', ' ')
+            }
+        print(f"{result['timetable']} done: {result['score']}", file=sys.stderr)
+        results.append(result)
+    print_summary(results)
+    return 0 if all(result['score'] != 'ERROR' for result in results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
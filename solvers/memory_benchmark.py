@@ -0,0 +1,111 @@
+"""
+Memory per lesson and attribute read throughput of the lessons, against the
+dict-backed layout they replaced: every lesson carrying its own subject, teacher
+and student group strings.
+
+Usage: python memory_benchmark.py [--lessons 1000,10000,100000] [--repeat 5]
+
+Memory is what tracemalloc still counts once the timetable is built from its
+JSON content. Reads are the join keys of the conflict constraints, done on every
+assigned lesson. The dict-backed lessons are decorated as the ones they stand
+for, optapy wraps both in the same JPype proxies.
+
+Planning items are not compared: a decorated entity gets an instance dict of the
+same size whatever its attributes, so sharing their epic/profile fields only
+adds the shared objects.
+"""
+import argparse
+import json
+import random
+import time
+import tracemalloc
+
+from optapy import planning_entity
+
+from lesson_planning_solver import load_timetable, DAYS_OF_WEEK
+
+
+@planning_entity
+class DictLesson:
+    # Lesson as it was: its own copy of the names
+    def __init__(self, id, subject, teacher, student_group, teacher_id, student_group_id):
+        self.id = id
+        self.subject = subject
+        self.teacher = teacher
+        self.student_group = student_group
+        self.teacher_id = teacher_id
+        self.student_group_id = student_group_id
+        self.timeslot = None
+        self.room = None
+
+
+def traced(build):
+    """What build() returns, and the bytes it keeps allocated"""
+    tracemalloc.start()
+    result = build()
+    allocated = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, allocated
+
+
+def lesson_content(count, seed):
+    rng = random.Random(seed)
+    groups = max(1, count // 25)
+    return json.dumps({
+        'timeslots': [{'dayOfWeek': day, 'startTime': f"{hour:02d}:00", 'endTime': f"{hour + 1:02d}:00"}
+                      for day in DAYS_OF_WEEK[:5] for hour in range(8, 16)],
+        'rooms': [{'name': f"Room {index}"} for index in range(max(1, groups))],
+        'lessons': [{'subject': rng.choice(['Math', 'Physics', 'Chemistry', 'Biology', 'History', 'English',
+                                            'Spanish', 'French', 'Geography']),
+                     'teacher': f"Teacher {rng.randrange(max(1, count // 20))}",
+                     'studentGroup': f"Group {rng.randrange(groups)}"}
+                    for _ in range(count)]
+    })
+
+
+def dict_timetable(text):
+    # Parsed from the file as load_timetable does, the content is then dropped
+    content = json.loads(text)
+    timetable = load_timetable(content)
+    teacher_ids, student_group_ids = {}, {}
+    lessons = [DictLesson(index, lesson['subject'], lesson['teacher'], lesson['studentGroup'],
+                          teacher_ids.setdefault(lesson['teacher'], len(teacher_ids)),
+                          student_group_ids.setdefault(lesson['studentGroup'], len(student_group_ids)))
+               for index, lesson in enumerate(content['lessons'])]
+    return timetable.timeslot_list, timetable.room_list, lessons
+
+
+def shared_timetable(text):
+    timetable = load_timetable(json.loads(text))
+    return timetable.timeslot_list, timetable.room_list, timetable.lesson_list
+
+
+def lesson_reads(lessons, repeat):
+    # Join keys of the three conflict constraints
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for lesson in lessons:
+            lesson.timeslot.id, lesson.room.id, lesson.teacher_id, lesson.student_group_id
+    return len(lessons) * repeat / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compares the memory and read throughput of the lessons')
+    parser.add_argument('--lessons', default='1000,10000,100000', help='lesson counts, comma separated')
+    parser.add_argument('--repeat', type=int, default=5, help='passes over the lessons when timing reads')
+    arguments = parser.parse_args()
+
+    print('lessons;layout;bytesPerLesson;readsPerSecond')
+    for count in (int(value) for value in arguments.lessons.split(',')):
+        text = lesson_content(count, 1)
+        for layout, build in [('dict', dict_timetable), ('shared', shared_timetable)]:
+            (timeslots, rooms, lessons), allocated = traced(lambda: build(text))
+            rng = random.Random(1)
+            for lesson in lessons:
+                lesson.timeslot, lesson.room = rng.choice(timeslots), rng.choice(rooms)
+            print(f"{count};{layout};{allocated / count:.0f};"
+                  f"{lesson_reads(lessons, arguments.repeat):.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+"""
+Team planning outputs: CSV, Mermaid Gantt charts, JSON and columnar exports.
+
+    csv         one row per assigned day, as read back by --warm-start
+    products    Gantt chart per product and epic
+    members     Gantt chart per member and workload
+    json        score and assignments, as TeamPlanning.to_json
+    npz         columnar arrays, see columnar.py (files only)
+    parquet     columnar table, see columnar.py (files only)
+
+Every format is rendered from one Consolidation of the solution, built with a
+single sort and a single pass over the items, and written through buffered
+files or streams instead of one print per row.
+"""
+import json
+import os
+from datetime import date
+
+from columnar import solution_columns, write_npz, write_parquet, load_columns, columns_to_assignments
+
+
+FORMATS = ['csv', 'products', 'members', 'json', 'npz', 'parquet']
+DEFAULT_FORMATS = ['csv', 'products', 'members']
+EXTENSIONS = {'csv': 'csv', 'products': 'products.mmd', 'members': 'members.mmd', 'json': 'json',
+              'npz': 'npz', 'parquet': 'parquet'}
+BINARY_WRITERS = {'npz': write_npz, 'parquet': write_parquet}
+HEADINGS = {'csv': 'CSV OUTPUT', 'products': 'PRODUCT/EPIC GANTT', 'members': 'MEMBER/WORKLOAD GANTT', 'json': 'JSON OUTPUT'}
+BUFFER_SIZE = 1 << 16
+
+
+def add_output_arguments(parser):
+    parser.add_argument('--formats', help=f"comma separated outputs among {', '.join(FORMATS)}, "
+                                          f"defaults to {','.join(DEFAULT_FORMATS)}")
+    parser.add_argument('--output-dir', help='write every output to its own file in this directory instead of stdout')
+
+
+def parse_formats(formats):
+    if formats is None:
+        return DEFAULT_FORMATS
+    formats = formats.split(',')
+    for output_format in formats:
+        if output_format not in FORMATS:
+            raise ValueError(f"Unknown output format {output_format}, expected one of {', '.join(FORMATS)}")
+    return formats
+
+
+def extend_range(ranges, key, ordinal):
+    day_range = ranges.get(key)
+    if day_range is None:
+        ranges[key] = [ordinal, ordinal]
+    elif ordinal < day_range[0]:
+        day_range[0] = ordinal
+    elif ordinal > day_range[1]:
+        day_range[1] = ordinal
+
+
+class Consolidation:
+    """
+    Assigned items sorted by product and epic, with the first and last day
+    (ordinals) of every product/epic and every member/workload
+    """
+
+    def __init__(self, solution):
+        self.items = sorted((item for item in solution.planning_items
+                             if item.work_day is not None and item.team_member is not None),
+                            key=lambda item: (item.product, item.epic))
+        self.per_product = {}
+        self.per_member = {}
+        for item in self.items:
+            ordinal = item.work_day.ordinal
+            extend_range(self.per_product.setdefault(item.product, {}), item.epic, ordinal)
+            extend_range(self.per_member.setdefault(item.team_member.name, {}), f"{item.epic} ({item.profile})", ordinal)
+
+
+def csv_lines(consolidation):
+    yield 'date;product;epicName;profile;teamMember\n'
+    for item in consolidation.items:
+        yield f"{item.work_day.date.isoformat()};{item.product};{item.epic};{item.profile};{item.team_member.name}\n"
+
+
+def mermaid_gantt_lines(sections, title):
+    yield 'gantt\n'
+    yield f"\ttitle {title}\n"
+    yield '\tdateFormat YYYY-MM-DD\n'
+    for section, ranges in sections.items():
+        yield f"\tsection {section}\n"
+        for task, (begin, end) in ranges.items():
+            yield f"\t{task}\t:{date.fromordinal(begin).isoformat()}, {date.fromordinal(end).isoformat()}\n"
+
+
+def output_lines(output_format, solution, consolidation, title):
+    if output_format == 'csv':
+        return csv_lines(consolidation)
+    if output_format == 'products':
+        return mermaid_gantt_lines(consolidation.per_product, f"{title} - Products & Epics")
+    if output_format == 'members':
+        return mermaid_gantt_lines(consolidation.per_member, f"{title} - Members & Workloads")
+    return [json.dumps(solution.to_json(), indent=4), '\n']
+
+
+def write_output(stream, output_format, solution, title, consolidation=None):
+    if consolidation is None:
+        consolidation = Consolidation(solution)
+    stream.writelines(output_lines(output_format, solution, consolidation, title))
+
+
+def write_output_file(file_path, output_format, solution, title, consolidation=None):
+    # Written aside then renamed, a reader never sees a half written file
+    temporary_path = f"{file_path}.tmp"
+    if output_format in BINARY_WRITERS:
+        with open(temporary_path, 'wb') as file:
+            BINARY_WRITERS[output_format](file, solution_columns(solution))
+    else:
+        with open(temporary_path, 'w', buffering=BUFFER_SIZE) as file:
+            write_output(file, output_format, solution, title, consolidation)
+    os.replace(temporary_path, file_path)
+    return file_path
+
+
+def write_outputs(solution, title, formats, directory, name):
+    """Writes <directory>/<name>.<extension> for every format, returns the file paths"""
+    consolidation = Consolidation(solution)
+    return [write_output_file(os.path.join(directory, f"{name}.{EXTENSIONS[output_format]}"),
+                              output_format, solution, title, consolidation)
+            for output_format in formats]
+
+
+def print_outputs(stream, solution, title, formats):
+    # Headings only when several outputs share the stream
+    for output_format in formats:
+        if output_format in BINARY_WRITERS:
+            raise ValueError(f"The {output_format} output can only be written to a file, use --output-dir")
+    consolidation = Consolidation(solution)
+    for output_format in formats:
+        if len(formats) > 1:
+            stream.write(f"{HEADINGS[output_format]}\n")
+        write_output(stream, output_format, solution, title, consolidation)
+    stream.flush()
+
+
+def read_assignments(file_path):
+    """Assignment rows (date, product, epicName, profile, teamMember) of a csv, json, npz or parquet output"""
+    if file_path.endswith('.npz') or file_path.endswith('.parquet'):
+        return columns_to_assignments(load_columns(file_path))
+    with open(file_path, 'r') as file:
+        content = file.read()
+    if file_path.endswith('.json'):
+        return json.loads(content)['assignments']
+
+    assignments = []
+    header = None
+    for line in content.splitlines():
+        if len(line.strip()) == 0:
+            continue
+        values = line.strip().split(';')
+        if header is None:
+            header = values
+            continue
+        assignments.append(dict(zip(header, values)))
+    return assignments
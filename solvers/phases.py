@@ -0,0 +1,233 @@
+"""
+Construction heuristic and local search phase settings shared by the solvers.
+
+Settings come from the "phases" section of the problem's "solver" settings, on
+top of an optional preset, and can be overridden on the command line:
+
+    "preset": "fast-feasible",
+    "phases": {
+        "constructionHeuristic": "FIRST_FIT",    # "eligible-first-fit", CHEAPEST_INSERTION, ... see CONSTRUCTION_HEURISTICS
+        "localSearch": "LATE_ACCEPTANCE",         # TABU_SEARCH, SIMULATED_ANNEALING, HILL_CLIMBING, ...
+        "moveSelectors": ["change", "swap", "pillarSwap"],
+        "entityTabuSize": 7,
+        "lateAcceptanceSize": 400,
+        "simulatedAnnealingStartingTemperature": "1hard/10soft",
+        "acceptedCountLimit": 1000
+    }
+
+"eligible-first-fit" is solver specific: the solver builds the initial
+assignment itself and the FIRST_FIT phase only completes what is left.
+
+localSearch picks the acceptor, only the size of that acceptor applies
+(entityTabuSize for TABU_SEARCH, lateAcceptanceSize for LATE_ACCEPTANCE,
+simulatedAnnealingStartingTemperature for SIMULATED_ANNEALING). Without
+localSearch, the size that is set picks it.
+"""
+# optapy.config starts the JVM, it is imported where the configs are built so
+# that the arguments are parsed before
+import optapy
+
+
+PRESETS = {
+    'fast-feasible': {
+        'phases': {
+            'constructionHeuristic': 'eligible-first-fit',
+            'localSearch': 'LATE_ACCEPTANCE',
+            'moveSelectors': ['change', 'swap'],
+            'lateAcceptanceSize': 100,
+            'acceptedCountLimit': 1
+        },
+        'termination': {
+            'bestScoreLimit': '0hard/*soft',
+            'spentLimit': 5
+        }
+    },
+    'best-quality': {
+        'phases': {
+            'constructionHeuristic': 'eligible-first-fit',
+            'localSearch': 'TABU_SEARCH',
+            'moveSelectors': ['change', 'swap', 'pillarChange', 'pillarSwap'],
+            'entityTabuSize': 7,
+            'acceptedCountLimit': 1000
+        },
+        'termination': {
+            'unimprovedSpentLimit': 30,
+            'spentLimit': 300
+        }
+    }
+}
+
+# The ConstructionHeuristicType and LocalSearchType values the solvers can run,
+# checked before they reach valueOf. The *_DECREASING and WEAKEST/STRONGEST_FIT
+# types need difficulty or strength comparators the entities do not declare,
+# ALLOCATE_TO_VALUE_FROM_QUEUE a single planning variable.
+CONSTRUCTION_HEURISTICS = ['eligible-first-fit', 'FIRST_FIT', 'ALLOCATE_ENTITY_FROM_QUEUE', 'CHEAPEST_INSERTION',
+                           'ALLOCATE_FROM_POOL']
+LOCAL_SEARCH_TYPES = ['HILL_CLIMBING', 'TABU_SEARCH', 'SIMULATED_ANNEALING', 'LATE_ACCEPTANCE', 'GREAT_DELUGE',
+                      'VARIABLE_NEIGHBORHOOD_DESCENT']
+
+# Local search type -> the setting sizing its acceptor, OptaPlanner's default
+# size, and how it is applied
+ACCEPTOR_SIZES = {
+    'TABU_SEARCH': ('entityTabuSize', 7, lambda acceptor, size: acceptor.withEntityTabuSize(size)),
+    'LATE_ACCEPTANCE': ('lateAcceptanceSize', 400, lambda acceptor, size: acceptor.withLateAcceptanceSize(size)),
+    'SIMULATED_ANNEALING': ('simulatedAnnealingStartingTemperature', None,
+                            lambda acceptor, size: acceptor.withSimulatedAnnealingStartingTemperature(size))
+}
+
+MOVE_SELECTORS = {
+    'change': lambda variable_names: optapy.config.heuristic.selector.move.generic.ChangeMoveSelectorConfig(),
+    'swap': lambda variable_names: optapy.config.heuristic.selector.move.generic.SwapMoveSelectorConfig(),
+    # Pillars are groups of entities sharing the same planning values, so
+    # these moves reassign or swap whole blocks of work at once
+    'pillarChange': lambda variable_names: pillar_change_move_selector(variable_names),
+    'pillarSwap': lambda variable_names: optapy.config.heuristic.selector.move.generic.PillarSwapMoveSelectorConfig()
+}
+
+
+def pillar_change_move_selector(variable_names):
+    # A pillar change moves a single planning variable, so entities with more
+    # than one get a pillar change per variable
+    import optapy.config
+    from java.util import ArrayList
+    if len(variable_names) <= 1:
+        return optapy.config.heuristic.selector.move.generic.PillarChangeMoveSelectorConfig()
+    move_selector_configs = ArrayList()
+    for variable_name in variable_names:
+        move_selector_configs.add(optapy.config.heuristic.selector.move.generic.PillarChangeMoveSelectorConfig()
+                                  .withValueSelectorConfig(
+                                      optapy.config.heuristic.selector.value.ValueSelectorConfig(variable_name)))
+    return optapy.config.heuristic.selector.move.composite.UnionMoveSelectorConfig(move_selector_configs)
+
+
+def add_phase_arguments(parser):
+    parser.add_argument('--preset', choices=PRESETS.keys(), help='predefined phase and termination settings')
+    parser.add_argument('--construction-heuristic', help='construction heuristic type, e.g. FIRST_FIT')
+    parser.add_argument('--local-search', help='local search type, e.g. TABU_SEARCH or LATE_ACCEPTANCE')
+    parser.add_argument('--move-selectors', help=f"comma separated list of {', '.join(MOVE_SELECTORS.keys())}")
+
+
+def solver_settings_with_preset(arguments, solver_settings):
+    """Solver settings where the preset fills in what the problem and command line leave out"""
+    preset_name = solver_settings.get('preset')
+    if arguments is not None and arguments.preset is not None:
+        preset_name = arguments.preset
+    if preset_name is None:
+        return solver_settings
+    if preset_name not in PRESETS:
+        raise ValueError(f"Unknown preset {preset_name}, expected one of {', '.join(PRESETS.keys())}")
+
+    preset = PRESETS[preset_name]
+    settings = dict(solver_settings)
+    settings['phases'] = dict(preset_phases(arguments, preset, solver_settings), **solver_settings.get('phases', {}))
+    # Preset limits are dropped as soon as any termination is configured
+    if 'termination' not in solver_settings:
+        settings['termination'] = dict(preset['termination'])
+    return settings
+
+
+def preset_phases(arguments, preset, solver_settings):
+    # The preset's acceptor size and accepted count limit are tuned for its own
+    # local search type, they are dropped when another type is asked for
+    phases = dict(preset['phases'])
+    local_search = solver_settings.get('phases', {}).get('localSearch')
+    if arguments is not None and arguments.local_search is not None:
+        local_search = arguments.local_search
+    check_name('local search type', local_search, LOCAL_SEARCH_TYPES)
+    if local_search is not None and local_search != phases.get('localSearch'):
+        for size, _, _ in ACCEPTOR_SIZES.values():
+            phases.pop(size, None)
+        phases.pop('acceptedCountLimit', None)
+    return phases
+
+
+def phase_settings(arguments, settings):
+    """Merge command line phase arguments over the problem settings"""
+    settings = dict(settings)
+    if arguments is not None:
+        overrides = {
+            'constructionHeuristic': arguments.construction_heuristic,
+            'localSearch': arguments.local_search,
+            'moveSelectors': None if arguments.move_selectors is None else arguments.move_selectors.split(',')
+        }
+        for key, value in overrides.items():
+            if value is not None:
+                settings[key] = value
+    check_name('construction heuristic', settings.get('constructionHeuristic'), CONSTRUCTION_HEURISTICS)
+    check_name('local search type', settings.get('localSearch'), LOCAL_SEARCH_TYPES)
+    if settings.get('localSearch') == 'SIMULATED_ANNEALING' and 'simulatedAnnealingStartingTemperature' not in settings:
+        raise ValueError('The SIMULATED_ANNEALING local search needs a simulatedAnnealingStartingTemperature')
+    move_selectors = settings.get('moveSelectors', [])
+    if not isinstance(move_selectors, list):
+        raise ValueError(f"moveSelectors must be a list of {', '.join(MOVE_SELECTORS.keys())}")
+    for move_selector in move_selectors:
+        check_name('move selector', move_selector, MOVE_SELECTORS.keys())
+    return settings
+
+
+def check_name(kind, name, names):
+    if name is not None and name not in names:
+        raise ValueError(f"Unknown {kind} {name}, expected one of {', '.join(names)}")
+
+
+def construction_heuristic_phase_config(settings):
+    import optapy.config
+    config = optapy.config.constructionheuristic.ConstructionHeuristicPhaseConfig()
+    construction_heuristic = settings.get('constructionHeuristic')
+    if construction_heuristic == 'eligible-first-fit':
+        construction_heuristic = 'FIRST_FIT'
+    if construction_heuristic is not None:
+        config = config.withConstructionHeuristicType(
+            optapy.config.constructionheuristic.ConstructionHeuristicType.valueOf(construction_heuristic))
+    return config
+
+
+def local_search_phase_config(settings, step_count_limit, variable_names=()):
+    import optapy.config
+    from optapy.types import TerminationConfig
+    from java.util import ArrayList
+    config = optapy.config.localsearch.LocalSearchPhaseConfig()
+
+    local_search = settings.get('localSearch')
+    if local_search is None:
+        local_search = next((local_search_type for local_search_type, (size, _, _) in ACCEPTOR_SIZES.items()
+                             if size in settings), None)
+    size, default_size, with_size = ACCEPTOR_SIZES.get(local_search, (None, None, None))
+    # OptaPlanner takes either a local search type or an explicit acceptor and
+    # forager, so an accepted count limit needs the acceptor spelled out too
+    if size in settings or (default_size is not None and 'acceptedCountLimit' in settings):
+        acceptor = optapy.config.localsearch.decider.acceptor.LocalSearchAcceptorConfig()
+        config = config.withAcceptorConfig(with_size(acceptor, settings.get(size, default_size)))
+    elif local_search is not None:
+        if 'acceptedCountLimit' in settings:
+            raise ValueError(f"acceptedCountLimit cannot be combined with the {local_search} local search"
+                             + (f" without {size}" if size is not None else ''))
+        config = config.withLocalSearchType(optapy.config.localsearch.LocalSearchType.valueOf(local_search))
+
+    if 'acceptedCountLimit' in settings:
+        config = config.withForagerConfig(optapy.config.localsearch.decider.forager.LocalSearchForagerConfig()
+                                          .withAcceptedCountLimit(settings['acceptedCountLimit']))
+
+    move_selectors = settings.get('moveSelectors', [])
+    if len(move_selectors) == 1:
+        config = config.withMoveSelectorConfig(MOVE_SELECTORS[move_selectors[0]](variable_names))
+    elif len(move_selectors) > 1:
+        move_selector_configs = ArrayList()
+        for move_selector in move_selectors:
+            move_selector_configs.add(MOVE_SELECTORS[move_selector](variable_names))
+        config = config.withMoveSelectorConfig(
+            optapy.config.heuristic.selector.move.composite.UnionMoveSelectorConfig(move_selector_configs))
+
+    if step_count_limit is not None:
+        config = config.withTerminationConfig(TerminationConfig().withStepCountLimit(step_count_limit))
+    return config
+
+
+def apply_phases(solver_config, settings, termination_settings, variable_names=()):
+    """Explicit phases when anything is configured, the solver defaults otherwise"""
+    step_count_limit = termination_settings.get('stepCountLimit')
+    if len(settings) == 0 and step_count_limit is None:
+        return solver_config
+    return solver_config.withPhases(
+        construction_heuristic_phase_config(settings),
+        local_search_phase_config(settings, step_count_limit, variable_names))
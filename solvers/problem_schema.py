@@ -0,0 +1,437 @@
+"""
+Team planning problem format, version 1:
+
+    {
+        "version": 1,
+        "title": "My planning",
+        "teamMembers": [{"name": "...", "profile": "Dev", "product": "ProductA" or "*", "daysOff": ["2023-05-03"],
+                         "capacity": 0.5,
+                         "capacityPeriods": [{"begin": "2023-06-01", "end": "2023-06-30", "capacity": 1}]}],
+        "workDayRange": {"begin": "2023-05-01", "end": "2023-06-30", "teamDaysOff": ["2023-05-08"]},
+        "epics": [{"name": "...", "product": "ProductA", "priority": 1, "startDate": "2023-05-15",
+                   "deadLine": "2023-06-15",
+                   "workloads": {"Dev": 10, "QA": 3}}],
+        "solver": {...},        # optional, see termination.py and phases.py
+        "azureDevOps": {...}    # optional, see azure_devops_loader.py
+    }
+
+priority (default 10), startDate and deadLine are optional. Files without a version are
+migrated: missing title, daysOff and teamDaysOff get their defaults.
+
+capacity is the days of work a member does per work day (default 1), and
+capacityPeriods override it on date ranges, later periods winning. Capacities
+and workloads may be fractions of a day: a day of work is then split into
+units_per_day() planning items, so that every capacity and workload is a whole
+number of items.
+
+check_problem() validates a problem before anything is built and then
+cross-checks that it can be solved at all: every workload has an eligible
+member, and demand fits the capacity of the eligible members, overall, per
+profile, per workload and before every dead line.
+
+Usage:
+    python problem_schema.py check <problem.json> ...
+    python problem_schema.py migrate <problem.json> ... [--in-place]
+"""
+import argparse
+import bisect
+import difflib
+import json
+import math
+import os
+import sys
+from datetime import date
+from fractions import Fraction
+
+
+SCHEMA_VERSION = 1
+# Items a day of work can be split into, 4 for quarter days, 10 for tenths
+MAX_UNITS_PER_DAY = 10
+KEYS = {
+    '': {'version', 'title', 'teamMembers', 'workDayRange', 'epics', 'solver', 'azureDevOps'},
+    'teamMembers': {'name', 'profile', 'product', 'daysOff', 'capacity', 'capacityPeriods'},
+    'capacityPeriods': {'begin', 'end', 'capacity'},
+    'workDayRange': {'begin', 'end', 'teamDaysOff'},
+    'epics': {'name', 'product', 'priority', 'startDate', 'deadLine', 'workloads'},
+    'solver': {'preset', 'phases', 'termination', 'scoreCalculation', 'model', 'blockSize', 'moveThreadCount',
+               'environmentMode', 'warmStart'}
+}
+
+
+def did_you_mean(value, candidates):
+    # Case insensitive, most typos in profiles are about case
+    candidates = {candidate.lower(): candidate for candidate in candidates}
+    suggestions = difflib.get_close_matches(value.lower(), candidates.keys(), 1)
+    return f", did you mean {candidates[suggestions[0]]}?" if len(suggestions) > 0 else ''
+
+
+class ProblemError(ValueError):
+
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__('Invalid problem:\n' + '\n'.join(f"  {error}" for error in errors))
+
+
+def migrate(problem_content, default_title='Untitled planning'):
+    """Problem content in the current version, and the list of changes made"""
+    changes = []
+    if not isinstance(problem_content, dict):
+        raise ProblemError([f"problem: expected an object, got {type(problem_content).__name__}"])
+    version = problem_content.get('version', 0)
+    if not isinstance(version, int) or version > SCHEMA_VERSION:
+        raise ProblemError([f"version: unsupported version {version}, expected at most {SCHEMA_VERSION}"])
+    if version == SCHEMA_VERSION:
+        return problem_content, changes
+
+    problem_content = dict(problem_content)
+    if 'title' not in problem_content:
+        problem_content['title'] = default_title
+        changes.append(f"title: set to {default_title}")
+    if isinstance(problem_content.get('teamMembers'), list):
+        team_members = []
+        for index, team_member in enumerate(problem_content['teamMembers']):
+            if isinstance(team_member, dict) and 'daysOff' not in team_member:
+                team_member = dict(team_member, daysOff=[])
+                changes.append(f"teamMembers[{index}].daysOff: set to []")
+            team_members.append(team_member)
+        problem_content['teamMembers'] = team_members
+    if isinstance(problem_content.get('workDayRange'), dict) and 'teamDaysOff' not in problem_content['workDayRange']:
+        problem_content['workDayRange'] = dict(problem_content['workDayRange'], teamDaysOff=[])
+        changes.append('workDayRange.teamDaysOff: set to []')
+
+    # Current version first, as in the migrated files
+    problem_content = dict({'version': SCHEMA_VERSION}, **{key: value for key, value in problem_content.items()
+                                                            if key != 'version'})
+    changes.append(f"version: set to {SCHEMA_VERSION}")
+    return problem_content, changes
+
+
+class Checker:
+    """Collects every error instead of stopping at the first one"""
+
+    def __init__(self):
+        self.errors = []
+
+    def error(self, path, message):
+        self.errors.append(f"{path}: {message}")
+
+    def keys(self, path, value, kind, required):
+        if not isinstance(value, dict):
+            self.error(path or 'problem', f"expected an object, got {type(value).__name__}")
+            return False
+        for key in required:
+            if key not in value:
+                self.error(f"{path}.{key}" if path else key, 'missing')
+        for key in value:
+            if key not in KEYS[kind]:
+                self.error(f"{path}.{key}" if path else key, f"unknown key{did_you_mean(key, KEYS[kind])}")
+        return True
+
+    def text(self, path, value):
+        if not isinstance(value, str) or len(value.strip()) == 0:
+            self.error(path, f"expected a non empty string, got {json.dumps(value)}")
+            return False
+        return True
+
+    def day(self, path, value):
+        try:
+            return date.fromisoformat(value).toordinal()
+        except (TypeError, ValueError):
+            self.error(path, f"expected a YYYY-MM-DD date, got {json.dumps(value)}")
+            return None
+
+    def days(self, path, values):
+        if not isinstance(values, list):
+            self.error(path, f"expected a list of dates, got {json.dumps(values)}")
+            return set()
+        ordinals = (self.day(f"{path}[{index}]", value) for index, value in enumerate(values))
+        return set(ordinal for ordinal in ordinals if ordinal is not None)
+
+    def days_of_work(self, path, value):
+        # Infinity is no number of days, NaN fails the comparison
+        if not isinstance(value, (int, float)) or isinstance(value, bool) or not math.isfinite(value) or not value >= 0:
+            self.error(path, f"expected a positive number of days, got {json.dumps(value)}")
+            return None
+        return Fraction(str(value))
+
+    def unique(self, path, values):
+        seen = set()
+        for index, value in enumerate(values):
+            if value in seen:
+                self.error(f"{path}[{index}].name", f"duplicate name {value}")
+            seen.add(value)
+
+
+def check_structure(problem_content):
+    checker = Checker()
+    if not checker.keys('', problem_content, '', ['title', 'teamMembers', 'workDayRange', 'epics']):
+        return checker.errors, None
+    if 'title' in problem_content:
+        checker.text('title', problem_content['title'])
+    if isinstance(problem_content.get('solver'), dict):
+        checker.keys('solver', problem_content['solver'], 'solver', [])
+
+    work_day_range = problem_content.get('workDayRange')
+    begin = end = None
+    team_days_off = set()
+    if work_day_range is not None and checker.keys('workDayRange', work_day_range, 'workDayRange', ['begin', 'end', 'teamDaysOff']):
+        begin = checker.day('workDayRange.begin', work_day_range.get('begin'))
+        end = checker.day('workDayRange.end', work_day_range.get('end'))
+        if begin is not None and end is not None and end < begin:
+            checker.error('workDayRange.end', 'before workDayRange.begin')
+        team_days_off = checker.days('workDayRange.teamDaysOff', work_day_range.get('teamDaysOff', []))
+
+    team_members = []
+    if 'teamMembers' in problem_content:
+        if not isinstance(problem_content['teamMembers'], list) or len(problem_content['teamMembers']) == 0:
+            checker.error('teamMembers', 'expected a non empty list')
+        else:
+            for index, team_member in enumerate(problem_content['teamMembers']):
+                path = f"teamMembers[{index}]"
+                if not checker.keys(path, team_member, 'teamMembers', ['name', 'profile', 'product', 'daysOff']):
+                    continue
+                valid = all([checker.text(f"{path}.{key}", team_member.get(key)) for key in ['name', 'profile', 'product']
+                             if key in team_member])
+                days_off = checker.days(f"{path}.daysOff", team_member.get('daysOff', []))
+                capacity = checker.days_of_work(f"{path}.capacity", team_member.get('capacity', 1))
+                periods = check_capacity_periods(checker, f"{path}.capacityPeriods", team_member.get('capacityPeriods', []))
+                if valid and all(key in team_member for key in ['name', 'profile', 'product']):
+                    team_members.append((team_member['name'], team_member['profile'], team_member['product'], days_off,
+                                         capacity, periods))
+            checker.unique('teamMembers', [team_member.get('name') for team_member in problem_content['teamMembers']
+                                           if isinstance(team_member, dict)])
+
+    epics = []
+    if 'epics' in problem_content:
+        if not isinstance(problem_content['epics'], list):
+            checker.error('epics', 'expected a list')
+        else:
+            for index, epic in enumerate(problem_content['epics']):
+                path = f"epics[{index}]"
+                if not checker.keys(path, epic, 'epics', ['name', 'product', 'workloads']):
+                    continue
+                valid = all([checker.text(f"{path}.{key}", epic.get(key)) for key in ['name', 'product'] if key in epic])
+                if 'priority' in epic and (not isinstance(epic['priority'], int) or isinstance(epic['priority'], bool)):
+                    checker.error(f"{path}.priority", f"expected an integer, got {json.dumps(epic['priority'])}")
+                start_date = dead_line = None
+                if epic.get('startDate') is not None:
+                    start_date = checker.day(f"{path}.startDate", epic['startDate'])
+                if epic.get('deadLine') is not None:
+                    dead_line = checker.day(f"{path}.deadLine", epic['deadLine'])
+                if start_date is not None and dead_line is not None and dead_line < start_date:
+                    checker.error(f"{path}.deadLine", f"before {path}.startDate")
+                workloads = epic.get('workloads')
+                if not isinstance(workloads, dict):
+                    if workloads is not None:
+                        checker.error(f"{path}.workloads", 'expected an object of profile: days')
+                    continue
+                days = {}
+                for profile, workload in workloads.items():
+                    days[profile] = checker.days_of_work(f"{path}.workloads.{profile}", workload)
+                    valid = valid and days[profile] is not None
+                if valid and 'name' in epic and 'product' in epic:
+                    epics.append((epic['name'], epic['product'], dead_line, days, path, start_date))
+            checker.unique('epics', [epic.get('name') for epic in problem_content['epics'] if isinstance(epic, dict)])
+
+    if len(checker.errors) > 0:
+        return checker.errors, None
+    units = units_per_day([capacity for team_member in team_members for capacity in member_fractions(team_member)]
+                          + [workload for epic in epics for workload in epic[3].values()])
+    if units > MAX_UNITS_PER_DAY:
+        checker.error('problem', f"capacities and workloads split a day of work into {units} items, "
+                                 f"at most {MAX_UNITS_PER_DAY} are supported")
+        return checker.errors, None
+    return checker.errors, (begin, end, team_days_off, team_members, epics, units)
+
+
+def check_capacity_periods(checker, path, periods):
+    # [(begin ordinal, end ordinal, capacity)] of the valid periods
+    if not isinstance(periods, list):
+        checker.error(path, f"expected a list of periods, got {json.dumps(periods)}")
+        return []
+    valid_periods = []
+    for index, period in enumerate(periods):
+        period_path = f"{path}[{index}]"
+        if not checker.keys(period_path, period, 'capacityPeriods', ['begin', 'end', 'capacity']):
+            continue
+        begin = checker.day(f"{period_path}.begin", period.get('begin'))
+        end = checker.day(f"{period_path}.end", period.get('end'))
+        capacity = checker.days_of_work(f"{period_path}.capacity", period.get('capacity'))
+        if begin is not None and end is not None and end < begin:
+            checker.error(f"{period_path}.end", f"before {period_path}.begin")
+        elif begin is not None and end is not None and capacity is not None:
+            valid_periods.append((begin, end, capacity))
+    return valid_periods
+
+
+def member_fractions(team_member):
+    name, profile, product, days_off, capacity, periods = team_member
+    return [capacity] + [period_capacity for begin, end, period_capacity in periods]
+
+
+def units_per_day(days_of_work):
+    """Smallest split of a day of work making every given Fraction of a day a whole number of items"""
+    units = 1
+    for days in days_of_work:
+        units = units * days.denominator // math.gcd(units, days.denominator)
+    return units
+
+
+def capacity_per_day(work_days, capacity, periods, units):
+    """Items a member can do on every work day (sorted ordinals)"""
+    capacities = [capacity] * len(work_days)
+    for begin, end, period_capacity in periods:
+        for index in range(bisect.bisect_left(work_days, begin), bisect.bisect_right(work_days, end)):
+            capacities[index] = period_capacity
+    return [int(capacity * units) for capacity in capacities]
+
+
+def content_units_per_day(problem_content):
+    """units_per_day of a checked problem"""
+    return units_per_day([Fraction(str(team_member.get('capacity', 1))) for team_member in problem_content['teamMembers']]
+                         + [Fraction(str(period['capacity'])) for team_member in problem_content['teamMembers']
+                            for period in team_member.get('capacityPeriods', [])]
+                         + [Fraction(str(workload)) for epic in problem_content['epics']
+                            for workload in epic['workloads'].values()])
+
+
+def member_capacity_per_day(team_member, work_days, units):
+    """capacity_per_day of a checked teamMembers entry"""
+    periods = [(date.fromisoformat(period['begin']).toordinal(), date.fromisoformat(period['end']).toordinal(),
+                Fraction(str(period['capacity'])))
+               for period in team_member.get('capacityPeriods', [])]
+    return capacity_per_day(work_days, Fraction(str(team_member.get('capacity', 1))), periods, units)
+
+
+def workload_items(workload, units):
+    return int(Fraction(str(workload)) * units)
+
+
+def format_days(items, units):
+    # Items back to days of work, without decimals when whole
+    days = Fraction(items, units)
+    return str(days.numerator) if days.denominator == 1 else f"{float(days):g}"
+
+
+def work_day_ordinals(begin, end, team_days_off):
+    # Same days as PlanningProblem.generate_work_days
+    return [ordinal for ordinal in range(begin, end + 1) if ordinal % 7 not in (0, 6) and ordinal not in team_days_off]
+
+
+def check_capacity(begin, end, team_days_off, team_members, epics, units):
+    errors = []
+    work_days = work_day_ordinals(begin, end, team_days_off)
+    if len(work_days) == 0:
+        return ['workDayRange: no work day between begin and end']
+    # Items every member can do up to each work day, capacities are bisections
+    cumulative_capacities = []
+    for name, profile, product, days_off, capacity, periods in team_members:
+        cumulative = [0]
+        for ordinal, items in zip(work_days, capacity_per_day(work_days, capacity, periods, units)):
+            cumulative.append(cumulative[-1] + (0 if ordinal in days_off else items))
+        cumulative_capacities.append(cumulative)
+    profiles = set(team_member[1] for team_member in team_members)
+
+    # '*' matches any profile or product, as in EligibilityIndex
+    def eligible(profile, product):
+        return [index for index, team_member in enumerate(team_members)
+                if team_member[1] in (profile, '*') and team_member[2] in (product, '*')]
+
+    def capacity(members, until=None, since=None):
+        day_count = len(work_days) if until is None else bisect.bisect_right(work_days, until)
+        first_day = 0 if since is None else min(bisect.bisect_left(work_days, since), day_count)
+        return sum(cumulative_capacities[index][day_count] - cumulative_capacities[index][first_day] for index in members)
+
+    def days(items):
+        return format_days(items, units)
+
+    demand = {}
+    for name, product, dead_line, workloads, path, start_date in epics:
+        for profile, workload in workloads.items():
+            workload = int(workload * units)
+            if workload == 0:
+                continue
+            members = eligible(profile, product)
+            if len(members) == 0:
+                if profile not in profiles and '*' not in profiles:
+                    errors.append(f"{path}.workloads.{profile}: no team member has profile {profile}"
+                                  f"{did_you_mean(profile, profiles)}")
+                else:
+                    errors.append(f"{path}.workloads.{profile}: no {profile} team member works on product {product}")
+                continue
+            demand[(profile, product)] = demand.get((profile, product), 0) + workload
+            if (dead_line is not None or start_date is not None) and capacity(members, dead_line, start_date) < workload:
+                window = []
+                if start_date is not None:
+                    window.append(f"from {date.fromordinal(start_date).isoformat()}")
+                if dead_line is not None:
+                    window.append(f"before {date.fromordinal(dead_line).isoformat()}")
+                errors.append(f"{path}: {days(workload)} {profile} days needed {' and '.join(window)}, "
+                              f"eligible members only have {days(capacity(members, dead_line, start_date))}")
+
+    for (profile, product), workload in sorted(demand.items()):
+        available = capacity(eligible(profile, product))
+        if workload > available:
+            errors.append(f"epics: {days(workload)} {profile} days needed on {product}, "
+                          f"eligible members only have {days(available)}")
+    for profile in sorted(set(profile for profile, product in demand)):
+        workload = sum(items for (demand_profile, product), items in demand.items() if demand_profile == profile)
+        available = capacity([index for index, member in enumerate(team_members) if member[1] in (profile, '*')])
+        if workload > available:
+            errors.append(f"epics: {days(workload)} {profile} days needed, {profile} members only have {days(available)}")
+    total_demand = sum(demand.values())
+    total_capacity = capacity(range(len(team_members)))
+    if total_demand > total_capacity:
+        errors.append(f"epics: {days(total_demand)} days needed, the team only has {days(total_capacity)} "
+                      f"in the work day range")
+    return errors
+
+
+def check_problem(problem_content, capacity_checks=True):
+    """Raises ProblemError with every problem found"""
+    errors, parsed = check_structure(problem_content)
+    if parsed is not None and capacity_checks:
+        errors = errors + check_capacity(*parsed)
+    if len(errors) > 0:
+        raise ProblemError(errors)
+
+
+def load_problem_file(file_path, capacity_checks=True):
+    with open(file_path, 'r') as file:
+        try:
+            problem_content = json.load(file)
+        except json.JSONDecodeError as e:
+            raise ProblemError([f"{file_path}: invalid JSON, {e}"])
+    problem_content, changes = migrate(problem_content)
+    check_problem(problem_content, capacity_checks)
+    return problem_content, changes
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Checks or migrates team planning problem files')
+    parser.add_argument('command', choices=['check', 'migrate'])
+    parser.add_argument('files', nargs='+')
+    parser.add_argument('--in-place', action='store_true', help='migrate: rewrite the files instead of printing them')
+    arguments = parser.parse_args(sys.argv[1:])
+
+    failed = False
+    for file_path in arguments.files:
+        if arguments.command == 'check':
+            try:
+                problem_content, changes = load_problem_file(file_path)
+                print(f"{file_path}: OK{' (needs migration)' if len(changes) > 0 else ''}")
+            except ProblemError as e:
+                print(f"{file_path}: {e}")
+                failed = True
+            continue
+
+        with open(file_path, 'r') as file:
+            problem_content, changes = migrate(json.load(file), os.path.splitext(os.path.basename(file_path))[0])
+        for change in changes:
+            print(f"{file_path}: {change}", file=sys.stderr)
+        if arguments.in_place:
+            with open(file_path, 'w') as file:
+                file.write(json.dumps(problem_content, indent=4) + '\n')
+        else:
+            print(json.dumps(problem_content, indent=4))
+    sys.exit(1 if failed else 0)
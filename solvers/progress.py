@@ -0,0 +1,80 @@
+"""
+Best solution progress of a running solve.
+
+Every best solution change of the solver becomes a progress event:
+
+    {"event": "bestSolutionChanged", "seconds": 1.52, "score": "-2hard/-14soft",
+     "hard": -2, "soft": -14, "initialized": true, "scoreCalculationCount": 48210}
+
+scoreCalculationCount is the number of moves evaluated so far. Events are
+passed to the registered callbacks and, when an output is given, written as one
+JSON line each (NDJSON). Snapshot outputs are rewritten on every improvement so
+that an interrupted solve still leaves its best solution on disk.
+"""
+import json
+import sys
+
+
+def add_progress_arguments(parser):
+    parser.add_argument('--progress', help='write best solution events as NDJSON to this file, - for stdout')
+    parser.add_argument('--snapshot-dir', help='rewrite the outputs of the best solution in this directory '
+                                               'on every improvement')
+
+
+def open_progress_output(file_path):
+    if file_path is None:
+        return None
+    if file_path == '-':
+        return sys.stdout
+    return open(file_path, 'w')
+
+
+class ProgressStream:
+    """
+    Follows the best solution changes of a solver. Callbacks are called with the
+    progress event and the new best solution; the solution is only looked up
+    when a callback or a snapshot needs it.
+    """
+
+    def __init__(self, output=None, snapshot=None, to_solution=None):
+        self.output = output
+        # Called with the new best solution when the score improves
+        self.snapshot = snapshot
+        # Turns the solver's best solution into the one given to callbacks and snapshots
+        self.to_solution = to_solution
+        self.callbacks = []
+        self.solver = None
+        self.events = 0
+
+    def listen(self, solver):
+        self.solver = solver
+        solver.addEventListener(self.best_solution_changed)
+        return self
+
+    def best_solution_changed(self, event):
+        score = event.getNewBestScore()
+        progress = {
+            'event': 'bestSolutionChanged',
+            'seconds': event.getTimeMillisSpent() / 1000,
+            'score': score.toString(),
+            'hard': score.getHardScore(),
+            'soft': score.getSoftScore(),
+            'initialized': score.isSolutionInitialized(),
+            'scoreCalculationCount': self.solver.getSolverScope().getScoreCalculationCount()
+        }
+        self.events = self.events + 1
+
+        if self.output is not None:
+            self.output.write(json.dumps(progress) + '\n')
+            self.output.flush()
+
+        if len(self.callbacks) == 0 and self.snapshot is None:
+            return
+        # The event holds the Java view of the solution
+        solution = event.getNewBestSolution().get__optapy_Id()
+        if self.to_solution is not None:
+            solution = self.to_solution(solution)
+        for callback in self.callbacks:
+            callback(progress, solution)
+        if self.snapshot is not None and progress['initialized']:
+            self.snapshot(solution)
@@ -0,0 +1,116 @@
+"""
+Score explanation and constraint profiling shared by the solvers.
+
+score_analysis() breaks a solution's score down per constraint: number of
+matches, total score and the objects (items, members, days, ...) of the worst
+matches.
+
+ConstraintProfiler records how often each constraint lambda is called and the
+time spent in it. Lambdas are only wrapped when the profiler is enabled, as a
+wrapped lambda is always run as Python code by the solver.
+"""
+import functools
+import sys
+import time
+
+
+def justification_label(justification):
+    # Planning entities and facts come back as their Java view
+    if hasattr(justification, 'get__optapy_Id'):
+        justification = justification.get__optapy_Id()
+    return str(justification)
+
+
+def score_levels(score):
+    return {'score': score.toString(), 'hard': score.getHardScore(), 'soft': score.getSoftScore()}
+
+
+def score_analysis(score_manager, solution, max_matches=10):
+    """Constraints with matches, worst first, each with its max_matches worst matches"""
+    explanation = score_manager.explainScore(solution)
+    analysis = []
+    for constraint_match_total in explanation.getConstraintMatchTotalMap().values():
+        matches = []
+        for constraint_match in constraint_match_total.getConstraintMatchSet():
+            matches.append(dict(
+                score_levels(constraint_match.getScore()),
+                justifications=[justification_label(justification)
+                                for justification in constraint_match.getJustificationList()]))
+        if len(matches) == 0:
+            continue
+        matches.sort(key=lambda match: (match['hard'], match['soft']))
+        analysis.append(dict(
+            score_levels(constraint_match_total.getScore()),
+            constraint=constraint_match_total.getConstraintName(),
+            matchCount=constraint_match_total.getConstraintMatchCount(),
+            matches=matches[:max_matches]))
+    analysis.sort(key=lambda constraint: (constraint['hard'], constraint['soft'], constraint['constraint']))
+    return analysis
+
+
+def print_score_analysis(analysis, file=sys.stderr):
+    print('constraint;matches;score', file=file)
+    for constraint in analysis:
+        print(f"{constraint['constraint']};{constraint['matchCount']};{constraint['score']}", file=file)
+    for constraint in analysis:
+        print(f"{constraint['constraint']} ({constraint['matchCount']} matches, {constraint['score']})", file=file)
+        for match in constraint['matches']:
+            print(f"    {match['score']}: {', '.join(match['justifications'])}", file=file)
+        if constraint['matchCount'] > len(constraint['matches']):
+            print(f"    ... {constraint['matchCount'] - len(constraint['matches'])} more", file=file)
+
+
+class ProbedLambda:
+    """
+    A lambda timed by ConstraintProfiler. Not being a function, the solver
+    cannot translate it to Java and calls it as Python code, so the counters
+    it updates are the profiler's. update_wrapper keeps the lambda's
+    signature, the solver tells its arity from it.
+    """
+
+    def __init__(self, profiler, name, function):
+        functools.update_wrapper(self, function)
+        self.profiler = profiler
+        self.name = name
+        self.function = function
+
+    def __call__(self, *args):
+        start = time.perf_counter()
+        try:
+            return self.function(*args)
+        finally:
+            self.profiler.seconds[self.name] += time.perf_counter() - start
+            self.profiler.calls[self.name] += 1
+
+
+class ConstraintProfiler:
+
+    def __init__(self):
+        self.enabled = False
+        self.calls = {}
+        self.seconds = {}
+
+    def probe(self, name, function):
+        if not self.enabled:
+            return function
+        self.calls.setdefault(name, 0)
+        self.seconds.setdefault(name, 0.0)
+        return ProbedLambda(self, name, function)
+
+    def reset(self):
+        for name in self.calls:
+            self.calls[name] = 0
+            self.seconds[name] = 0.0
+
+    def report(self):
+        """Lambdas by decreasing time spent"""
+        return sorted(({'lambda': name,
+                        'calls': self.calls[name],
+                        'seconds': self.seconds[name],
+                        'microsecondsPerCall': 1e6 * self.seconds[name] / self.calls[name] if self.calls[name] > 0 else 0}
+                       for name in self.calls), key=lambda row: -row['seconds'])
+
+    def print_report(self, file=sys.stderr):
+        print('lambda;calls;seconds;microsecondsPerCall', file=file)
+        for row in self.report():
+            print(f"{row['lambda']};{row['calls']};{row['seconds']:.3f};{row['microsecondsPerCall']:.1f}", file=file)
@@ -0,0 +1,346 @@
+"""
+On-disk cache of team planning solutions, keyed by a hash of the normalized
+problem. It is only used with --cache-dir.
+
+The key covers what the solution depends on: work days, team members with
+their days off and capacities, epics with their workloads, the problem's solver
+settings, the parsed solving options of the command line, the content of a warm
+start solution and the source of the solver modules (SOURCE_FILES). Titles,
+file names, member and epic order and output options are left out, so that
+re-rendering a plan in another format is a cache hit.
+
+An entry is a JSON file <key>.json holding the score, the assignments (as the
+json output), every item in id order with its assignment, the member names in
+id order and the normalized problem. Only feasible solutions of solves that
+were not interrupted are kept. Reading an entry refreshes its modification
+time; entries older than --cache-max-age days are evicted, then the least
+recently used ones until the cache fits in --cache-max-size MB.
+
+team_planning_solver.py prints a cached solution of a json problem before
+starting the JVM. With --cache-warm-start, a problem missing from the cache
+starts from the cached solution of the most similar problem: its assignments
+that are still valid are pinned, as with --warm-start without a window.
+"""
+import hashlib
+import json
+import os
+import sys
+import time
+import types
+from datetime import date
+
+from outputs import parse_formats, write_outputs, print_outputs
+from problem_schema import migrate, check_problem, work_day_ordinals, content_units_per_day, \
+    member_capacity_per_day, workload_items
+
+
+# Constraints, expansion of workloads into items, phases, termination and the
+# entries themselves: any change to these makes new keys
+SOURCE_FILES = ['team_planning_solver.py', 'team_planning_arguments.py', 'problem_schema.py', 'phases.py',
+                'termination.py', 'decomposition.py', 'solution_cache.py']
+DEFAULT_MAX_SIZE_MB = 256
+DEFAULT_MAX_AGE_DAYS = 30
+# Problems sharing less than this part of their members and workloads are not warm started from each other
+MIN_SIMILARITY = 0.5
+# Arguments changing what is printed or written, not the solution
+OUTPUT_ARGUMENTS = {
+    'formats', 'output_dir', 'progress', 'snapshot_dir', 'explain', 'explain_matches', 'explain_output',
+    'profile_constraints', 'skip_capacity_checks', 'refresh_cache', 'cache_dir', 'cache_max_size', 'cache_max_age',
+    'cache_warm_start'
+}
+
+
+def add_cache_arguments(parser):
+    parser.add_argument('--cache-dir', help='solution cache directory, solutions are only cached with it')
+    parser.add_argument('--refresh-cache', action='store_true', help='solve again and replace the cached solution')
+    parser.add_argument('--cache-max-size', type=float, help=f"MB kept in the cache, defaults to {DEFAULT_MAX_SIZE_MB}")
+    parser.add_argument('--cache-max-age', type=float, help=f"days an entry is kept, defaults to {DEFAULT_MAX_AGE_DAYS}")
+    parser.add_argument('--cache-warm-start', action='store_true',
+                        help='start from the cached solution of the most similar problem when not cached')
+
+
+def source_digest():
+    digest = hashlib.sha256()
+    directory = os.path.dirname(os.path.abspath(__file__))
+    for file_name in SOURCE_FILES:
+        with open(os.path.join(directory, file_name), 'rb') as file:
+            digest.update(file.read())
+    return digest.hexdigest()
+
+
+def normalized_problem(problem_content):
+    """What the solution of a checked problem depends on, in a canonical order"""
+    work_day_range = problem_content['workDayRange']
+    work_days = work_day_ordinals(date.fromisoformat(work_day_range['begin']).toordinal(),
+                                  date.fromisoformat(work_day_range['end']).toordinal(),
+                                  set(date.fromisoformat(day).toordinal() for day in work_day_range['teamDaysOff']))
+    work_day_set = set(work_days)
+    units = content_units_per_day(problem_content)
+    team_members = [{
+        'name': team_member['name'],
+        'profile': team_member['profile'],
+        'product': team_member['product'],
+        # Days off outside the work days change nothing
+        'daysOff': sorted(day for day in team_member['daysOff'] if date.fromisoformat(day).toordinal() in work_day_set),
+        'capacity': member_capacity_per_day(team_member, work_days, units)
+    } for team_member in problem_content['teamMembers']]
+    epics = [{
+        'name': epic['name'],
+        'product': epic['product'],
+        'priority': epic.get('priority', 10),
+        'startDate': epic.get('startDate'),
+        'deadLine': epic.get('deadLine'),
+        'workloads': {profile: workload_items(workload, units) for profile, workload in epic['workloads'].items()
+                      if workload_items(workload, units) > 0}
+    } for epic in problem_content['epics']]
+    return {
+        'workDays': [date.fromordinal(ordinal).isoformat() for ordinal in work_days],
+        'teamMembers': sorted(team_members, key=lambda team_member: team_member['name']),
+        'epics': sorted(epics, key=lambda epic: epic['name'])
+    }
+
+
+def problem_key(problem_content, arguments):
+    solver_settings = dict(problem_content.get('solver', {}))
+    warm_start = dict(solver_settings.get('warmStart', {}))
+    # The warm start solution counts by its content, not by where it is
+    warm_start_path = arguments.warm_start or warm_start.pop('solution', None)
+    if len(warm_start) > 0:
+        solver_settings['warmStart'] = warm_start
+    else:
+        solver_settings.pop('warmStart', None)
+    canonical = json.dumps({
+        'sources': source_digest(),
+        'problem': normalized_problem(problem_content),
+        'solver': solver_settings,
+        # Parsed, whatever their order and spelling on the command line
+        'options': {name: value for name, value in vars(arguments).items()
+                    if name not in OUTPUT_ARGUMENTS | {'source', 'source_arguments', 'warm_start'}},
+        'warmStart': None if warm_start_path is None else file_digest(warm_start_path)
+    }, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def file_digest(file_path):
+    try:
+        with open(file_path, 'rb') as file:
+            return hashlib.sha256(file.read()).hexdigest()
+    except OSError:
+        # Reported by the solver when it reads the file
+        return file_path
+
+
+def similarity(problem, other):
+    # Shared part of the members and workloads of two normalized problems
+    def facts(normalized):
+        return set([('member', team_member['name'], team_member['profile'], team_member['product'])
+                    for team_member in normalized['teamMembers']]
+                   + [('workload', epic['name'], profile, workload)
+                      for epic in normalized['epics'] for profile, workload in epic['workloads'].items()])
+    facts_a, facts_b = facts(problem), facts(other)
+    union = facts_a | facts_b
+    return len(facts_a & facts_b) / len(union) if len(union) > 0 else 1
+
+
+class SolutionCache:
+
+    def __init__(self, directory, max_size_mb=DEFAULT_MAX_SIZE_MB, max_age_days=DEFAULT_MAX_AGE_DAYS):
+        self.directory = directory
+        self.max_bytes = max_size_mb * 1024 * 1024
+        self.max_age_seconds = max_age_days * 24 * 3600
+
+    def entry_path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def entry_paths(self):
+        if not os.path.isdir(self.directory):
+            return []
+        return [os.path.join(self.directory, file_name) for file_name in os.listdir(self.directory)
+                if file_name.endswith('.json')]
+
+    @staticmethod
+    def read_entry(file_path):
+        try:
+            with open(file_path, 'r') as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            # Evicted meanwhile or half written by a crashed run
+            return None
+
+    def get(self, key):
+        file_path = self.entry_path(key)
+        if not os.path.exists(file_path) or time.time() - os.path.getmtime(file_path) > self.max_age_seconds:
+            return None
+        entry = self.read_entry(file_path)
+        if entry is not None:
+            # Least recently used entries are evicted first
+            os.utime(file_path)
+        return entry
+
+    def put(self, key, entry):
+        # An infeasible solution is not an answer to serve again
+        if entry['hard'] < 0:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        # Written aside then renamed, a concurrent reader never sees a half written entry
+        temporary_path = f"{self.entry_path(key)}.{os.getpid()}.tmp"
+        with open(temporary_path, 'w') as file:
+            file.write(json.dumps(entry))
+        os.replace(temporary_path, self.entry_path(key))
+        self.evict()
+
+    def evict(self):
+        now = time.time()
+        entries = []
+        for file_path in self.entry_paths():
+            try:
+                modified, size = os.path.getmtime(file_path), os.path.getsize(file_path)
+            except OSError:
+                continue
+            if now - modified > self.max_age_seconds:
+                self.remove(file_path)
+            else:
+                entries.append((modified, size, file_path))
+        total_size = sum(size for modified, size, file_path in entries)
+        for modified, size, file_path in sorted(entries):
+            if total_size <= self.max_bytes:
+                break
+            self.remove(file_path)
+            total_size = total_size - size
+
+    @staticmethod
+    def remove(file_path):
+        try:
+            os.remove(file_path)
+        except OSError:
+            pass
+
+    def closest(self, problem):
+        """Entry of the most similar normalized problem, None when none is similar enough"""
+        best, best_similarity = None, MIN_SIMILARITY
+        now = time.time()
+        for file_path in self.entry_paths():
+            try:
+                if now - os.path.getmtime(file_path) > self.max_age_seconds:
+                    continue
+            except OSError:
+                continue
+            entry = self.read_entry(file_path)
+            if entry is None or 'problem' not in entry:
+                continue
+            entry_similarity = similarity(problem, entry['problem'])
+            if entry_similarity >= best_similarity:
+                best, best_similarity = entry, entry_similarity
+        return best
+
+
+def open_solution_cache(arguments):
+    """Solution cache of the command line arguments, None without --cache-dir"""
+    if arguments is None or arguments.cache_dir is None:
+        return None
+    return SolutionCache(arguments.cache_dir,
+                         float(arguments.cache_max_size or DEFAULT_MAX_SIZE_MB),
+                         float(arguments.cache_max_age or DEFAULT_MAX_AGE_DAYS))
+
+
+def cache_entry(problem_content, score, hard, soft, solution):
+    return {
+        'createdAt': time.time(),
+        'score': score,
+        'hard': hard,
+        'soft': soft,
+        'assignments': solution.to_json()['assignments'],
+        # Unassigned ones included, cached outputs number items and members as the solve did
+        'items': [{
+            'date': None if item.work_day is None else item.work_day.date.isoformat(),
+            'product': item.product,
+            'epicName': item.epic,
+            'profile': item.profile,
+            'teamMember': None if item.team_member is None else item.team_member.name
+        } for item in sorted(solution.planning_items, key=lambda item: item.id)],
+        'teamMembers': [team_member.name for team_member in sorted(solution.team_members, key=lambda m: m.id)],
+        'problem': normalized_problem(problem_content)
+    }
+
+
+class CachedReport:
+    """Stands for the TerminationReport of a solution read from the cache"""
+
+    def __init__(self, key):
+        self.key = key
+
+    def elapsed(self):
+        return 0
+
+    def reasons(self, score):
+        return [f"cached solution {self.key[:12]}"]
+
+    def summary(self, score):
+        return f"Served from the solution cache: {self.reasons(score)[0]}, --refresh-cache to solve again"
+
+
+class CachedPlanning:
+    """
+    Stand-in for TeamPlanning built from cached assignments, enough for the
+    outputs without starting the solver
+    """
+
+    def __init__(self, entry):
+        self.entry = entry
+        self.team_members = [types.SimpleNamespace(id=team_member_id, name=name)
+                             for team_member_id, name in enumerate(entry['teamMembers'])]
+        team_members = {team_member.name: team_member for team_member in self.team_members}
+        work_days = {}
+        self.planning_items = []
+        for cached_item in entry['items']:
+            work_day = None
+            if cached_item['date'] is not None:
+                work_day = work_days.get(cached_item['date'])
+                if work_day is None:
+                    work_day_date = date.fromisoformat(cached_item['date'])
+                    work_day = work_days[cached_item['date']] = types.SimpleNamespace(
+                        date=work_day_date, ordinal=work_day_date.toordinal())
+            self.planning_items.append(types.SimpleNamespace(
+                id=len(self.planning_items), epic=cached_item['epicName'], product=cached_item['product'],
+                profile=cached_item['profile'], work_day=work_day, team_member=team_members.get(cached_item['teamMember'])))
+
+    def to_json(self):
+        return {'score': self.entry['score'], 'assignments': self.entry['assignments']}
+
+
+def print_cached_solution(arguments):
+    """
+    Prints or writes the outputs of a cached solution of a json problem without
+    starting the JVM. False when the solver is needed.
+    """
+    if arguments.source != 'json' or len(arguments.source_arguments) != 1 \
+            or arguments.explain or arguments.explain_output is not None or arguments.profile_constraints:
+        return False
+    cache = open_solution_cache(arguments)
+    if cache is None or arguments.refresh_cache:
+        return False
+    file_path = arguments.source_arguments[0]
+    try:
+        with open(file_path, 'r') as file:
+            problem_content, changes = migrate(json.load(file))
+        check_problem(problem_content, capacity_checks=False)
+        formats = parse_formats(arguments.formats)
+    except (OSError, ValueError):
+        # Reported by the solver
+        return False
+    key = problem_key(problem_content, arguments)
+    entry = cache.get(key)
+    if entry is None:
+        return False
+
+    solution = CachedPlanning(entry)
+    print(f"Final score : {entry['score']}", file=sys.stderr)
+    print(CachedReport(key).summary(entry['score']), file=sys.stderr)
+    if arguments.output_dir is not None:
+        os.makedirs(arguments.output_dir, exist_ok=True)
+        name = os.path.splitext(os.path.basename(file_path))[0]
+        for file_path in write_outputs(solution, problem_content['title'], formats, arguments.output_dir, name):
+            print(f"Written {file_path}", file=sys.stderr)
+    else:
+        print_outputs(sys.stdout, solution, problem_content['title'], formats)
+    return True
@@ -0,0 +1,42 @@
+"""
+Command line of team_planning_solver.py. Parsing it does not start the JVM,
+so that a cached solution can be served before, see solution_cache.py.
+"""
+import argparse
+
+from termination import add_termination_arguments
+from phases import add_phase_arguments
+from progress import add_progress_arguments
+from outputs import add_output_arguments
+from decomposition import add_decomposition_arguments
+from solution_cache import add_cache_arguments
+
+
+ENVIRONMENT_MODES = ['REPRODUCIBLE', 'NON_REPRODUCIBLE', 'FAST_ASSERT', 'NON_INTRUSIVE_FULL_ASSERT', 'FULL_ASSERT']
+
+
+def parse_arguments(args):
+    parser = argparse.ArgumentParser(description='Solves a team planning problem')
+    parser.add_argument('source', choices=['json', 'azureDevOps'], help='where the problem is loaded from')
+    parser.add_argument('source_arguments', nargs='+',
+                        help='json: <file>, azureDevOps: <file with an azureDevOps section> [<personal access token>]')
+    add_termination_arguments(parser)
+    add_phase_arguments(parser)
+    add_progress_arguments(parser)
+    add_output_arguments(parser)
+    add_decomposition_arguments(parser)
+    add_cache_arguments(parser)
+    parser.add_argument('--explain', action='store_true', help='print the score of every constraint and its worst matches')
+    parser.add_argument('--explain-matches', type=int, default=10, help='matches listed per constraint by --explain')
+    parser.add_argument('--explain-output', help='write the score explanation as JSON to this file')
+    parser.add_argument('--profile-constraints', action='store_true',
+                        help='time every constraint lambda, slows solving down')
+    parser.add_argument('--skip-capacity-checks', action='store_true',
+                        help='solve even when demand cannot fit the eligible capacity')
+    parser.add_argument('--move-thread-count', help='solver threads evaluating moves: NONE, AUTO or a number')
+    parser.add_argument('--environment-mode', choices=ENVIRONMENT_MODES,
+                        help='FAST_ASSERT or FULL_ASSERT check every incremental score against a full calculation')
+    parser.add_argument('--warm-start', help='previous solution (csv, json, npz or parquet output) used as initial assignment')
+    parser.add_argument('--changed-from', help='first day (YYYY-MM-DD) of the window the solver may re-plan')
+    parser.add_argument('--changed-to', help='last day (YYYY-MM-DD) of the window the solver may re-plan')
+    return parser.parse_args(args[1:])
@@ -0,0 +1,92 @@
+"""
+Solves every team planning problem of a directory, several at a time.
+
+Usage: python team_planning_batch.py <directory> [--parallel-scenarios N] [--output-dir DIR] [solver options ...]
+
+Each worker process starts its own JVM once and keeps its solver factories
+between scenarios. Solver options (--preset, --spent-limit, --formats, ...) are
+passed to every scenario and checked before any is started. Per-scenario outputs are written to the output
+directory and a summary table is printed at the end.
+"""
+import argparse
+import contextlib
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from team_planning_arguments import parse_arguments
+
+
+# Solver factories of the current worker process, shared by its scenarios
+solver_factories = {}
+
+
+def solve_scenario(file_path, solver_arguments, output_directory):
+    # Imported here so that only worker processes start a JVM
+    from team_planning_solver import PlanningProblem
+    from outputs import write_outputs
+
+    name = os.path.splitext(os.path.basename(file_path))[0]
+    start = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(sys.stderr):
+            problem = PlanningProblem([sys.argv[0], 'json', file_path] + solver_arguments)
+            problem.solver_factories = solver_factories
+            solution = problem.solve()
+
+        write_outputs(solution, problem.title, problem.output_formats(), output_directory, name)
+        return {
+            'scenario': name,
+            'score': solution.score.toString() if solution.score is not None else 'N/A',
+            'seconds': time.perf_counter() - start,
+            'termination': ', '.join(problem.termination_report.reasons(solution.score))
+        }
+    except (Exception, SystemExit) as e:
+        # argparse exits on invalid options
+        return {
+            'scenario': name,
+            'score': 'ERROR',
+            'seconds': time.perf_counter() - start,
+            'termination': f"exited with code {e.code}" if isinstance(e, SystemExit) else str(e)
+        }
+
+
+def print_summary(results):
+    print('scenario;score;seconds;termination')
+    for result in sorted(results, key=lambda result: result['scenario']):
+        print(f"{result['scenario']};{result['score']};{result['seconds']:.1f};{result['termination']}")
+
+
+def main(args):
+    parser = argparse.ArgumentParser(description='Solves all team planning problems of a directory')
+    parser.add_argument('directory', help='directory containing the problem JSON files')
+    # Not --workers, which the solver options use for --decompose
+    parser.add_argument('--parallel-scenarios', type=int, default=os.cpu_count(), help='number of scenarios solved at once')
+    parser.add_argument('--output-dir', help='where outputs are written, defaults to <directory>/solutions')
+    arguments, solver_arguments = parser.parse_known_args(args[1:])
+    # Invalid solver options fail here once rather than in every worker
+    parse_arguments([args[0], 'json', arguments.directory] + solver_arguments)
+
+    output_directory = arguments.output_dir or os.path.join(arguments.directory, 'solutions')
+    os.makedirs(output_directory, exist_ok=True)
+    file_paths = sorted(os.path.join(arguments.directory, file_name)
+                        for file_name in os.listdir(arguments.directory) if file_name.endswith('.json'))
+
+    # Forking a process that may hold a JVM is unsafe, workers start fresh
+    context = multiprocessing.get_context('spawn')
+    results = []
+    with ProcessPoolExecutor(max_workers=arguments.parallel_scenarios, mp_context=context) as executor:
+        futures = [executor.submit(solve_scenario, file_path, solver_arguments, output_directory)
+                   for file_path in file_paths]
+        for future in as_completed(futures):
+            result = future.result()
+            print(f"{result['scenario']} done: {result['score']}", file=sys.stderr)
+            results.append(result)
+
+    print_summary(results)
+
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -0,0 +1,118 @@
+"""
+Benchmarks solver configurations on generated team planning problems of
+increasing size.
+
+Usage:
+    python team_planning_benchmark.py [--sizes 5x10,15x40,30x120] \
+        [--config default=] [--config fast="--preset fast-feasible"] [--output report.json]
+
+Sizes are <members>x<epics>; a configuration is a name and the command line
+options of team_planning_solver.py. Every run happens in a fresh process so that
+timings and peak memory are not shared between runs. The report records the
+score over time, score calculations per second, time to feasibility and peak
+memory of every run.
+"""
+import argparse
+import contextlib
+import json
+import multiprocessing
+import resource
+import shlex
+import sys
+import time
+
+from team_planning_generator import generate_problem
+
+
+def peak_memory_mb():
+    # ru_maxrss is in kilobytes on Linux, includes the JVM heap
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_case(problem_content, options):
+    # Imported here so that the JVM starts in the benchmark process
+    from team_planning_solver import PlanningProblem, parse_arguments
+
+    problem = PlanningProblem()
+    problem.arguments = parse_arguments([sys.argv[0], 'json', '<generated>'] + options)
+    problem.load_from_content(problem_content)
+
+    score_over_time = []
+    def best_solution_changed(event):
+        score = event.getNewBestScore()
+        score_over_time.append({
+            'seconds': time.perf_counter() - problem.termination_report.start_time,
+            'score': score.toString(),
+            'hard': score.getHardScore(),
+            'soft': score.getSoftScore(),
+            'initialized': score.isSolutionInitialized()
+        })
+    problem.solver_event_listeners.append(best_solution_changed)
+
+    with contextlib.redirect_stdout(sys.stderr):
+        solution = problem.solve()
+    feasible = [point['seconds'] for point in score_over_time if point['initialized'] and point['hard'] >= 0]
+    return {
+        'items': len(problem.planning_items),
+        'score': solution.score.toString(),
+        'startupSeconds': problem.timings.get('startup'),
+        'solveSeconds': problem.timings['solve'],
+        'scoreCalculationCount': problem.score_calculation_count,
+        # Not counted by decomposed solves
+        'scoreCalculationsPerSecond': None if problem.score_calculation_count is None
+        else problem.score_calculation_count / problem.timings['solve'],
+        'secondsToFeasible': feasible[0] if len(feasible) > 0 else None,
+        'peakMemoryMB': peak_memory_mb(),
+        'termination': problem.termination_report.reasons(solution.score),
+        'scoreOverTime': score_over_time
+    }
+
+
+def parse_size(size):
+    members, epics = size.split('x')
+    return int(members), int(epics)
+
+
+def parse_config(config):
+    name, _, options = config.partition('=')
+    return name, shlex.split(options)
+
+
+def print_report(results):
+    print('size;config;items;score;secondsToFeasible;scoreCalculationsPerSecond;peakMemoryMB')
+    for result in results:
+        seconds_to_feasible = 'N/A' if result['secondsToFeasible'] is None else f"{result['secondsToFeasible']:.2f}"
+        speed = 'N/A' if result['scoreCalculationsPerSecond'] is None else int(result['scoreCalculationsPerSecond'])
+        print(f"{result['size']};{result['config']};{result['items']};{result['score']};{seconds_to_feasible};"
+              f"{speed};{int(result['peakMemoryMB'])}")
+
+
+def main(args):
+    parser = argparse.ArgumentParser(description='Benchmarks solver configurations on generated problems')
+    parser.add_argument('--sizes', default='5x10,15x40,30x120', help='comma separated <members>x<epics> sizes')
+    parser.add_argument('--config', action='append', help='<name>=<solver options>, can be repeated')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='JSON report with the score over time of every run')
+    arguments = parser.parse_args(args[1:])
+
+    configs = [parse_config(config) for config in (arguments.config or ['default='])]
+    results = []
+    # One fresh process per run, see peak_memory_mb
+    with multiprocessing.get_context('spawn').Pool(1, maxtasksperchild=1) as pool:
+        for size in arguments.sizes.split(','):
+            members, epics = parse_size(size)
+            problem_content = generate_problem(members=members, epics=epics, seed=arguments.seed)
+            for name, options in configs:
+                print(f"Running {name} on {size} ...", file=sys.stderr)
+                result = pool.apply(run_case, (problem_content, options))
+                result.update({'size': size, 'config': name, 'options': options})
+                results.append(result)
+
+    print_report(results)
+    if arguments.output is not None:
+        with open(arguments.output, 'w') as file:
+            file.write(json.dumps(results, indent=4))
+
+
+if __name__ == '__main__':
+    main(sys.argv)
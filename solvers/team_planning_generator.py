@@ -0,0 +1,156 @@
+"""
+Generates synthetic team planning problems in the format loaded by
+team_planning_solver.py.
+
+Usage: python team_planning_generator.py [--members 15] [--epics 40] ... [--output problem.json]
+"""
+import argparse
+import json
+import random
+import sys
+from datetime import date, timedelta
+
+
+def generate_problem(
+        members=15,
+        profiles=3,
+        products=4,
+        epics=40,
+        min_workload=2,
+        max_workload=20,
+        wildcard_rate=0.2,
+        days_off_rate=0.05,
+        team_days_off=5,
+        deadline_rate=0.3,
+        load=0.8,
+        begin=date(2024, 1, 1),
+        seed=0):
+    randomizer = random.Random(seed)
+    profile_names = [f"Profile{index}" for index in range(profiles)]
+    product_names = [f"Product{index}" for index in range(products)]
+
+    # Epics first, as the work day range is sized from the demand
+    epic_defs = []
+    demand = 0
+    for index in range(epics):
+        epic_profiles = randomizer.sample(profile_names, randomizer.randint(1, profiles))
+        workloads = {profile: randomizer.randint(min_workload, max_workload) for profile in epic_profiles}
+        demand = demand + sum(workloads.values())
+        epic_defs.append({
+            'name': f"Epic{index}",
+            'product': randomizer.choice(product_names),
+            'priority': randomizer.randint(0, 10),
+            'workloads': workloads
+        })
+
+    member_defs = []
+    for index in range(members):
+        # The first members cover every profile for every product, so every
+        # workload has at least one eligible member
+        if index < profiles:
+            member_defs.append((profile_names[index], '*'))
+        else:
+            profile = randomizer.choice(profile_names)
+            product = '*' if randomizer.random() < wildcard_rate else randomizer.choice(product_names)
+            member_defs.append((profile, product))
+
+    # Work days needed for the eligible members of the busiest profile and
+    # product to cover its demand at the given load
+    demand_per_workload = {}
+    for epic_def in epic_defs:
+        for profile, workload in epic_def['workloads'].items():
+            key = (profile, epic_def['product'])
+            demand_per_workload[key] = demand_per_workload.get(key, 0) + workload
+    needed_days = demand / members
+    # With fewer members than profiles some workloads have nobody eligible
+    for (profile, product), workload in demand_per_workload.items():
+        eligible = sum(1 for member_profile, member_product in member_defs
+                       if member_profile == profile and member_product in (product, '*'))
+        if eligible > 0:
+            needed_days = max(needed_days, workload / eligible)
+    for profile in profile_names:
+        workload = sum(days for (demand_profile, product), days in demand_per_workload.items() if demand_profile == profile)
+        eligible = sum(1 for member_profile, member_product in member_defs if member_profile == profile)
+        if eligible > 0:
+            needed_days = max(needed_days, workload / eligible)
+    work_day_count = max(1, int(needed_days / (load * (1 - days_off_rate))) + 1)
+    calendar_days = int(work_day_count * 7 / 5) + team_days_off + 7
+    end = begin + timedelta(days=calendar_days)
+    calendar = [begin + timedelta(days=offset) for offset in range(calendar_days + 1)]
+    weekdays = [day for day in calendar if day.isoweekday() < 6]
+    team_days_off_list = sorted(randomizer.sample(weekdays, min(team_days_off, len(weekdays))))
+
+    team_member_defs = []
+    for index, (profile, product) in enumerate(member_defs):
+        days_off = sorted(day for day in weekdays if randomizer.random() < days_off_rate)
+        team_member_defs.append({
+            'name': f"Member{index}",
+            'profile': profile,
+            'product': product,
+            'daysOff': [day.isoformat() for day in days_off]
+        })
+
+    for epic_def in epic_defs:
+        if randomizer.random() < deadline_rate:
+            # Somewhere in the second half of the range
+            dead_line = begin + timedelta(days=randomizer.randint(calendar_days // 2, calendar_days))
+            epic_def['deadLine'] = dead_line.isoformat()
+
+    return {
+        'version': 1,
+        'title': f"Generated {members} members {epics} epics (seed {seed})",
+        'teamMembers': team_member_defs,
+        'workDayRange': {
+            'begin': begin.isoformat(),
+            'end': end.isoformat(),
+            'teamDaysOff': [day.isoformat() for day in team_days_off_list]
+        },
+        'epics': epic_defs
+    }
+
+
+def add_generator_arguments(parser):
+    parser.add_argument('--members', type=int, default=15)
+    parser.add_argument('--profiles', type=int, default=3)
+    parser.add_argument('--products', type=int, default=4)
+    parser.add_argument('--epics', type=int, default=40)
+    parser.add_argument('--min-workload', type=int, default=2, help='smallest workload of a profile, in days')
+    parser.add_argument('--max-workload', type=int, default=20, help='largest workload of a profile, in days')
+    parser.add_argument('--wildcard-rate', type=float, default=0.2, help='share of members working on any product')
+    parser.add_argument('--days-off-rate', type=float, default=0.05, help='share of days off per member')
+    parser.add_argument('--team-days-off', type=int, default=5, help='number of public holidays')
+    parser.add_argument('--deadline-rate', type=float, default=0.3, help='share of epics with a deadline')
+    parser.add_argument('--load', type=float, default=0.8, help='demand / capacity ratio of the work day range')
+    parser.add_argument('--begin', default='2024-01-01', help='first day of the work day range')
+    parser.add_argument('--seed', type=int, default=0)
+
+
+def generate_problem_from_arguments(arguments):
+    return generate_problem(
+        members=arguments.members,
+        profiles=arguments.profiles,
+        products=arguments.products,
+        epics=arguments.epics,
+        min_workload=arguments.min_workload,
+        max_workload=arguments.max_workload,
+        wildcard_rate=arguments.wildcard_rate,
+        days_off_rate=arguments.days_off_rate,
+        team_days_off=arguments.team_days_off,
+        deadline_rate=arguments.deadline_rate,
+        load=arguments.load,
+        begin=date.fromisoformat(arguments.begin),
+        seed=arguments.seed)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generates a synthetic team planning problem')
+    add_generator_arguments(parser)
+    parser.add_argument('--output', help='file to write, defaults to stdout')
+    arguments = parser.parse_args(sys.argv[1:])
+
+    problem_content = generate_problem_from_arguments(arguments)
+    if arguments.output is None:
+        print(json.dumps(problem_content, indent=4))
+    else:
+        with open(arguments.output, 'w') as file:
+            file.write(json.dumps(problem_content, indent=4))
@@ -0,0 +1,109 @@
+"""
+Long-running team planning solver: the JVM, the generated domain classes and
+the solver factories are built once and reused by every request.
+
+Usage:
+    python team_planning_server.py stdin
+        reads one JSON request per line on stdin, writes one JSON response per line
+    python team_planning_server.py http [--port 8080]
+        POST /solve with a JSON request body
+
+A request is either a problem, as in team-planning-problems/, or
+{"problem": {...}, "options": ["--preset", "fast-feasible", ...]} where options
+are the command line options of team_planning_solver.py.
+"""
+import argparse
+import contextlib
+import json
+import sys
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+start = time.perf_counter()
+from team_planning_solver import PlanningProblem, parse_arguments
+jvm_startup = time.perf_counter() - start
+
+
+# Solver factories kept warm between requests
+solver_factories = {}
+
+
+def solve_request(request):
+    start = time.perf_counter()
+    problem_content = request.get('problem', request)
+    options = request.get('options', [])
+
+    problem = PlanningProblem()
+    problem.arguments = parse_arguments([sys.argv[0], 'json', '<request>'] + options)
+    problem.load_from_content(problem_content)
+    problem.solver_factories = solver_factories
+    load = time.perf_counter() - start
+
+    # Keep stdout for responses
+    with contextlib.redirect_stdout(sys.stderr):
+        solution = problem.solve()
+    response = solution.to_json()
+    response['title'] = problem.title
+    response['termination'] = problem.termination_report.reasons(solution.score)
+    response['timings'] = {
+        'load': load,
+        'startup': problem.timings.get('startup'),
+        'solve': problem.timings['solve'],
+        'total': time.perf_counter() - start
+    }
+    return response
+
+
+def error_response(e):
+    return {'error': f"{type(e).__name__}: {e}"}
+
+
+def serve_stdin():
+    for line in sys.stdin:
+        if len(line.strip()) == 0:
+            continue
+        try:
+            response = solve_request(json.loads(line))
+        except (Exception, SystemExit) as e:
+            response = error_response(e)
+        sys.stdout.write(json.dumps(response) + '\n')
+        sys.stdout.flush()
+
+
+class SolveRequestHandler(BaseHTTPRequestHandler):
+
+    def do_POST(self):
+        if self.path != '/solve':
+            self.send_error(404)
+            return
+        try:
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            status, response = 200, solve_request(json.loads(body))
+        except (Exception, SystemExit) as e:
+            status, response = 400, error_response(e)
+
+        content = json.dumps(response).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+
+def serve_http(port):
+    server = HTTPServer(('', port), SolveRequestHandler)
+    print(f"Listening on port {port}", file=sys.stderr)
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serves team planning solve requests from a warm solver')
+    parser.add_argument('mode', choices=['stdin', 'http'])
+    parser.add_argument('--port', type=int, default=8080)
+    arguments = parser.parse_args(sys.argv[1:])
+
+    print(f"JVM and domain classes ready in {jvm_startup:.1f}s", file=sys.stderr)
+    if arguments.mode == 'stdin':
+        serve_stdin()
+    else:
+        serve_http(arguments.port)
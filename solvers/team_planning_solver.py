@@ -1,30 +1,56 @@
-from datetime import date, timedelta
+from collections import deque
+from datetime import date
+import bisect
 import json
+import os
+import signal
 import sys
+import time
 import logging
+
+from team_planning_arguments import ENVIRONMENT_MODES, parse_arguments
+from solution_cache import print_cached_solution
+
+# A cached solution is printed without starting the JVM, see solution_cache.py
+if __name__ == '__main__' and print_cached_solution(parse_arguments(sys.argv)):
+    sys.exit(0)
+
 from optapy import problem_fact, \
                     planning_id, \
+                    planning_pin, \
                     planning_entity, \
                     planning_variable, \
-                    inverse_relation_shadow_variable, \
                     constraint_provider, \
                     planning_solution, \
                     problem_fact_collection_property, \
                     value_range_provider, \
                     planning_entity_collection_property, \
                     planning_score, \
+                    incremental_score_calculator, \
+                    score_manager_create, \
                     solver_manager_create, \
                     solver_factory_create
 
-from optapy.types import Joiners, HardSoftScore, SolverConfig, Duration
+from optapy.types import Joiners, ConstraintCollectors, HardSoftScore, SolverConfig
+import optapy.config
 
-from azure.devops.connection import Connection
-from msrest.authentication import BasicAuthentication
+from azure_devops_loader import load_epics
+from decomposition import solve_decomposed
+from problem_schema import SCHEMA_VERSION, ProblemError, migrate, check_problem, content_units_per_day, \
+    member_capacity_per_day, workload_items
+from termination import termination_settings, apply_termination, TerminationReport
+from phases import solver_settings_with_preset, phase_settings, apply_phases
+from progress import open_progress_output, ProgressStream
+from outputs import parse_formats, write_output, write_outputs, print_outputs, Consolidation, \
+    read_assignments
+from score_analysis import score_analysis, print_score_analysis, ConstraintProfiler
+from solution_cache import open_solution_cache, problem_key, normalized_problem, \
+    cache_entry, CachedReport
 
 
 
 
-@planning_entity
+@problem_fact
 class WorkDay:
     def __init__(
             self,
@@ -32,7 +58,7 @@ class WorkDay:
             date):
         self.id = id
         self.date = date
-        self.planned_items = []
+        self.ordinal = None if date is None else date.toordinal()
         
     @planning_id
     def get_id(self):
@@ -51,17 +77,28 @@ class TeamMember:
             name,
             profile,
             product,
-            daysoff):
+            daysoff,
+            capacity):
         self.id = id
         self.name = name
         self.profile = profile
         self.product = product
         self.daysoff = daysoff
+        # Items the member can do on each work day, indexed by WorkDay.id
+        self.capacity = capacity
+        # Set by EligibilityIndex. optapy only translates the attributes the
+        # class itself assigns, so they are declared here
+        self.profile_mask = 0
+        self.product_mask = 0
+        self.workload_mask = 0
+        self.availability = None
+        self.available_rank = None
+        self.available_days = None
 
     @planning_id
     def get_id(self):
         return self.id
-    
+
     def get_name(self):
         return self.name
 
@@ -83,30 +120,53 @@ class PlanningItem:
             id,
             epic,
             priority,
+            start_date,
             dead_line,
             product,
             profile):
         self.id = id
         self.epic = epic
         self.priority = priority
+        self.start_date = start_date
         self.dead_line = dead_line
         self.product = product
         self.profile = profile
+        # Interned by EligibilityIndex
+        self.epic_id = None
+        self.product_id = None
+        self.profile_id = None
+        self.workload_id = None
         self.work_day = None
         self.team_member = None
+        self.pinned = False
+        # Value ranges shared by the items of the same workload and window, see EligibilityIndex
+        self.eligible_team_members = None
+        self.allowed_work_days = None
 
     @planning_id
     def get_id(self):
         return self.id
 
-    @planning_variable(WorkDay, value_range_provider_refs=["WorkDays"])
+    @planning_pin
+    def is_pinned(self):
+        return self.pinned
+
+    @value_range_provider("AllowedWorkDays", value_range_type=WorkDay)
+    def get_allowed_work_days(self):
+        return self.allowed_work_days
+
+    @value_range_provider("EligibleTeamMembers", value_range_type=TeamMember)
+    def get_eligible_team_members(self):
+        return self.eligible_team_members
+
+    @planning_variable(WorkDay, value_range_provider_refs=["AllowedWorkDays"])
     def get_work_day(self):
         return self.work_day
 
     def set_work_day(self, new_work_day):
         self.work_day = new_work_day
 
-    @planning_variable(TeamMember, value_range_provider_refs=["TeamMembers"])
+    @planning_variable(TeamMember, value_range_provider_refs=["EligibleTeamMembers"])
     def get_team_member(self):
         return self.team_member
 
@@ -117,16 +177,106 @@ class PlanningItem:
         return f"PlanningItem(work_day={self.work_day}, team_member={self.team_member}, product={self.product}, profile={self.profile} )"
 
     def bad_profile_assignment(self):
-        return self.team_member.profile != '*' and self.team_member.profile != self.profile
+        return not (self.team_member.profile_mask >> self.profile_id) & 1
 
     def bad_product_assignment(self):
-        return self.team_member.product != '*' and self.team_member.product != self.product
+        return not (self.team_member.product_mask >> self.product_id) & 1
     
     def bad_day_assignment(self):
-        return self.work_day.date.isoformat() in self.team_member.daysoff
+        return not self.team_member.availability[self.work_day.id]
     
+    def start_date_fail(self):
+        return False if self.start_date is None else self.work_day.ordinal < self.start_date
+
     def dead_line_fail(self):
-        return False if self.dead_line is None else self.work_day.date.toordinal() > date.fromisoformat(self.dead_line).toordinal()
+        return False if self.dead_line is None else self.work_day.ordinal > self.dead_line
+
+
+@planning_entity
+class WorkloadBlock:
+    """
+    A whole epic/profile workload (or a chunk of it) done by one team member.
+    The block starts on start_day and covers the next `duration` days on which
+    that member is available, so days off are skipped rather than penalized.
+    """
+
+    def __init__(
+            self,
+            id,
+            epic,
+            priority,
+            start_date,
+            dead_line,
+            product,
+            profile,
+            duration):
+        self.id = id
+        self.epic = epic
+        self.priority = priority
+        self.start_date = start_date
+        self.dead_line = dead_line
+        self.product = product
+        self.profile = profile
+        # Interned by EligibilityIndex
+        self.epic_id = None
+        self.product_id = None
+        self.profile_id = None
+        self.workload_id = None
+        self.duration = duration
+        self.start_day = None
+        self.team_member = None
+
+    @planning_id
+    def get_id(self):
+        return self.id
+
+    @planning_variable(WorkDay, value_range_provider_refs=["WorkDays"])
+    def get_start_day(self):
+        return self.start_day
+
+    def set_start_day(self, new_start_day):
+        self.start_day = new_start_day
+
+    @planning_variable(TeamMember, value_range_provider_refs=["TeamMembers"])
+    def get_team_member(self):
+        return self.team_member
+
+    def set_team_member(self, new_team_member):
+        self.team_member = new_team_member
+
+    def __str__(self):
+        return f"WorkloadBlock(start_day={self.start_day}, duration={self.duration}, team_member={self.team_member}, product={self.product}, profile={self.profile} )"
+
+    def first_rank(self):
+        # Position of the start day among the member's available days
+        return self.team_member.available_rank[self.start_day.id]
+
+    def end_rank(self):
+        return self.first_rank() + self.duration
+
+    def missing_days(self):
+        return max(0, self.end_rank() - len(self.team_member.available_days))
+
+    def overlap(self, other):
+        return min(self.end_rank(), other.end_rank()) - max(self.first_rank(), other.first_rank())
+
+    def days(self):
+        return self.team_member.available_days[self.first_rank():self.end_rank()]
+
+    def bad_profile_assignment(self):
+        return not (self.team_member.profile_mask >> self.profile_id) & 1
+
+    def bad_product_assignment(self):
+        return not (self.team_member.product_mask >> self.product_id) & 1
+
+    def start_date_fail(self):
+        return False if self.start_date is None else self.start_day.ordinal < self.start_date
+
+    def dead_line_fail(self):
+        days = self.days()
+        if self.dead_line is None or len(days) == 0:
+            return False
+        return days[-1].ordinal > self.dead_line
 
 
 @planning_solution
@@ -159,75 +309,199 @@ class TeamPlanning:
         self.score = score
 
     def csv_output(self):
-        sorted_items = sorted(self.planning_items, key=lambda item: (item.product, item.epic))
-        print('date;product;epicName;profile;teamMember')
-        for item in sorted_items:
-            print(f"{item.work_day.date.isoformat()};{item.product};{item.epic};{item.profile};{item.team_member.name}")        
+        write_output(sys.stdout, 'csv', self, None)
+
+    def to_json(self):
+        return {
+            'score': self.score.toString() if self.score is not None else None,
+            'assignments': [{
+                'date': item.work_day.date.isoformat(),
+                'product': item.product,
+                'epicName': item.epic,
+                'profile': item.profile,
+                'teamMember': item.team_member.name
+            } for item in self.planning_items if item.work_day is not None and item.team_member is not None]
+        }
+
+    def json_output(self):
+        write_output(sys.stdout, 'json', self, None)
 
     def consolidate_planning_per_product(self):
-        sorted_items = sorted(self.planning_items, key=lambda item: (item.product, item.epic))
-        consolidated_planning = {}
-        for item in sorted_items:
-            # Update product
-            if item.product not in consolidated_planning.keys():
-                consolidated_planning[item.product] = {}
-            product_item = consolidated_planning[item.product]
-
-            # Update epic
-            if item.epic not in product_item:
-                product_item[item.epic] = {}
-            epic_item = product_item[item.epic]
-            if 'beginDate' not in epic_item or item.work_day.date.toordinal() < epic_item['beginDate'].toordinal():
-                epic_item['beginDate'] = item.work_day.date
-            if 'endDate' not in epic_item or item.work_day.date.toordinal() > epic_item['endDate'].toordinal():
-                epic_item['endDate'] = item.work_day.date
-
-        return consolidated_planning
-    
-    def mermaid_gantt_output_per_product_and_epic(self, title):
-        planning = self.consolidate_planning_per_product()
+        # product -> epic -> [first day, last day] as ordinals
+        return Consolidation(self).per_product
 
-        print('gantt')
-        print(f"\ttitle {title} - Products & Epics")
-        print(f"\tdateFormat YYYY-MM-DD")
+    def mermaid_gantt_output_per_product_and_epic(self, title):
+        write_output(sys.stdout, 'products', self, title)
 
-        for product in planning.keys():
-            print(f"\tsection {product}")
-            for epic in planning[product].keys():
-                print(f"\t{epic}\t:{planning[product][epic]['beginDate'].isoformat()}, {planning[product][epic]['endDate'].isoformat()}")    
-    
     def consolidate_planning_per_member(self):
-        sorted_items = sorted(self.planning_items, key=lambda item: (item.product, item.epic))
-        consolidated_planning = {}
-        for item in sorted_items:
-            # Update member
-            if item.team_member.name not in consolidated_planning.keys():
-                consolidated_planning[item.team_member.name] = {}
-            member_item = consolidated_planning[item.team_member.name]
-
-            # Update workload
-            workload = f"{item.epic} ({item.profile})"
-            if workload not in member_item:
-                member_item[workload] = {}
-            workload_item = member_item[workload]
-            if 'beginDate' not in workload_item or item.work_day.date.toordinal() < workload_item['beginDate'].toordinal():
-                workload_item['beginDate'] = item.work_day.date
-            if 'endDate' not in workload_item or item.work_day.date.toordinal() > workload_item['endDate'].toordinal():
-                workload_item['endDate'] = item.work_day.date
-
-        return consolidated_planning
-        
+        # member -> "epic (profile)" -> [first day, last day] as ordinals
+        return Consolidation(self).per_member
+
     def mermaid_gantt_output_per_member_and_workload(self, title):
-        planning = self.consolidate_planning_per_member()
+        write_output(sys.stdout, 'members', self, title)
+
+@planning_solution
+class TeamBlockPlanning:
+    def __init__(self, work_days, team_members, workload_blocks):
+        self.work_days = work_days
+        self.team_members = team_members
+        self.workload_blocks = workload_blocks
+        self.score = None
+
+    @problem_fact_collection_property(WorkDay)
+    @value_range_provider("WorkDays")
+    def get_work_day_list(self):
+        return self.work_days
+
+    @problem_fact_collection_property(TeamMember)
+    @value_range_provider("TeamMembers")
+    def get_team_members(self):
+        return self.team_members
 
-        print('gantt')
-        print(f"\ttitle {title} - Members & Workloads")
-        print(f"\tdateFormat YYYY-MM-DD")
+    @planning_entity_collection_property(WorkloadBlock)
+    def get_workload_blocks(self):
+        return self.workload_blocks
 
-        for member in planning.keys():
-            print(f"\tsection {member}")
-            for workload in planning[member].keys():
-                print(f"\t{workload}\t:{planning[member][workload]['beginDate'].isoformat()}, {planning[member][workload]['endDate'].isoformat()}")
+    @planning_score(HardSoftScore)
+    def get_score(self):
+        return self.score
+
+    def set_score(self, score):
+        self.score = score
+
+    def to_team_planning(self):
+        # Expand every block back into one assigned PlanningItem per day so the
+        # CSV and Gantt exporters work unchanged
+        planning_items = []
+        for block in self.workload_blocks:
+            days = block.days()
+            for d in range(block.duration):
+                item = PlanningItem(
+                    len(planning_items),
+                    block.epic,
+                    block.priority,
+                    block.start_date,
+                    block.dead_line,
+                    block.product,
+                    block.profile)
+                # Days overflowing the planning range are already penalized,
+                # they are reported on the last work day
+                item.set_work_day(days[d] if d < len(days) else self.work_days[-1])
+                item.set_team_member(block.team_member)
+                planning_items.append(item)
+
+        planning = TeamPlanning(self.work_days, self.team_members, planning_items)
+        planning.set_score(self.score)
+        return planning
+
+
+class EligibilityIndex:
+    """
+    Integer view of who can work on what and when, built once at load time so
+    that the constraints only do bit and array lookups instead of string
+    comparisons and date formatting.
+    """
+
+    def __init__(self, work_days, team_members, planning_items, workload_blocks=()):
+        # Name -> id, the items keep the names for the outputs
+        self.epics = {}
+        self.products = {}
+        self.profiles = {}
+        for item in planning_items:
+            self.products.setdefault(item.product, len(self.products))
+            self.profiles.setdefault(item.profile, len(self.profiles))
+
+        # member x (product, profile) bitmask, one bit per workload kind
+        self.member_workloads = []
+        # member x workday availability matrix, indexed by WorkDay.id
+        self.member_availability = []
+
+        for team_member in team_members:
+            profile_mask = self.mask(self.profiles, team_member.profile)
+            product_mask = self.mask(self.products, team_member.product)
+            workload_mask = 0
+            for product_id in self.ids(product_mask):
+                for profile_id in self.ids(profile_mask):
+                    workload_mask |= 1 << self.workload_id(product_id, profile_id)
+
+            availability = bytearray(len(work_days))
+            # available_rank[d] counts the member's available days before day d
+            available_rank = []
+            available_days = []
+            for work_day in work_days:
+                availability[work_day.id] = work_day.ordinal not in team_member.daysoff
+                available_rank.append(len(available_days))
+                if availability[work_day.id]:
+                    available_days.append(work_day)
+
+            team_member.profile_mask = profile_mask
+            team_member.product_mask = product_mask
+            team_member.workload_mask = workload_mask
+            team_member.availability = availability
+            team_member.available_rank = available_rank
+            team_member.available_days = available_days
+            self.member_workloads.append(workload_mask)
+            self.member_availability.append(availability)
+
+        self.index_items(list(planning_items) + list(workload_blocks))
+        self.index_value_ranges(work_days, team_members, planning_items)
+
+    def index_items(self, items):
+        for item in items:
+            item.epic_id = self.epics.setdefault(item.epic, len(self.epics))
+            item.product_id = self.products[item.product]
+            item.profile_id = self.profiles[item.profile]
+            item.workload_id = self.workload_id(item.product_id, item.profile_id)
+
+    def index_value_ranges(self, work_days, team_members, planning_items):
+        # The solver only proposes eligible members and days of the epic's
+        # window: one list per workload and per window, shared by their items
+        ordinals = [work_day.ordinal for work_day in work_days]
+        eligible_team_members = {}
+        allowed_work_days = {}
+        for item in planning_items:
+            if item.workload_id not in eligible_team_members:
+                eligible = [team_member for team_member in team_members
+                            if self.is_eligible(team_member.id, item.workload_id)]
+                # Without any, the profile and product constraints tell why
+                eligible_team_members[item.workload_id] = eligible if len(eligible) > 0 else team_members
+            window = (item.start_date, item.dead_line)
+            if window not in allowed_work_days:
+                first = 0 if item.start_date is None else bisect.bisect_left(ordinals, item.start_date)
+                end = len(work_days) if item.dead_line is None else bisect.bisect_right(ordinals, item.dead_line)
+                # An empty window is left to the start date and dead line constraints
+                allowed_work_days[window] = work_days[first:end] if first < end else work_days
+            item.eligible_team_members = eligible_team_members[item.workload_id]
+            item.allowed_work_days = allowed_work_days[window]
+
+    @staticmethod
+    def mask(ids, value):
+        if value == '*':
+            return (1 << len(ids)) - 1
+        return 1 << ids[value] if value in ids else 0
+
+    @staticmethod
+    def ids(mask):
+        index = 0
+        while mask:
+            if mask & 1:
+                yield index
+            mask >>= 1
+            index = index + 1
+
+    def workload_id(self, product_id, profile_id):
+        return product_id * len(self.profiles) + profile_id
+
+    def is_eligible(self, team_member_id, workload_id):
+        return (self.member_workloads[team_member_id] >> workload_id) & 1 == 1
+
+    def is_available(self, team_member_id, work_day_id):
+        return self.member_availability[team_member_id][work_day_id] == 1
+
+
+# Constraint lambdas go through probe() so that --profile-constraints can time them
+constraint_profiler = ConstraintProfiler()
+probe = constraint_profiler.probe
 
 def penalize_all(constraint_factory):
     return constraint_factory \
@@ -235,60 +509,79 @@ def penalize_all(constraint_factory):
         .penalize("Penalize ALL !", HardSoftScore.ONE_HARD)
 
 def team_member_capacity_per_day(constraint_factory):
+    # One group per member and day instead of joining the items of a day
+    # pairwise: every item beyond the member's capacity that day costs
     return constraint_factory \
         .for_each(PlanningItem) \
-        .join(PlanningItem, \
-            Joiners.equal(lambda item: item.work_day), \
-            Joiners.equal(lambda item: item.team_member), \
-            Joiners.less_than(lambda item: item.id) \
-        ) \
-        .penalize("Team member issue: Capacity", HardSoftScore.ONE_HARD)
+        .group_by(probe('Capacity: team member', lambda item: item.team_member), \
+                  probe('Capacity: work day', lambda item: item.work_day), \
+                  ConstraintCollectors.count()) \
+        .filter(probe('Capacity: filter', lambda team_member, work_day, count: count > team_member.capacity[work_day.id])) \
+        .penalize("Team member issue: Capacity", HardSoftScore.ONE_HARD,
+                  probe('Capacity: weight', lambda team_member, work_day, count: count - team_member.capacity[work_day.id]))
 
 def team_member_has_a_profile(constraint_factory):
     return constraint_factory \
         .for_each(PlanningItem) \
-        .filter(lambda item: item.bad_profile_assignment()) \
+        .filter(probe('Profile: filter', lambda item: item.bad_profile_assignment())) \
         .penalize("Team member issue: Profile", HardSoftScore.ONE_HARD)
 
 def team_member_assigned_to_a_product(constraint_factory):
     return constraint_factory \
         .for_each(PlanningItem) \
-        .filter(lambda item: item.bad_product_assignment()) \
+        .filter(probe('Product: filter', lambda item: item.bad_product_assignment())) \
         .penalize("Team member issue: Product", HardSoftScore.ONE_HARD)
 
 def team_member_has_days_off(constraint_factory):
     return constraint_factory \
         .for_each(PlanningItem) \
-        .filter(lambda item: item.bad_day_assignment()) \
+        .filter(probe('Day off: filter', lambda item: item.bad_day_assignment())) \
         .penalize("Team member issue: Day Off", HardSoftScore.ONE_HARD)
 
 def qa_cannot_be(constraint_factory):
     return constraint_factory \
         .for_each(PlanningItem) \
-        .filter(lambda item: item.bad_day_assignment()) \
+        .filter(probe('Day off: filter', lambda item: item.bad_day_assignment())) \
         .penalize("Team member issue: Day Off", HardSoftScore.ONE_HARD)
 
 
+def enforce_start_dates(constraint_factory):
+    return constraint_factory \
+        .for_each(PlanningItem) \
+        .filter(probe('Start date: filter', lambda item: item.start_date_fail())) \
+        .penalize("Start date fail", HardSoftScore.ONE_HARD)
+
 def enforce_dead_lines(constraint_factory):
     return constraint_factory \
         .for_each(PlanningItem) \
-        .filter(lambda item: item.dead_line_fail()) \
+        .filter(probe('Dead line: filter', lambda item: item.dead_line_fail())) \
         .penalize("Dead line fail", HardSoftScore.ONE_HARD)
 
 def focused_team_member(constraint_factory):
     return constraint_factory \
         .for_each(PlanningItem) \
         .join(PlanningItem, \
-            Joiners.equal(lambda item: item.team_member), \
-            Joiners.less_than(lambda item: item.id) \
+            Joiners.equal(probe('Pairwise focus: team member', lambda item: item.team_member)), \
+            Joiners.less_than(probe('Pairwise focus: id', lambda item: item.id)) \
         ) \
-        .filter(lambda item1, item2: item1.epic != item2.epic) \
+        .filter(probe('Pairwise focus: filter', lambda item1, item2: item1.epic_id != item2.epic_id)) \
         .penalize("Team member issue: Focus", HardSoftScore.ONE_SOFT)
 
+def focused_team_member_epics(constraint_factory):
+    # Same intent as focused_team_member, but grouping keeps it linear in the
+    # number of items: every epic beyond the first one a member works on costs
+    return constraint_factory \
+        .for_each(PlanningItem) \
+        .group_by(probe('Focus: team member', lambda item: item.team_member), \
+                  ConstraintCollectors.count_distinct(probe('Focus: epic', lambda item: item.epic_id))) \
+        .filter(probe('Focus: filter', lambda team_member, epic_count: epic_count > 1)) \
+        .penalize("Team member issue: Focus", HardSoftScore.ONE_SOFT,
+                  probe('Focus: weight', lambda team_member, epic_count: epic_count - 1))
+
 def enforce_epic_priority(constraint_factory):
     return constraint_factory \
         .for_each(PlanningItem) \
-        .penalize("Epic priority", HardSoftScore.ONE_SOFT, lambda item: item.priority)
+        .penalize("Epic priority", HardSoftScore.ONE_SOFT, probe('Epic priority: weight', lambda item: item.priority))
 
 @constraint_provider
 def planning_constraints( constraint_factory):
@@ -298,58 +591,320 @@ def planning_constraints( constraint_factory):
         team_member_assigned_to_a_product(constraint_factory),
         team_member_has_a_profile(constraint_factory),
         team_member_has_days_off(constraint_factory),
-        # enforce_dead_lines(constraint_factory),
-        # focused_team_member(constraint_factory),env
+        enforce_start_dates(constraint_factory),
+        enforce_dead_lines(constraint_factory),
         # enforce_epic_priority(constraint_factory)
 
         # Soft constraints
+        focused_team_member_epics(constraint_factory),
     ]
     return result
 
 
+@constraint_provider
+def pairwise_focus_planning_constraints(constraint_factory):
+    # planning_constraints with the original O(n²) focus rule, kept for benchmarks
+    result =  [
+        # Hard constraints
+        team_member_capacity_per_day(constraint_factory),
+        team_member_assigned_to_a_product(constraint_factory),
+        team_member_has_a_profile(constraint_factory),
+        team_member_has_days_off(constraint_factory),
+        enforce_start_dates(constraint_factory),
+        enforce_dead_lines(constraint_factory),
+
+        # Soft constraints
+        focused_team_member(constraint_factory),
+    ]
+    return result
+
+
+@incremental_score_calculator
+class TeamPlanningIncrementalScoreCalculator:
+    """
+    Same score as planning_constraints, kept up to date with counters so that
+    each variable change costs O(1) instead of re-running the stream lambdas.
+    Like for_each in the streams, items only count once both their work day
+    and team member are assigned.
+
+    In the solver, the entities given are the Java objects jpyinterpreter
+    translates PlanningItem to: their planning variables are Java fields, the
+    Python items behind them are not kept up to date, see python_item.
+    """
+
+    # Mirrors the commented out enforce_epic_priority of planning_constraints
+    priority_enabled = False
+
+    def resetWorkingSolution(self, workingSolution):
+        self.hard_score = 0
+        self.focus_score = 0
+        self.priority_score = 0
+        # (member id, work day id) -> number of items planned that day
+        self.occupancy = {}
+        # member id -> {epic id: number of items}
+        self.member_epics = {}
+        planning_items = workingSolution.getPlanning_items() if hasattr(workingSolution, 'getPlanning_items') \
+            else workingSolution.planning_items
+        for entity in planning_items:
+            self.insert(self.python_item(entity))
+
+    def beforeEntityAdded(self, entity):
+        pass
+
+    def afterEntityAdded(self, entity):
+        self.insert(self.python_item(entity))
+
+    def beforeVariableChanged(self, entity, variableName):
+        self.retract(self.python_item(entity))
+
+    def afterVariableChanged(self, entity, variableName):
+        self.insert(self.python_item(entity))
+
+    def beforeEntityRemoved(self, entity):
+        self.retract(self.python_item(entity))
+
+    def afterEntityRemoved(self, entity):
+        pass
+
+    def insert(self, item):
+        if item.work_day is None or item.team_member is None:
+            return
+        member_id = item.team_member.id
+
+        # Capacity: one more item beyond the member's capacity that day
+        key = (member_id, item.work_day.id)
+        occupancy = self.occupancy.get(key, 0)
+        if occupancy >= item.team_member.capacity[item.work_day.id]:
+            self.hard_score -= 1
+        self.occupancy[key] = occupancy + 1
+
+        self.hard_score -= self.item_hard_penalty(item)
+
+        # Focus: every epic beyond the member's first one
+        epic_id = item.epic_id
+        epics = self.member_epics.setdefault(member_id, {})
+        epic_count = epics.get(epic_id, 0)
+        if epic_count == 0 and len(epics) > 0:
+            self.focus_score -= 1
+        epics[epic_id] = epic_count + 1
+
+        self.priority_score -= item.priority
+
+    def retract(self, item):
+        if item.work_day is None or item.team_member is None:
+            return
+        member_id = item.team_member.id
+
+        key = (member_id, item.work_day.id)
+        occupancy = self.occupancy[key] - 1
+        if occupancy >= item.team_member.capacity[item.work_day.id]:
+            self.hard_score += 1
+        self.occupancy[key] = occupancy
+
+        self.hard_score += self.item_hard_penalty(item)
+
+        epic_id = item.epic_id
+        epics = self.member_epics[member_id]
+        epic_count = epics[epic_id] - 1
+        if epic_count == 0:
+            del epics[epic_id]
+            if len(epics) > 0:
+                self.focus_score += 1
+        else:
+            epics[epic_id] = epic_count
+
+        self.priority_score += item.priority
+
+    @staticmethod
+    def python_item(entity):
+        # Python items as they are, translated ones with the variables of their Java fields
+        if not hasattr(entity, 'getWork_day'):
+            return entity
+        item = entity.get__optapy_Id()
+        work_day = entity.getWork_day()
+        team_member = entity.getTeam_member()
+        item.work_day = None if work_day is None else work_day.get__optapy_Id()
+        item.team_member = None if team_member is None else team_member.get__optapy_Id()
+        return item
+
+    @staticmethod
+    def item_hard_penalty(item):
+        return item.bad_product_assignment() \
+            + item.bad_profile_assignment() \
+            + item.bad_day_assignment() \
+            + item.start_date_fail() \
+            + item.dead_line_fail()
+
+    def calculateScore(self):
+        soft_score = self.focus_score + (self.priority_score if self.priority_enabled else 0)
+        return HardSoftScore.of(self.hard_score, soft_score)
+
+
+def block_capacity_per_day(constraint_factory):
+    return constraint_factory \
+        .for_each_unique_pair(WorkloadBlock, \
+            Joiners.equal(probe('Block capacity: team member', lambda block: block.team_member)), \
+            Joiners.overlapping(probe('Block capacity: first rank', lambda block: block.first_rank()),
+                                probe('Block capacity: end rank', lambda block: block.end_rank())) \
+        ) \
+        .penalize("Team member issue: Capacity", HardSoftScore.ONE_HARD,
+                  probe('Block capacity: weight', lambda block1, block2: block1.overlap(block2)))
+
+def block_within_work_days(constraint_factory):
+    return constraint_factory \
+        .for_each(WorkloadBlock) \
+        .filter(probe('Block overflow: filter', lambda block: block.missing_days() > 0)) \
+        .penalize("Work day range overflow", HardSoftScore.ONE_HARD,
+                  probe('Block overflow: weight', lambda block: block.missing_days()))
+
+def block_member_has_a_profile(constraint_factory):
+    return constraint_factory \
+        .for_each(WorkloadBlock) \
+        .filter(probe('Block profile: filter', lambda block: block.bad_profile_assignment())) \
+        .penalize("Team member issue: Profile", HardSoftScore.ONE_HARD,
+                  probe('Block profile: weight', lambda block: block.duration))
+
+def block_member_assigned_to_a_product(constraint_factory):
+    return constraint_factory \
+        .for_each(WorkloadBlock) \
+        .filter(probe('Block product: filter', lambda block: block.bad_product_assignment())) \
+        .penalize("Team member issue: Product", HardSoftScore.ONE_HARD,
+                  probe('Block product: weight', lambda block: block.duration))
+
+def block_start_dates(constraint_factory):
+    return constraint_factory \
+        .for_each(WorkloadBlock) \
+        .filter(probe('Block start date: filter', lambda block: block.start_date_fail())) \
+        .penalize("Start date fail", HardSoftScore.ONE_HARD)
+
+def block_dead_lines(constraint_factory):
+    return constraint_factory \
+        .for_each(WorkloadBlock) \
+        .filter(probe('Block dead line: filter', lambda block: block.dead_line_fail())) \
+        .penalize("Dead line fail", HardSoftScore.ONE_HARD)
+
+def block_focused_team_member(constraint_factory):
+    return constraint_factory \
+        .for_each(WorkloadBlock) \
+        .group_by(probe('Block focus: team member', lambda block: block.team_member), \
+                  ConstraintCollectors.count_distinct(probe('Block focus: epic', lambda block: block.epic_id))) \
+        .filter(probe('Block focus: filter', lambda team_member, epic_count: epic_count > 1)) \
+        .penalize("Team member issue: Focus", HardSoftScore.ONE_SOFT,
+                  probe('Block focus: weight', lambda team_member, epic_count: epic_count - 1))
+
+@constraint_provider
+def block_planning_constraints(constraint_factory):
+    result = [
+        # Hard constraints
+        block_capacity_per_day(constraint_factory),
+        block_within_work_days(constraint_factory),
+        block_member_assigned_to_a_product(constraint_factory),
+        block_member_has_a_profile(constraint_factory),
+        block_start_dates(constraint_factory),
+        block_dead_lines(constraint_factory),
+        # Days off need no constraint: blocks only cover the member's available days
+
+        # Soft constraints
+        block_focused_team_member(constraint_factory),
+    ]
+    return result
+
+
+def iso_to_ordinal(iso_date):
+    return None if iso_date is None else date.fromisoformat(iso_date).toordinal()
+
+
 class PlanningProblem:
 
-    def __init__(self, args):
+    def __init__(self, args=None):
         self.team_members = []
         self.work_days = []
         self.planning_items = []
-
-        if args[1] == 'json' and len(args) == 3:
-            self.load_from_json(args[2])
-        elif args[1] == 'azureDevOps' and len(args) == 5:
-            self.load_from_azure_devops(args[2], args[3], args[4])
+        self.workload_blocks = []
+        self.solver_settings = {}
+        self.arguments = None
+        self.termination_report = None
+        # Optional cache of solver factories shared between problems solved in the same process
+        self.solver_factories = None
+        # Seconds spent building the solver and solving, for the last solve
+        self.timings = {}
+        self.score_calculation_count = None
+        # Called with every best solution changed event of the solver
+        self.solver_event_listeners = []
+        # Called with every progress event and best solution, see progress.py
+        self.progress_callbacks = []
+        # The solver while solving, see terminate_early
+        self.solver = None
+        # Demand and capacity of every independent component, after a decomposed solve
+        self.components = None
+        # Solutions of the same problem and solving options are solved once, see solution_cache.py
+        self.solution_cache = None
+        self.cache_key = None
+        self.terminated_early = False
+
+        if args is None:
+            return
+        self.arguments = parse_arguments(args)
+        source_arguments = self.arguments.source_arguments
+        if self.arguments.source == 'json' and len(source_arguments) == 1:
+            self.load_from_json(source_arguments[0])
+        elif self.arguments.source == 'azureDevOps' and len(source_arguments) in (1, 2):
+            self.load_from_azure_devops(*source_arguments)
+
+        self.solution_cache = open_solution_cache(self.arguments)
+        if self.solution_cache is not None:
+            self.cache_key = problem_key(self.problem_content, self.arguments)
         
 
     def generate_work_days(self, iso_start_date, iso_end_date, team_days_off):
 
-        current_date = date.fromisoformat(iso_start_date)
-        end_date = date.fromisoformat(iso_end_date)
+        current_ordinal = iso_to_ordinal(iso_start_date)
+        end_ordinal = iso_to_ordinal(iso_end_date)
+        team_days_off = frozenset(iso_to_ordinal(day_off) for day_off in team_days_off)
         workday_id = 0
 
-        while current_date.toordinal() <= end_date.toordinal():
-             # Excluding week-end days and public holidays
-            if current_date.isoweekday() < 6 and current_date.isoformat() not in team_days_off:
-                self.work_days.append(WorkDay(workday_id, current_date))
+        while current_ordinal <= end_ordinal:
+             # Excluding week-end days (ordinal % 7 is 6 on Saturdays, 0 on Sundays) and public holidays
+            if current_ordinal % 7 not in (0, 6) and current_ordinal not in team_days_off:
+                self.work_days.append(WorkDay(workday_id, date.fromordinal(current_ordinal)))
                 workday_id = workday_id + 1
-            current_date = current_date + timedelta(days=1)
+            current_ordinal = current_ordinal + 1
 
-    def load_from_azure_devops(self, organization_url, personal_access_token, project_name):
-        credentials = BasicAuthentication('', personal_access_token)
-        connection = Connection(base_url=organization_url, creds=credentials)
-        core_client = connection.clients.get_core_client()
-        project = core_client.get_project(project_name)
-        print(project.__dict__)
+    def load_from_azure_devops(self, file_path, personal_access_token=None):
+        # Team members and work days from the file, epics from Azure DevOps
+        with open(file_path, 'r') as file:
+            problem_content = json.loads(file.read())
 
+        default_cache_path = f"{os.path.splitext(file_path)[0]}.azure-devops-cache.json"
+        problem_content['epics'] = load_epics(problem_content['azureDevOps'], personal_access_token, default_cache_path)
+        print(f"{len(problem_content['epics'])} epics loaded from Azure DevOps", file=sys.stderr)
+        self.load_from_content(problem_content)
 
     def load_from_json(self, file_path):
 
         with open(file_path, 'r') as file:
-            json_content = file.read()
-            problem_content = json.loads(json_content)
+            try:
+                problem_content = json.load(file)
+            except json.JSONDecodeError as e:
+                raise ProblemError([f"{file_path}: invalid JSON, {e}"])
 
+        self.load_from_content(problem_content)
+
+    def load_from_content(self, problem_content):
+        # Everything is checked before anything is built
+        problem_content, changes = migrate(problem_content)
+        if len(changes) > 0:
+            print(f"Problem migrated to version {SCHEMA_VERSION}, see problem_schema.py migrate", file=sys.stderr)
+        check_problem(problem_content, self.arguments is None or not self.arguments.skip_capacity_checks)
+
+        self.problem_content = problem_content
         self.title = problem_content['title']
+        self.solver_settings = solver_settings_with_preset(self.arguments, problem_content.get('solver', {}))
 
         self.generate_work_days(problem_content['workDayRange']['begin'], problem_content['workDayRange']['end'], problem_content['workDayRange']['teamDaysOff'])
+        # Items per day of work, more than one with fractional capacities or workloads
+        self.units_per_day = content_units_per_day(problem_content)
+        work_day_ordinals = [work_day.ordinal for work_day in self.work_days]
 
         # Load team members
         team_member_id = 0
@@ -359,54 +914,440 @@ class PlanningProblem:
                 team_member_def['name'],
                 team_member_def['profile'],
                 team_member_def['product'],
-                team_member_def['daysOff']))
+                frozenset(iso_to_ordinal(day_off) for day_off in team_member_def['daysOff']),
+                member_capacity_per_day(team_member_def, work_day_ordinals, self.units_per_day)))
             team_member_id = team_member_id + 1
 
+        if self.solver_settings.get('model', 'items') == 'blocks' and any(
+                capacity != 1 for team_member in self.team_members for capacity in team_member.capacity):
+            raise ProblemError(['solver.model: blocks take whole days of full time members, '
+                                'use the items model with capacities or fractional workloads'])
+
         # sorting epics by priorities
             
-        # Generate planning items
+        # Generate planning items, one per person-day, or workload blocks
+        # covering several days each
         item_id = 0
+        block_size = self.solver_settings.get('blockSize')
         for epic_def in problem_content['epics']:
+            start_date = iso_to_ordinal(epic_def.get('startDate'))
+            dead_line = iso_to_ordinal(epic_def.get('deadLine'))
             for profile in epic_def['workloads'].keys():
-                workload = epic_def['workloads'][profile]
+                workload = workload_items(epic_def['workloads'][profile], self.units_per_day)
                 for d in range(workload):
                     self.planning_items.append(PlanningItem(
                         item_id,
                         epic_def['name'],
                         epic_def.get('priority', 10),
-                        epic_def.get('deadLine'),
+                        start_date,
+                        dead_line,
                         epic_def['product'],
                         profile))
                     item_id = item_id + 1
-        
+
+                remaining = workload
+                while remaining > 0:
+                    duration = remaining if block_size is None else min(block_size, remaining)
+                    self.workload_blocks.append(WorkloadBlock(
+                        len(self.workload_blocks),
+                        epic_def['name'],
+                        epic_def.get('priority', 10),
+                        start_date,
+                        dead_line,
+                        epic_def['product'],
+                        profile,
+                        duration))
+                    remaining = remaining - duration
+
+        self.eligibility = EligibilityIndex(self.work_days, self.team_members, self.planning_items, self.workload_blocks)
+
+    def score_director_config(self):
+        # 'streams' (default), 'incremental', or 'incremental-assert' which
+        # checks every incremental score against planning_constraints
+        score_calculation = self.solver_settings.get('scoreCalculation', 'streams')
+        score_director_config = optapy.config.score.director.ScoreDirectorFactoryConfig()
+        if score_calculation == 'streams':
+            return score_director_config.withConstraintProviderClass(planning_constraints)
+
+        score_director_config = score_director_config \
+            .withIncrementalScoreCalculatorClass(TeamPlanningIncrementalScoreCalculator)
+        if score_calculation == 'incremental-assert':
+            score_director_config = score_director_config.withAssertionScoreDirectorFactory(
+                optapy.config.score.director.ScoreDirectorFactoryConfig()
+                    .withConstraintProviderClass(planning_constraints))
+        return score_director_config
+
+    def solver_config(self):
+        solver_config = SolverConfig() \
+            .withEntityClasses(PlanningItem) \
+            .withSolutionClass(TeamPlanning) \
+            .withScoreDirectorFactory(self.score_director_config())
+        solver_config = self.configure_solver(solver_config, ['work_day', 'team_member'])
+        environment_mode = self.environment_mode()
+        if environment_mode is not None:
+            solver_config = solver_config.withEnvironmentMode(
+                getattr(optapy.config.solver.EnvironmentMode, environment_mode))
+        return solver_config
+
+    def configure_solver(self, solver_config, variable_names):
+        solver_config = apply_termination(solver_config, self.termination_settings())
+        solver_config = apply_phases(solver_config, self.phase_settings(), self.termination_settings(), variable_names)
+        move_thread_count = self.move_thread_count()
+        if move_thread_count is not None:
+            solver_config = solver_config.withMoveThreadCount(str(move_thread_count))
+        return solver_config
+
+    def move_thread_count(self):
+        if self.arguments is not None and self.arguments.move_thread_count is not None:
+            return self.arguments.move_thread_count
+        return self.solver_settings.get('moveThreadCount')
+
+    def environment_mode(self):
+        if self.arguments is not None and self.arguments.environment_mode is not None:
+            return self.arguments.environment_mode
+        environment_mode = self.solver_settings.get('environmentMode')
+        if environment_mode is None and self.solver_settings.get('scoreCalculation') == 'incremental-assert':
+            return 'FAST_ASSERT'
+        if environment_mode is not None and environment_mode not in ENVIRONMENT_MODES:
+            raise ValueError(f"Unknown environment mode {environment_mode}, expected one of {', '.join(ENVIRONMENT_MODES)}")
+        return environment_mode
+
+    def solver_config_key(self):
+        # Everything the solver configuration is built from
+        return json.dumps({
+            'model': self.solver_settings.get('model', 'items'),
+            'scoreCalculation': self.solver_settings.get('scoreCalculation', 'streams'),
+            'termination': self.termination_settings(),
+            'phases': self.phase_settings(),
+            'moveThreadCount': self.move_thread_count(),
+            'environmentMode': self.environment_mode(),
+            'profileConstraints': constraint_profiler.enabled
+        }, sort_keys=True)
+
+    def solver_factory(self, solver_config):
+        if self.solver_factories is None:
+            return solver_factory_create(solver_config)
+        key = self.solver_config_key()
+        if key not in self.solver_factories:
+            self.solver_factories[key] = solver_factory_create(solver_config)
+        return self.solver_factories[key]
+
+    def score_manager(self):
+        # Always constraint streams: the incremental calculator has no constraint matches
+        solver_config = SolverConfig() \
+            .withEntityClasses(PlanningItem) \
+            .withSolutionClass(TeamPlanning) \
+            .withConstraintProviderClass(planning_constraints)
+        return score_manager_create(solver_factory_create(solver_config))
+
+    def score_analysis(self, solution, max_matches=10):
+        return score_analysis(self.score_manager(), solution, max_matches)
+
+    def termination_settings(self):
+        return termination_settings(self.arguments, self.solver_settings.get('termination', {}), 5)
+
+    def phase_settings(self):
+        return phase_settings(self.arguments, self.solver_settings.get('phases', {}))
+
+    @staticmethod
+    def urgency(item):
+        # Earliest deadline first, then most important (lowest) priority
+        return (item.dead_line if item.dead_line is not None else date.max.toordinal(), item.priority, item.epic, item.id)
+
+    def warm_start_settings(self):
+        settings = dict(self.solver_settings.get('warmStart', {}))
+        if self.arguments is not None:
+            overrides = {
+                'solution': self.arguments.warm_start,
+                'changedFrom': self.arguments.changed_from,
+                'changedTo': self.arguments.changed_to
+            }
+            for key, value in overrides.items():
+                if value is not None:
+                    settings[key] = value
+        return settings
+
+    def warm_start(self, assignments, changed_from, changed_to):
+        # Items of the same epic/profile are interchangeable: the n-th previous
+        # row of an epic/profile goes to its n-th item. Assignments that are
+        # still valid and outside the changed window are pinned, everything else
+        # is left for the solver to repair.
+        work_days_by_ordinal = {work_day.ordinal: work_day for work_day in self.work_days}
+        team_members_by_name = {team_member.name: team_member for team_member in self.team_members}
+        items_by_workload = {}
+        for item in self.planning_items:
+            item.set_work_day(None)
+            item.set_team_member(None)
+            item.pinned = False
+            items_by_workload.setdefault((item.epic, item.profile), deque()).append(item)
+
+        occupancy = {}
+        for assignment in assignments:
+            items = items_by_workload.get((assignment['epicName'], assignment['profile']))
+            work_day = work_days_by_ordinal.get(iso_to_ordinal(assignment['date']))
+            team_member = team_members_by_name.get(assignment['teamMember'])
+            # Removed workloads, days or members
+            if not items or work_day is None or team_member is None:
+                continue
+            item = items.popleft()
+            if not self.eligibility.is_eligible(team_member.id, item.workload_id) \
+                    or not self.eligibility.is_available(team_member.id, work_day.id) \
+                    or occupancy.get((team_member.id, work_day.id), 0) >= team_member.capacity[work_day.id] \
+                    or (item.start_date is not None and work_day.ordinal < item.start_date) \
+                    or (item.dead_line is not None and work_day.ordinal > item.dead_line):
+                continue
+            item.set_work_day(work_day)
+            item.set_team_member(team_member)
+            occupancy[(team_member.id, work_day.id)] = occupancy.get((team_member.id, work_day.id), 0) + 1
+            item.pinned = not (changed_from <= work_day.ordinal <= changed_to)
+
+    def construct_eligible_first_fit(self, planning_items):
+        # Give every unassigned item, most urgent first, the earliest day of its
+        # window an eligible and available member still has capacity on,
+        # preferring members already on the epic
+        next_free_day = [0] * len(self.team_members)
+        member_epics = [set() for team_member in self.team_members]
+        occupancy = {}
+        for item in planning_items:
+            if item.work_day is not None and item.team_member is not None:
+                key = (item.team_member.id, item.work_day.id)
+                occupancy[key] = occupancy.get(key, 0) + 1
+                member_epics[item.team_member.id].add(item.epic)
+        for item in planning_items:
+            if item.work_day is not None or item.team_member is not None:
+                continue
+            best = None
+            first_day_id, last_day_id = item.allowed_work_days[0].id, item.allowed_work_days[-1].id
+            for team_member in item.eligible_team_members:
+                if not self.eligibility.is_eligible(team_member.id, item.workload_id):
+                    continue
+                day_id = max(next_free_day[team_member.id], first_day_id)
+                while day_id <= last_day_id and (not self.eligibility.is_available(team_member.id, day_id)
+                                                  or occupancy.get((team_member.id, day_id), 0)
+                                                  >= team_member.capacity[day_id]):
+                    day_id = day_id + 1
+                # Free days before the item's window stay free for the next items
+                if first_day_id <= next_free_day[team_member.id]:
+                    next_free_day[team_member.id] = day_id
+                if day_id > last_day_id:
+                    continue
+                candidate = (day_id, item.epic not in member_epics[team_member.id], team_member.id)
+                if best is None or candidate < best:
+                    best = candidate
+            # Items without any eligible free day are left to the solver
+            if best is None:
+                continue
+            day_id, _, team_member_id = best
+            item.set_work_day(self.work_days[day_id])
+            item.set_team_member(self.team_members[team_member_id])
+            # The day stays the member's next free one until its capacity is used
+            occupancy[(team_member_id, day_id)] = occupancy.get((team_member_id, day_id), 0) + 1
+            member_epics[team_member_id].add(item.epic)
+
+    def output_formats(self):
+        return parse_formats(None if self.arguments is None else self.arguments.formats)
+
+    def output_name(self):
+        # Output files are named after the problem file
+        if self.arguments is not None and self.arguments.source == 'json':
+            return os.path.splitext(os.path.basename(self.arguments.source_arguments[0]))[0]
+        return 'planning'
+
+    def write_snapshot(self, directory, solution):
+        write_outputs(solution, self.title, self.output_formats(), directory, 'best')
+
+    def progress_stream(self, to_solution):
+        progress_output = None if self.arguments is None else self.arguments.progress
+        snapshot_directory = None if self.arguments is None else self.arguments.snapshot_dir
+        if progress_output is None and snapshot_directory is None and len(self.progress_callbacks) == 0:
+            return None
+
+        snapshot = None
+        if snapshot_directory is not None:
+            os.makedirs(snapshot_directory, exist_ok=True)
+            snapshot = lambda solution: self.write_snapshot(snapshot_directory, solution)
+        progress_stream = ProgressStream(open_progress_output(progress_output), snapshot, to_solution)
+        progress_stream.callbacks.extend(self.progress_callbacks)
+        return progress_stream
+
+    def terminate_early(self):
+        # Safe from callbacks and signal handlers: the solver stops after the
+        # current step and solve() returns the best solution found so far
+        self.terminated_early = True
+        if self.solver is not None:
+            self.solver.terminateEarly()
+
+    def run_solver(self, solver_config, problem, to_solution=None):
+        start = time.perf_counter()
+        solver = self.solver_factory(solver_config).buildSolver()
+        self.timings['startup'] = time.perf_counter() - start
+        self.termination_report = TerminationReport(self.termination_settings()).listen(solver)
+        for listener in self.solver_event_listeners:
+            solver.addEventListener(listener)
+        progress_stream = self.progress_stream(to_solution)
+        if progress_stream is not None:
+            progress_stream.listen(solver)
+
+        self.solver = solver
+        constraint_profiler.reset()
+        self.termination_report.start()
+        try:
+            solution = solver.solve(problem)
+        finally:
+            self.termination_report.stop()
+            self.solver = None
+            if progress_stream is not None and progress_stream.output not in (None, sys.stdout):
+                progress_stream.output.close()
+        self.timings['solve'] = self.termination_report.elapsed()
+        self.score_calculation_count = solver.getSolverScope().getScoreCalculationCount()
+        return solution
+
+    def create_problem(self):
+        phase_settings = self.phase_settings()
+        warm_start_settings = self.warm_start_settings()
+        cached_warm_start = None if 'solution' in warm_start_settings else self.cached_warm_start()
+        if 'solution' in warm_start_settings:
+            # Without any window only the assignments made invalid by the change are re-planned
+            if 'changedFrom' not in warm_start_settings and 'changedTo' not in warm_start_settings:
+                changed_from, changed_to = date.max.toordinal(), date.min.toordinal()
+            else:
+                changed_from = iso_to_ordinal(warm_start_settings.get('changedFrom', date.min.isoformat()))
+                changed_to = iso_to_ordinal(warm_start_settings.get('changedTo', date.max.isoformat()))
+            self.warm_start(read_assignments(warm_start_settings['solution']), changed_from, changed_to)
+        elif cached_warm_start is not None:
+            # As --warm-start without a window: only the assignments made invalid by the change are re-planned
+            print('Warm start from the cached solution of a similar problem', file=sys.stderr)
+            self.warm_start(cached_warm_start['assignments'], date.max.toordinal(), date.min.toordinal())
+        elif len(phase_settings) == 0:
+            problem = TeamPlanning(self.work_days, self.team_members, self.planning_items)
+            item = problem.planning_items[0]
+            item.set_work_day(problem.work_days[0])
+            item.set_team_member(problem.team_members[0])
+            return problem
+
+        # Construction heuristics follow the entity order
+        planning_items = sorted(self.planning_items, key=self.urgency)
+        if phase_settings.get('constructionHeuristic') == 'eligible-first-fit':
+            self.construct_eligible_first_fit(planning_items)
+        return TeamPlanning(self.work_days, self.team_members, planning_items)
+
+    def cached_warm_start(self):
+        # Cache entry of the most similar problem, with --cache-warm-start
+        if self.solution_cache is None or not self.arguments.cache_warm_start:
+            return None
+        return self.solution_cache.closest(normalized_problem(self.problem_content))
+
+    def cached_solution(self, entry):
+        # Items rebuilt as the solve left them, same ids and order, see cache_entry
+        # The first item of every epic/profile, rebuilt items copy it
+        templates = {}
+        for item in self.planning_items:
+            templates.setdefault((item.epic, item.profile), item)
+        work_days_by_date = {work_day.date.isoformat(): work_day for work_day in self.work_days}
+        team_members_by_name = {team_member.name: team_member for team_member in self.team_members}
+        planning_items = []
+        for cached_item in entry['items']:
+            template = templates[(cached_item['epicName'], cached_item['profile'])]
+            item = PlanningItem(len(planning_items), template.epic, template.priority, template.start_date,
+                                template.dead_line, template.product, template.profile)
+            item.set_work_day(work_days_by_date.get(cached_item['date']))
+            item.set_team_member(team_members_by_name.get(cached_item['teamMember']))
+            planning_items.append(item)
+        self.eligibility.index_items(planning_items)
+        solution = TeamPlanning(self.work_days, self.team_members, planning_items)
+        solution.set_score(HardSoftScore.of(entry['hard'], entry['soft']))
+        self.termination_report = CachedReport(self.cache_key)
+        self.timings['solve'] = 0
+        return solution
 
     def solve(self):
-        print(f"Solving {self.title} ...")
+        print(f"Solving {self.title} ...", file=sys.stderr)
+        constraint_profiler.enabled = self.arguments is not None and self.arguments.profile_constraints
+
+        if self.cache_key is not None and not self.arguments.refresh_cache:
+            entry = self.solution_cache.get(self.cache_key)
+            if entry is not None:
+                return self.cached_solution(entry)
+
+        solution = self.solve_problem()
+        # An interrupted solve is not the answer to the problem
+        if self.cache_key is not None and not self.terminated_early and solution.score is not None:
+            self.solution_cache.put(self.cache_key, cache_entry(
+                self.problem_content, solution.score.toString(), solution.score.getHardScore(),
+                solution.score.getSoftScore(), solution))
+        return solution
 
-        problem = TeamPlanning(self.work_days, self.team_members, self.planning_items)
-        item = problem.planning_items[0]
-        item.set_work_day(problem.work_days[0])
-        item.set_team_member(problem.team_members[0])
+    def solve_problem(self):
+        if self.arguments is not None and self.arguments.decompose:
+            score = solve_decomposed(self, HardSoftScore.of)
+            solution = TeamPlanning(self.work_days, self.team_members, self.planning_items)
+            solution.set_score(score)
+            return solution
 
-        # logging.getLogger('optapy').setLevel(logging.DEBUG)
+        if self.solver_settings.get('model', 'items') == 'blocks':
+            return self.solve_blocks()
 
-        solver_config = SolverConfig() \
-            .withEntityClasses(PlanningItem) \
-            .withSolutionClass(TeamPlanning) \
-            .withConstraintProviderClass(planning_constraints) \
-            .withTerminationSpentLimit(Duration.ofSeconds(5))
+        problem = self.create_problem()
+        solver_config = self.solver_config()
 
-        solver = solver_factory_create(solver_config).buildSolver()
-        solution = solver.solve(problem)
+        # logging.getLogger('optapy').setLevel(logging.DEBUG)
+
+        solution = self.run_solver(solver_config, problem)
+        # A warm start can pin every item: no phase runs, nothing scores the solution
+        if solution.score is None:
+            solution.set_score(self.score_manager().updateScore(solution))
         return solution
 
+    def solve_blocks(self):
+        problem = TeamBlockPlanning(self.work_days, self.team_members, sorted(self.workload_blocks, key=self.urgency))
 
-problem = PlanningProblem(sys.argv)
-solution = problem.solve() # f"{sys.argv[1]}.solution.csv")
-print(f"Final score : {solution.score.toString() if solution.score is not None else 'N/A'}")
-print(f"CSV OUTPUT")
-solution.csv_output()
-print(f"PRODUCT/EPIC GANTT")
-solution.mermaid_gantt_output_per_product_and_epic(problem.title)
-print(f"MEMBER/WORKLOAD GANTT")
-solution.mermaid_gantt_output_per_member_and_workload(problem.title)
+        solver_config = SolverConfig() \
+            .withEntityClasses(WorkloadBlock) \
+            .withSolutionClass(TeamBlockPlanning) \
+            .withConstraintProviderClass(block_planning_constraints)
+        solver_config = self.configure_solver(solver_config, ['start_day', 'team_member'])
+
+        solution = self.run_solver(solver_config, problem, lambda solution: solution.to_team_planning())
+        planning = solution.to_team_planning()
+        self.eligibility.index_items(planning.planning_items)
+        return planning
+
+
+def print_solution(problem, solution):
+    # Status lines on stderr, stdout only carries the outputs
+    print(f"Final score : {solution.score.toString() if solution.score is not None else 'N/A'}", file=sys.stderr)
+    print(problem.termination_report.summary(solution.score), file=sys.stderr)
+
+    arguments = problem.arguments
+    if arguments.output_dir is not None:
+        os.makedirs(arguments.output_dir, exist_ok=True)
+        for file_path in write_outputs(solution, problem.title, problem.output_formats(),
+                                       arguments.output_dir, problem.output_name()):
+            print(f"Written {file_path}", file=sys.stderr)
+    else:
+        print_outputs(sys.stdout, solution, problem.title, problem.output_formats())
+
+    if arguments.profile_constraints:
+        print("CONSTRAINT PROFILE", file=sys.stderr)
+        constraint_profiler.print_report()
+    if arguments.explain or arguments.explain_output is not None:
+        analysis = problem.score_analysis(solution, arguments.explain_matches)
+        if arguments.explain:
+            print("SCORE EXPLANATION", file=sys.stderr)
+            print_score_analysis(analysis)
+        if arguments.explain_output is not None:
+            with open(arguments.explain_output, 'w') as file:
+                file.write(json.dumps({'score': solution.score.toString(), 'constraints': analysis}, indent=4))
+
+
+if __name__ == '__main__':
+    # Invalid problems (ProblemError) and invalid solver settings or output options
+    try:
+        problem = PlanningProblem(sys.argv)
+        # Ctrl-C stops the solver and still prints the best solution found so far
+        signal.signal(signal.SIGINT, lambda signal_number, frame: problem.terminate_early())
+        solution = problem.solve() # f"{sys.argv[1]}.solution.csv")
+        print_solution(problem, solution)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        sys.exit(2)
@@ -0,0 +1,302 @@
+"""
+Scores and checks a team planning assignment with numpy, without starting a
+JVM: same penalties as planning_constraints, plus plan KPIs.
+
+Usage: python team_planning_validator.py <problem.json> <solution> [--include-priority] [--json]
+
+The solution is a csv, json, npz or parquet output of team_planning_solver.py.
+The exit code is 1 when the plan is infeasible (negative hard score).
+
+Penalties, as the constraint streams count them over assigned items:
+    Capacity    one per item beyond the member's capacity that day
+    Product     one per item of a product the member does not work on
+    Profile     one per item of a profile the member does not have
+    Day Off     one per item on one of the member's days off
+    Start date  one per item before the epic's start date
+    Dead line   one per item after the epic's dead line
+    Focus       (soft) one per epic beyond the first one of every member
+    Priority    (soft) sum of the epic priorities, only counted with --include-priority
+"""
+import argparse
+import json
+import sys
+from datetime import date
+
+import numpy
+
+from outputs import read_assignments
+from columnar import load_columns, decode
+from problem_schema import content_units_per_day, member_capacity_per_day
+
+
+WILDCARD = -2
+NO_START_DATE = date.min.toordinal()
+NO_DEAD_LINE = date.max.toordinal()
+
+
+def work_day_ordinals(begin, end, team_days_off):
+    # Same days as PlanningProblem.generate_work_days
+    ordinals = numpy.arange(date.fromisoformat(begin).toordinal(), date.fromisoformat(end).toordinal() + 1)
+    team_days_off = [date.fromisoformat(day_off).toordinal() for day_off in team_days_off]
+    return ordinals[(ordinals % 7 != 0) & (ordinals % 7 != 6) & ~numpy.isin(ordinals, team_days_off)]
+
+
+class ProblemArrays:
+    """
+    Work days, members and epics of a problem as arrays. Members are given as
+    (name, profile, product, days off ordinals, items per work day), epics as
+    name: (dead line ordinal or None, priority, start date ordinal or None).
+    """
+
+    def __init__(self, title, work_days, members, epics):
+        self.title = title
+        self.work_days = numpy.asarray(work_days, dtype=numpy.int64)
+        self.member_names = [member[0] for member in members]
+        self.member_ids = {name: member_id for member_id, name in enumerate(self.member_names)}
+        self.epic_names = list(epics.keys())
+        self.epic_ids = {name: epic_id for epic_id, name in enumerate(self.epic_names)}
+        self.dead_lines = numpy.asarray([NO_DEAD_LINE if dead_line is None else dead_line
+                                         for dead_line, priority, start_date in epics.values()], dtype=numpy.int64)
+        self.start_dates = numpy.asarray([NO_START_DATE if start_date is None else start_date
+                                          for dead_line, priority, start_date in epics.values()], dtype=numpy.int64)
+        self.priorities = numpy.asarray([priority for dead_line, priority, start_date in epics.values()],
+                                        dtype=numpy.int64)
+
+        # Profiles and products are interned as they are met, '*' is WILDCARD
+        self.profile_ids = {}
+        self.product_ids = {}
+        self.member_profiles = numpy.asarray([self.intern(self.profile_ids, member[1]) for member in members],
+                                             dtype=numpy.int64)
+        self.member_products = numpy.asarray([self.intern(self.product_ids, member[2]) for member in members],
+                                             dtype=numpy.int64)
+        # member x work day
+        self.availability = numpy.stack([~numpy.isin(self.work_days, list(member[3])) for member in members]) \
+            if len(members) > 0 else numpy.zeros((0, len(self.work_days)), dtype=bool)
+        self.capacity = numpy.asarray([member[4] for member in members], dtype=numpy.int64) \
+            .reshape(len(members), len(self.work_days))
+
+    @staticmethod
+    def intern(ids, value):
+        if value == '*':
+            return WILDCARD
+        return ids.setdefault(value, len(ids))
+
+    @staticmethod
+    def from_content(problem_content):
+        work_day_range = problem_content['workDayRange']
+        work_days = work_day_ordinals(work_day_range['begin'], work_day_range['end'], work_day_range.get('teamDaysOff', []))
+        units = content_units_per_day(problem_content)
+        members = [(member['name'], member['profile'], member['product'],
+                    [date.fromisoformat(day_off).toordinal() for day_off in member.get('daysOff', [])],
+                    member_capacity_per_day(member, work_days.tolist(), units))
+                   for member in problem_content['teamMembers']]
+        epics = {epic['name']: (None if epic.get('deadLine') is None else date.fromisoformat(epic['deadLine']).toordinal(),
+                                epic.get('priority', 10),
+                                None if epic.get('startDate') is None else date.fromisoformat(epic['startDate']).toordinal())
+                 for epic in problem_content['epics']}
+        return ProblemArrays(problem_content.get('title'), work_days, members, epics)
+
+    @staticmethod
+    def from_solution(solution, title=None):
+        members = [(member.name, member.profile, member.product, member.daysoff, member.capacity)
+                   for member in sorted(solution.team_members, key=lambda member: member.id)]
+        epics = {}
+        for item in solution.planning_items:
+            epics.setdefault(item.epic, (item.dead_line, item.priority, item.start_date))
+        return ProblemArrays(title, [work_day.ordinal for work_day in solution.work_days], members, epics)
+
+    def ids(self, names, ids, kind, intern=False):
+        """Vectorized name to id lookup, each distinct name is looked up once"""
+        unique_names, inverse = numpy.unique(numpy.asarray(names, dtype=str), return_inverse=True)
+        unique_ids = []
+        for name in unique_names.tolist():
+            if intern:
+                unique_ids.append(ids.setdefault(name, len(ids)))
+            elif name in ids:
+                unique_ids.append(ids[name])
+            else:
+                raise ValueError(f"Unknown {kind} {name} in the solution")
+        return numpy.asarray(unique_ids, dtype=numpy.int64)[inverse.reshape(-1)]
+
+
+class Assignment:
+    """Assigned items only, as problem ids; unassigned items are not matched by the constraints"""
+
+    def __init__(self, problem, ordinals, members, epics, products, profiles):
+        self.ordinals = numpy.asarray(ordinals, dtype=numpy.int64)
+        if len(self.ordinals) == 0:
+            empty = numpy.zeros(0, dtype=numpy.int64)
+            self.days, self.members, self.epics, self.products, self.profiles = empty, empty, empty, empty, empty
+            return
+        self.days = numpy.searchsorted(problem.work_days, self.ordinals)
+        invalid = (self.days >= len(problem.work_days)) \
+            | (problem.work_days[numpy.minimum(self.days, len(problem.work_days) - 1)] != self.ordinals)
+        if invalid.any():
+            raise ValueError(f"{date.fromordinal(int(self.ordinals[invalid][0])).isoformat()} is not a work day")
+        self.members = problem.ids(members, problem.member_ids, 'team member')
+        self.epics = problem.ids(epics, problem.epic_ids, 'epic')
+        # Products and profiles nobody has still get an id, no member matches them
+        self.products = problem.ids(products, problem.product_ids, 'product', intern=True)
+        self.profiles = problem.ids(profiles, problem.profile_ids, 'profile', intern=True)
+
+    @staticmethod
+    def from_rows(problem, rows):
+        # Rows as read by outputs.read_assignments
+        return Assignment(problem,
+                          [date.fromisoformat(row['date']).toordinal() for row in rows],
+                          [row['teamMember'] for row in rows],
+                          [row['epicName'] for row in rows],
+                          [row['product'] for row in rows],
+                          [row['profile'] for row in rows])
+
+    @staticmethod
+    def from_columns(problem, columns):
+        # Columns as read by columnar.load_columns
+        assigned = (columns['workDay'] >= 0) & (columns['teamMember'] >= 0)
+        names = {column: numpy.asarray(decode(columns, column), dtype=object)[assigned]
+                 for column in ['teamMember', 'epic', 'product', 'profile']}
+        return Assignment(problem, columns['workDay'][assigned], names['teamMember'], names['epic'],
+                          names['product'], names['profile'])
+
+    @staticmethod
+    def from_solution(problem, solution):
+        items = [item for item in solution.planning_items if item.work_day is not None and item.team_member is not None]
+        return Assignment(problem,
+                          [item.work_day.ordinal for item in items],
+                          [item.team_member.name for item in items],
+                          [item.epic for item in items],
+                          [item.product for item in items],
+                          [item.profile for item in items])
+
+
+def penalties(problem, assignment):
+    members, days = assignment.members, assignment.days
+    day_count = len(problem.work_days)
+
+    member_day_counts = numpy.bincount(members * day_count + days, minlength=len(problem.member_names) * day_count)
+    member_products = problem.member_products[members]
+    member_profiles = problem.member_profiles[members]
+
+    epic_count = len(problem.epic_names)
+    member_epics = numpy.unique(members * epic_count + assignment.epics)
+    distinct_epics = numpy.bincount(member_epics // epic_count, minlength=len(problem.member_names))
+
+    return {
+        'Team member issue: Capacity': int(numpy.maximum(member_day_counts - problem.capacity.reshape(-1), 0).sum()),
+        'Team member issue: Product': int(((member_products != WILDCARD) & (member_products != assignment.products)).sum()),
+        'Team member issue: Profile': int(((member_profiles != WILDCARD) & (member_profiles != assignment.profiles)).sum()),
+        'Team member issue: Day Off': int((~problem.availability[members, days]).sum()),
+        'Start date fail': int((assignment.ordinals < problem.start_dates[assignment.epics]).sum()),
+        'Dead line fail': int((assignment.ordinals > problem.dead_lines[assignment.epics]).sum()),
+        'Team member issue: Focus': int(numpy.maximum(distinct_epics - 1, 0).sum()),
+        'Epic priority': int(problem.priorities[assignment.epics].sum())
+    }
+
+
+HARD_CONSTRAINTS = ['Team member issue: Capacity', 'Team member issue: Product', 'Team member issue: Profile',
+                    'Team member issue: Day Off', 'Start date fail', 'Dead line fail']
+
+
+def kpis(problem, assignment):
+    # Utilization: assigned items over the items of the available days, per member
+    assigned_days = numpy.bincount(assignment.members, minlength=len(problem.member_names))
+    available_days = (problem.capacity * problem.availability).sum(axis=1)
+    utilization = {name: float(assigned_days[member_id] / available_days[member_id]) if available_days[member_id] else None
+                   for member_id, name in enumerate(problem.member_names)}
+
+    # Lead time: first to last day of every epic, slack: days left before its dead line
+    epic_count = len(problem.epic_names)
+    first_days = numpy.full(epic_count, numpy.iinfo(numpy.int64).max)
+    last_days = numpy.full(epic_count, numpy.iinfo(numpy.int64).min)
+    first_work_days = numpy.full(epic_count, numpy.iinfo(numpy.int64).max)
+    last_work_days = numpy.full(epic_count, numpy.iinfo(numpy.int64).min)
+    numpy.minimum.at(first_days, assignment.epics, assignment.ordinals)
+    numpy.maximum.at(last_days, assignment.epics, assignment.ordinals)
+    numpy.minimum.at(first_work_days, assignment.epics, assignment.days)
+    numpy.maximum.at(last_work_days, assignment.epics, assignment.days)
+
+    epics = {}
+    for epic_id, name in enumerate(problem.epic_names):
+        if last_days[epic_id] < first_days[epic_id]:
+            epics[name] = {'begin': None, 'end': None, 'leadTimeDays': None, 'leadTimeWorkDays': None,
+                           'slackDays': None}
+            continue
+        dead_line = int(problem.dead_lines[epic_id])
+        epics[name] = {
+            'begin': date.fromordinal(int(first_days[epic_id])).isoformat(),
+            'end': date.fromordinal(int(last_days[epic_id])).isoformat(),
+            'leadTimeDays': int(last_days[epic_id] - first_days[epic_id] + 1),
+            'leadTimeWorkDays': int(last_work_days[epic_id] - first_work_days[epic_id] + 1),
+            # Negative when late
+            'slackDays': None if dead_line == NO_DEAD_LINE else dead_line - int(last_days[epic_id])
+        }
+
+    return {
+        'assignedItems': int(len(assignment.ordinals)),
+        'utilization': float(assigned_days.sum() / available_days.sum()) if available_days.sum() else None,
+        'memberUtilization': utilization,
+        'epics': epics
+    }
+
+
+def validate(problem, assignment, include_priority=False):
+    """Score as the solver computes it with planning_constraints, penalties per constraint and KPIs"""
+    constraint_penalties = penalties(problem, assignment)
+    hard_score = -sum(constraint_penalties[name] for name in HARD_CONSTRAINTS)
+    soft_score = -constraint_penalties['Team member issue: Focus']
+    if include_priority:
+        soft_score = soft_score - constraint_penalties['Epic priority']
+    return {
+        'score': f"{hard_score}hard/{soft_score}soft",
+        'hard': hard_score,
+        'soft': soft_score,
+        'feasible': hard_score >= 0,
+        'penalties': constraint_penalties,
+        'kpis': kpis(problem, assignment)
+    }
+
+
+def validate_solution(solution, include_priority=False):
+    problem = ProblemArrays.from_solution(solution)
+    return validate(problem, Assignment.from_solution(problem, solution), include_priority)
+
+
+def load_assignment(problem, file_path):
+    if file_path.endswith('.npz') or file_path.endswith('.parquet'):
+        return Assignment.from_columns(problem, load_columns(file_path))
+    return Assignment.from_rows(problem, read_assignments(file_path))
+
+
+def print_report(report):
+    print(f"Score : {report['score']}{'' if report['feasible'] else ' (infeasible)'}")
+    print('constraint;penalty')
+    for name, penalty in report['penalties'].items():
+        print(f"{name};{penalty}")
+    kpis = report['kpis']
+    print(f"Assigned items : {kpis['assignedItems']}, utilization : "
+          f"{'N/A' if kpis['utilization'] is None else format(kpis['utilization'], '.0%')}")
+    print('member;utilization')
+    for name, utilization in kpis['memberUtilization'].items():
+        print(f"{name};{'N/A' if utilization is None else format(utilization, '.0%')}")
+    print('epic;begin;end;leadTimeDays;leadTimeWorkDays;slackDays')
+    for name, epic in kpis['epics'].items():
+        print(';'.join([name] + ['N/A' if epic[key] is None else str(epic[key])
+                                 for key in ['begin', 'end', 'leadTimeDays', 'leadTimeWorkDays', 'slackDays']]))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Scores and checks a team planning solution without the solver')
+    parser.add_argument('problem', help='problem JSON file')
+    parser.add_argument('solution', help='csv, json, npz or parquet output of the solver')
+    parser.add_argument('--include-priority', action='store_true', help='count the epic priorities in the soft score')
+    parser.add_argument('--json', action='store_true', help='print the report as JSON')
+    arguments = parser.parse_args(sys.argv[1:])
+
+    with open(arguments.problem, 'r') as file:
+        problem = ProblemArrays.from_content(json.loads(file.read()))
+    report = validate(problem, load_assignment(problem, arguments.solution), arguments.include_priority)
+    if arguments.json:
+        print(json.dumps(report, indent=4))
+    else:
+        print_report(report)
+    sys.exit(0 if report['feasible'] else 1)
@@ -0,0 +1,164 @@
+"""
+Termination settings shared by the solvers.
+
+Settings come from the "termination" section of the problem's "solver" settings
+and can be overridden on the command line:
+
+    "termination": {
+        "spentLimit": 5,                 # seconds
+        "unimprovedSpentLimit": 2,       # seconds without a better solution
+        "bestScoreLimit": "0hard/*soft", # stop as soon as this score is reached
+        "stepCountLimit": 1000,          # local search steps
+        "compositionStyle": "OR"         # or "AND": stop when all limits are reached
+    }
+
+stepCountLimit only ends the local search phase (OptaPlanner has no solver
+level step count): compositionStyle does not combine it with the other limits,
+and without any of these the default spent limit still applies.
+"""
+import re
+import time
+
+
+SCORE_PATTERN = re.compile(r'^(-?\d+|\*)hard/(-?\d+|\*)soft$')
+
+
+def add_termination_arguments(parser):
+    parser.add_argument('--spent-limit', type=float, help='stop after this many seconds')
+    parser.add_argument('--unimproved-spent-limit', type=float,
+                        help='stop after this many seconds without a better solution')
+    parser.add_argument('--best-score-limit', help='stop once this score is reached, e.g. 0hard/*soft')
+    parser.add_argument('--step-count-limit', type=int, help='stop the local search after this many steps')
+    parser.add_argument('--termination-composition', choices=['OR', 'AND'],
+                        help='stop when any (OR) or all (AND) limits are reached')
+
+
+def termination_settings(arguments, settings, default_spent_limit):
+    """Merge command line termination arguments over the problem settings"""
+    settings = dict(settings)
+    if arguments is not None:
+        overrides = {
+            'spentLimit': arguments.spent_limit,
+            'unimprovedSpentLimit': arguments.unimproved_spent_limit,
+            'bestScoreLimit': arguments.best_score_limit,
+            'stepCountLimit': arguments.step_count_limit,
+            'compositionStyle': arguments.termination_composition
+        }
+        for key, value in overrides.items():
+            if value is not None:
+                settings[key] = value
+
+    # Solver level limits, stepCountLimit is a phase one
+    limits = ['spentLimit', 'unimprovedSpentLimit', 'bestScoreLimit']
+    if not any(key in settings for key in limits):
+        settings['spentLimit'] = default_spent_limit
+    if 'bestScoreLimit' in settings and SCORE_PATTERN.match(settings['bestScoreLimit']) is None:
+        raise ValueError(f"Invalid best score limit {settings['bestScoreLimit']}, expected e.g. 0hard/*soft")
+    return settings
+
+
+def seconds_to_duration(seconds):
+    from optapy.types import Duration
+    return Duration.ofMillis(int(seconds * 1000))
+
+
+def termination_config(settings):
+    """Solver level TerminationConfig; the step count limit is applied to the local search phase by phases.py"""
+    # Imported here, the arguments are parsed before the JVM starts
+    import optapy.config
+    from optapy.types import TerminationConfig
+    config = TerminationConfig()
+    if 'spentLimit' in settings:
+        config = config.withSpentLimit(seconds_to_duration(settings['spentLimit']))
+    if 'unimprovedSpentLimit' in settings:
+        config = config.withUnimprovedSpentLimit(seconds_to_duration(settings['unimprovedSpentLimit']))
+    if 'bestScoreLimit' in settings:
+        config = config.withBestScoreLimit(settings['bestScoreLimit'])
+    if settings.get('compositionStyle', 'OR') == 'AND':
+        config = config.withTerminationCompositionStyle(
+            optapy.config.solver.termination.TerminationCompositionStyle.AND)
+    return config
+
+
+def apply_termination(solver_config, settings):
+    return solver_config.withTerminationConfig(termination_config(settings))
+
+
+def best_score_limit_reached(score, best_score_limit):
+    hard_limit, soft_limit = SCORE_PATTERN.match(best_score_limit).groups()
+    if hard_limit == '*':
+        return soft_limit == '*' or score.getSoftScore() >= int(soft_limit)
+    if score.getHardScore() != int(hard_limit):
+        return score.getHardScore() > int(hard_limit)
+    return soft_limit == '*' or score.getSoftScore() >= int(soft_limit)
+
+
+class TerminationReport:
+    """
+    Tells which limit ended a solve from what the solver scope recorded: time
+    spent, time of the best solution, best score and early termination.
+    """
+
+    def __init__(self, settings):
+        self.settings = settings
+        self.start_time = None
+        self.end_time = None
+        self.solver = None
+        # Read from the solver scope once solving is over
+        self.spent_millis = None
+        self.best_solution_millis = None
+        self.best_score = None
+        self.terminated_early = False
+
+    def listen(self, solver):
+        self.solver = solver
+        return self
+
+    def start(self):
+        self.start_time = time.perf_counter()
+
+    def stop(self):
+        self.end_time = time.perf_counter()
+        if self.solver is not None:
+            solver_scope = self.solver.getSolverScope()
+            self.spent_millis = solver_scope.getTimeMillisSpent()
+            self.best_solution_millis = solver_scope.getBestSolutionTimeMillisSpent()
+            self.best_score = solver_scope.getBestScore()
+            self.terminated_early = self.solver.isTerminateEarly()
+
+    def elapsed(self):
+        return self.end_time - self.start_time
+
+    def reached_limits(self, score):
+        """Solver level limits reached, as (setting, reason)"""
+        score = self.best_score if self.best_score is not None else score
+        spent_millis = self.spent_millis if self.spent_millis is not None else self.elapsed() * 1000
+        reached = []
+        if 'bestScoreLimit' in self.settings and score is not None \
+                and best_score_limit_reached(score, self.settings['bestScoreLimit']):
+            reached.append(('bestScoreLimit', f"best score limit {self.settings['bestScoreLimit']} reached"))
+        if 'unimprovedSpentLimit' in self.settings and self.best_solution_millis is not None \
+                and spent_millis - self.best_solution_millis >= self.settings['unimprovedSpentLimit'] * 1000:
+            reached.append(('unimprovedSpentLimit', f"no improvement for {self.settings['unimprovedSpentLimit']}s"))
+        if 'spentLimit' in self.settings and spent_millis >= self.settings['spentLimit'] * 1000:
+            reached.append(('spentLimit', f"spent limit of {self.settings['spentLimit']}s reached"))
+        return reached
+
+    def reasons(self, score):
+        reached = self.reached_limits(score)
+        limits = [limit for limit in ['spentLimit', 'unimprovedSpentLimit', 'bestScoreLimit'] if limit in self.settings]
+        if self.settings.get('compositionStyle', 'OR') == 'AND':
+            solver_terminated = len(limits) > 0 and len(reached) == len(limits)
+        else:
+            solver_terminated = len(reached) > 0
+        if solver_terminated:
+            return [reason for limit, reason in reached]
+        if self.terminated_early:
+            return ['terminated early']
+        # Otherwise the phases ended by themselves, the local search one only does with a step count limit
+        if 'stepCountLimit' in self.settings:
+            return [f"step count limit of {self.settings['stepCountLimit']} reached"]
+        return ['all solver phases ended']
+
+    def summary(self, score):
+        return f"Terminated after {self.elapsed():.1f}s: {', '.join(self.reasons(score))}"
@@ -0,0 +1,138 @@
+"""
+Replays recorded work items through RecordedWorkItemClient: WIQL id paging,
+concurrent batches and the revision cache of WorkItemLoader, then load_epics.
+
+Usage: python -m unittest test_azure_devops_loader
+"""
+import json
+import os
+import tempfile
+import unittest
+from datetime import datetime, timezone
+
+from azure_devops_loader import RecordedWorkItemClient, WorkItemLoader, load_epics
+
+
+SETTINGS = {
+    'project': 'MyProject',
+    'workloadFields': {'Dev': 'Custom.DevWorkload', 'QA': 'Custom.QAWorkload'},
+    'pageSize': 10,
+    'batchSize': 4,
+    'concurrency': 2
+}
+SYNCED_BEFORE = '2023-01-01T00:00:00Z'
+
+
+def work_item(work_item_id, rev=1, changed_date=SYNCED_BEFORE, dev=3, qa=None):
+    fields = {
+        'System.Id': work_item_id,
+        'System.Title': f"Epic {work_item_id}",
+        'System.ChangedDate': changed_date,
+        'System.AreaPath': f"MyProject\\Product {work_item_id % 3}",
+        'Microsoft.VSTS.Common.Priority': work_item_id % 4 + 1,
+        'Custom.DevWorkload': dev,
+        'Custom.Unrequested': 'not fetched'
+    }
+    if qa is not None:
+        fields['Custom.QAWorkload'] = qa
+    return {'id': work_item_id, 'rev': rev, 'fields': fields}
+
+
+def now():
+    return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+class RecordedLoaderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache_path = os.path.join(self.directory.name, 'cache.json')
+        self.recording = [work_item(work_item_id) for work_item_id in range(1, 26)]
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def loader(self, recording):
+        client = RecordedWorkItemClient(recording)
+        return client, WorkItemLoader(client, SETTINGS, self.cache_path)
+
+    def test_query_ids_pages_on_the_id(self):
+        client, loader = self.loader(self.recording)
+        self.assertEqual(loader.query_ids(), list(range(1, 26)))
+        # Pages of 10, 10 and 5 ids
+        self.assertEqual(client.queries, 3)
+
+    def test_full_last_page_is_followed_by_an_empty_one(self):
+        client, loader = self.loader(self.recording[:20])
+        self.assertEqual(loader.query_ids(), list(range(1, 21)))
+        self.assertEqual(client.queries, 3)
+
+    def test_fetch_batches_ids_and_requested_fields(self):
+        client, loader = self.loader(self.recording)
+        work_items = loader.fetch(list(range(1, 26)))
+        self.assertEqual(client.batches, 7)
+        self.assertEqual([work_item['id'] for work_item in work_items], list(range(1, 26)))
+        self.assertNotIn('Custom.Unrequested', work_items[0]['fields'])
+        self.assertEqual(work_items[0]['fields']['Custom.DevWorkload'], 3)
+
+    def test_fetch_omits_missing_work_items(self):
+        client, loader = self.loader(self.recording)
+        self.assertEqual([work_item['id'] for work_item in loader.fetch([1, 99, 2])], [1, 2])
+
+    def test_first_load_fetches_everything_and_writes_the_cache(self):
+        client, loader = self.loader(self.recording)
+        work_items = loader.load()
+        self.assertEqual(len(work_items), 25)
+        self.assertEqual(client.batches, 7)
+        with open(self.cache_path, 'r') as file:
+            cache = json.loads(file.read())
+        self.assertEqual(sorted(int(work_item_id) for work_item_id in cache['items']), list(range(1, 26)))
+        self.assertEqual(cache['fields'], loader.fields)
+
+    def test_second_load_only_fetches_new_and_changed_work_items(self):
+        self.loader(self.recording)[1].load()
+
+        recording = [work_item(work_item_id) for work_item_id in range(1, 26)]
+        # Changed since the sync
+        recording[4] = work_item(5, rev=2, changed_date=now(), dev=8)
+        # Edited in the recording only, its changed date says it is still the cached revision
+        recording[5] = work_item(6, dev=13)
+        # New
+        recording.append(work_item(26, changed_date=now()))
+        # No longer matching the query
+        del recording[0]
+        client, loader = self.loader(recording)
+        work_items = {work_item['id']: work_item for work_item in loader.load()}
+
+        self.assertEqual(client.batches, 1)
+        self.assertEqual(sorted(work_items), list(range(2, 27)))
+        self.assertEqual(work_items[5]['rev'], 2)
+        self.assertEqual(work_items[5]['fields']['Custom.DevWorkload'], 8)
+        self.assertEqual(work_items[6]['fields']['Custom.DevWorkload'], 3)
+        with open(self.cache_path, 'r') as file:
+            self.assertNotIn('1', json.loads(file.read())['items'])
+
+    def test_cache_of_other_fields_is_ignored(self):
+        self.loader(self.recording)[1].load()
+        client = RecordedWorkItemClient(self.recording)
+        loader = WorkItemLoader(client, dict(SETTINGS, workloadFields={'Dev': 'Custom.DevWorkload'}), self.cache_path)
+        loader.load()
+        self.assertEqual(client.batches, 7)
+
+    def test_load_epics_from_a_recording_file(self):
+        recording = [work_item(1, dev=2.5, qa=1), work_item(2, dev=0), work_item(3, dev=None)]
+        recording_path = os.path.join(self.directory.name, 'recording.json')
+        with open(recording_path, 'w') as file:
+            file.write(json.dumps(recording))
+
+        epics = load_epics(dict(SETTINGS, recording=recording_path, cacheFile=self.cache_path))
+        self.assertEqual(epics, [{
+            'name': 'Epic 1',
+            'product': 'Product 1',
+            'priority': 2,
+            'workloads': {'Dev': 3, 'QA': 1}
+        }])
+
+
+if __name__ == '__main__':
+    unittest.main()
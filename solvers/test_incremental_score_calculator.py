@@ -0,0 +1,118 @@
+"""
+Checks that TeamPlanningIncrementalScoreCalculator keeps the score of
+planning_constraints while items are assigned, moved and unassigned, and that
+a solve with "scoreCalculation": "incremental-assert" ends on the score the
+constraint streams give its solution. Needs optapy.
+
+Usage: python -m unittest test_incremental_score_calculator
+"""
+import importlib.util
+import unittest
+from collections import deque
+
+from test_team_planning_validator import PROBLEM, FEASIBLE, BROKEN
+
+
+@unittest.skipUnless(importlib.util.find_spec('optapy') is not None, 'optapy is not installed')
+class IncrementalScoreCalculatorTest(unittest.TestCase):
+
+    def setUp(self):
+        # Imported here, it starts the JVM
+        from team_planning_solver import PlanningProblem, TeamPlanning, TeamPlanningIncrementalScoreCalculator
+        self.problem = PlanningProblem()
+        self.problem.load_from_content(PROBLEM)
+        self.solution = TeamPlanning(self.problem.work_days, self.problem.team_members, self.problem.planning_items)
+        self.calculator = TeamPlanningIncrementalScoreCalculator()
+        self.score_manager = self.problem.score_manager()
+
+    def stream_score(self):
+        # Without the init part the streams add for unassigned variables
+        score = self.score_manager.updateScore(self.solution)
+        return f"{score.getHardScore()}hard/{score.getSoftScore()}soft"
+
+    def rows_to_moves(self, rows):
+        # The n-th row of an epic/profile goes to its n-th item
+        work_days = {work_day.date.isoformat(): work_day for work_day in self.problem.work_days}
+        team_members = {team_member.name: team_member for team_member in self.problem.team_members}
+        items = {}
+        for item in self.problem.planning_items:
+            items.setdefault((item.epic, item.profile), deque()).append(item)
+        return [(items[(row['epicName'], row['profile'])].popleft(), work_days[row['date']],
+                 team_members[row['teamMember']]) for row in rows]
+
+    def change(self, item, work_day, team_member):
+        # As the solver's score director notifies every variable change
+        self.calculator.beforeVariableChanged(item, 'work_day')
+        item.set_work_day(work_day)
+        self.calculator.afterVariableChanged(item, 'work_day')
+        self.calculator.beforeVariableChanged(item, 'team_member')
+        item.set_team_member(team_member)
+        self.calculator.afterVariableChanged(item, 'team_member')
+
+    def test_reset_scores_as_the_streams(self):
+        for name, rows in dict({constraint: rows for constraint, (rows, penalty) in BROKEN.items()},
+                               feasible=FEASIBLE).items():
+            with self.subTest(plan=name):
+                for item in self.problem.planning_items:
+                    item.set_work_day(None)
+                    item.set_team_member(None)
+                for item, work_day, team_member in self.rows_to_moves(rows):
+                    item.set_work_day(work_day)
+                    item.set_team_member(team_member)
+                self.calculator.resetWorkingSolution(self.solution)
+                self.assertEqual(self.calculator.calculateScore().toString(), self.stream_score())
+
+    def test_variable_changes_keep_the_score(self):
+        self.calculator.resetWorkingSolution(self.solution)
+        self.assertEqual(self.calculator.calculateScore().toString(), '0hard/0soft')
+
+        # Assign a feasible plan, then break it one constraint after the other
+        moves = self.rows_to_moves(FEASIBLE)
+        for constraint, (rows, penalty) in BROKEN.items():
+            moves.extend(self.rows_to_moves(rows))
+        for item, work_day, team_member in moves:
+            self.change(item, work_day, team_member)
+            self.assertEqual(self.calculator.calculateScore().toString(), self.stream_score())
+
+        # Half assigned items do not count, as for_each skips them
+        item = self.problem.planning_items[0]
+        self.calculator.beforeVariableChanged(item, 'team_member')
+        item.set_team_member(None)
+        self.calculator.afterVariableChanged(item, 'team_member')
+        self.assertEqual(self.calculator.calculateScore().toString(), self.stream_score())
+
+        for item in self.problem.planning_items:
+            self.change(item, None, None)
+        self.assertEqual(self.calculator.calculateScore().toString(), '0hard/0soft')
+        # Nothing left behind in the counters
+        self.assertEqual(set(self.calculator.occupancy.values()), {0})
+        self.assertTrue(all(len(epics) == 0 for epics in self.calculator.member_epics.values()))
+
+    def test_added_and_removed_items(self):
+        self.calculator.resetWorkingSolution(self.solution)
+        (item, work_day, team_member), = self.rows_to_moves(BROKEN['Start date fail'][0])
+        item.set_work_day(work_day)
+        item.set_team_member(team_member)
+        self.calculator.beforeEntityAdded(item)
+        self.calculator.afterEntityAdded(item)
+        self.assertEqual(self.calculator.calculateScore().toString(), '-1hard/0soft')
+        self.calculator.beforeEntityRemoved(item)
+        self.calculator.afterEntityRemoved(item)
+        self.assertEqual(self.calculator.calculateScore().toString(), '0hard/0soft')
+
+    def test_incremental_solve_scores_as_the_streams(self):
+        from team_planning_solver import PlanningProblem
+        problem = PlanningProblem()
+        # FULL_ASSERT checks every step against planning_constraints
+        problem.load_from_content(dict(PROBLEM, solver={
+            'scoreCalculation': 'incremental-assert',
+            'environmentMode': 'FULL_ASSERT',
+            'termination': {'bestScoreLimit': '0hard/0soft', 'spentLimit': 30}
+        }))
+        solution = problem.solve_problem()
+        self.assertEqual(solution.score.toString(), problem.score_manager().updateScore(solution).toString())
+        self.assertEqual(solution.score.toString(), '0hard/0soft')
+
+
+if __name__ == '__main__':
+    unittest.main()
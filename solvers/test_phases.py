@@ -0,0 +1,56 @@
+"""
+Phase settings of phases.py: presets, command line overrides and the names
+checked before they reach OptaPlanner. Needs optapy, no JVM is started.
+
+Usage: python -m unittest test_phases
+"""
+import argparse
+import importlib.util
+import unittest
+
+
+def arguments(*args):
+    from phases import add_phase_arguments
+    parser = argparse.ArgumentParser()
+    add_phase_arguments(parser)
+    return parser.parse_args(list(args))
+
+
+@unittest.skipUnless(importlib.util.find_spec('optapy') is not None, 'optapy is not installed')
+class PhaseSettingsTest(unittest.TestCase):
+
+    def test_command_line_overrides_the_problem(self):
+        from phases import phase_settings
+        settings = phase_settings(arguments('--local-search', 'TABU_SEARCH', '--move-selectors', 'change,pillarSwap'),
+                                  {'localSearch': 'LATE_ACCEPTANCE', 'lateAcceptanceSize': 100})
+        self.assertEqual(settings, {'localSearch': 'TABU_SEARCH', 'lateAcceptanceSize': 100,
+                                    'moveSelectors': ['change', 'pillarSwap']})
+
+    def test_preset_sizes_are_dropped_for_another_local_search(self):
+        from phases import solver_settings_with_preset
+        settings = solver_settings_with_preset(arguments('--preset', 'fast-feasible', '--local-search', 'TABU_SEARCH'), {})
+        self.assertEqual(settings['phases'], {'constructionHeuristic': 'eligible-first-fit',
+                                              'localSearch': 'LATE_ACCEPTANCE', 'moveSelectors': ['change', 'swap']})
+
+    def test_unknown_names(self):
+        from phases import phase_settings, solver_settings_with_preset
+        cases = [
+            ({'constructionHeuristic': 'FIRST_FITT'}, 'Unknown construction heuristic FIRST_FITT, expected one of'),
+            ({'localSearch': 'tabu_search'}, 'Unknown local search type tabu_search, expected one of'),
+            # Needs a difficulty comparator
+            ({'constructionHeuristic': 'FIRST_FIT_DECREASING'}, 'Unknown construction heuristic FIRST_FIT_DECREASING'),
+            ({'localSearch': 'SIMULATED_ANNEALING'}, 'needs a simulatedAnnealingStartingTemperature'),
+            ({'moveSelectors': ['change', 'pilarSwap']}, 'Unknown move selector pilarSwap, expected one of'),
+            ({'moveSelectors': 'change'}, 'moveSelectors must be a list')
+        ]
+        for settings, message in cases:
+            with self.subTest(settings=settings), self.assertRaisesRegex(ValueError, message):
+                phase_settings(None, settings)
+        with self.assertRaisesRegex(ValueError, 'Unknown move selector kempe'):
+            phase_settings(arguments('--move-selectors', 'change,kempe'), {})
+        with self.assertRaisesRegex(ValueError, 'Unknown local search type GREAT'):
+            solver_settings_with_preset(arguments('--local-search', 'GREAT'), {'preset': 'best-quality'})
+
+
+if __name__ == '__main__':
+    unittest.main()
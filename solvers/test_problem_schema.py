@@ -0,0 +1,148 @@
+"""
+Migration of unversioned problems, structure errors and capacity cross-checks
+of problem_schema.py.
+
+Usage: python -m unittest test_problem_schema
+"""
+import copy
+import unittest
+
+from problem_schema import SCHEMA_VERSION, ProblemError, migrate, check_problem
+
+
+# Monday 2023-05-01 to Friday 2023-05-05: Alice can do 4 days, Bob and Carol 5
+PROBLEM = {
+    'version': 1,
+    'title': 'Schema fixture',
+    'workDayRange': {'begin': '2023-05-01', 'end': '2023-05-05', 'teamDaysOff': []},
+    'teamMembers': [
+        {'name': 'Alice', 'profile': 'DEV', 'product': 'P1', 'daysOff': ['2023-05-03']},
+        {'name': 'Bob', 'profile': 'QA', 'product': '*', 'daysOff': []},
+        {'name': 'Carol', 'profile': 'DEV', 'product': '*', 'daysOff': []}
+    ],
+    'epics': [
+        {'name': 'E1', 'product': 'P1', 'startDate': '2023-05-02', 'deadLine': '2023-05-04', 'workloads': {'DEV': 2}},
+        {'name': 'E2', 'product': 'P2', 'workloads': {'DEV': 1, 'QA': 1}}
+    ]
+}
+
+
+def problem(**changes):
+    """PROBLEM with changes given as path=value, e.g. epics__0__workloads={'DEV': 6}"""
+    content = copy.deepcopy(PROBLEM)
+    for path, value in changes.items():
+        keys = [int(key) if key.isdigit() else key for key in path.split('__')]
+        parent = content
+        for key in keys[:-1]:
+            parent = parent[key]
+        if value is None:
+            del parent[keys[-1]]
+        else:
+            parent[keys[-1]] = value
+    return content
+
+
+class MigrateTest(unittest.TestCase):
+
+    def test_unversioned_problem_gets_the_defaults(self):
+        content = problem(version=None, title=None, teamMembers__1__daysOff=None, workDayRange__teamDaysOff=None)
+        migrated, changes = migrate(content, default_title='Defaulted')
+        self.assertEqual(list(migrated.keys())[0], 'version')
+        self.assertEqual(migrated['version'], SCHEMA_VERSION)
+        self.assertEqual(migrated['title'], 'Defaulted')
+        self.assertEqual(migrated['teamMembers'][1]['daysOff'], [])
+        self.assertEqual(migrated['workDayRange']['teamDaysOff'], [])
+        self.assertEqual(changes, ['title: set to Defaulted', 'teamMembers[1].daysOff: set to []',
+                                   'workDayRange.teamDaysOff: set to []', f"version: set to {SCHEMA_VERSION}"])
+        # The given content is left as it was
+        self.assertNotIn('version', content)
+        self.assertNotIn('daysOff', content['teamMembers'][1])
+        check_problem(migrated)
+
+    def test_current_version_is_unchanged(self):
+        content = problem()
+        migrated, changes = migrate(content)
+        self.assertIs(migrated, content)
+        self.assertEqual(changes, [])
+
+    def test_unsupported_versions(self):
+        for version in [SCHEMA_VERSION + 1, '1']:
+            with self.subTest(version=version), self.assertRaises(ProblemError):
+                migrate(problem(version=version))
+        with self.assertRaises(ProblemError):
+            migrate([PROBLEM])
+
+
+class StructureTest(unittest.TestCase):
+
+    def errors(self, content, capacity_checks=True):
+        with self.assertRaises(ProblemError) as context:
+            check_problem(content, capacity_checks)
+        return context.exception.errors
+
+    def test_fixture_is_valid(self):
+        check_problem(problem())
+
+    def test_unknown_keys_suggest_the_known_ones(self):
+        content = problem(teamMembers__0__daysOff=None, epics__0__deadLine=None)
+        content['teamMembers'][0]['dayOff'] = ['2023-05-03']
+        content['epics'][0]['deadline'] = '2023-05-04'
+        content['solver'] = {'termination': {}, 'enviromentMode': 'FULL_ASSERT'}
+        self.assertEqual(self.errors(content), [
+            'solver.enviromentMode: unknown key, did you mean environmentMode?',
+            'teamMembers[0].daysOff: missing',
+            'teamMembers[0].dayOff: unknown key, did you mean daysOff?',
+            'epics[0].deadline: unknown key, did you mean deadLine?'
+        ])
+
+    def test_days_of_work_must_be_finite_and_positive(self):
+        for value in [float('inf'), float('nan'), -1, True, '1']:
+            with self.subTest(value=value):
+                errors = self.errors(problem(teamMembers__0__capacity=value, epics__1__workloads={'DEV': value}))
+                self.assertEqual(len(errors), 2)
+                self.assertTrue(errors[0].startswith('teamMembers[0].capacity: expected a positive number of days'))
+                self.assertTrue(errors[1].startswith('epics[1].workloads.DEV: expected a positive number of days'))
+
+    def test_too_fine_fractions(self):
+        self.assertEqual(self.errors(problem(epics__1__workloads={'DEV': 0.01})),
+                         ['problem: capacities and workloads split a day of work into 100 items, at most 10 are supported'])
+
+
+class CapacityTest(unittest.TestCase):
+
+    def errors(self, content):
+        with self.assertRaises(ProblemError) as context:
+            check_problem(content)
+        return context.exception.errors
+
+    def test_workload_without_a_profile(self):
+        self.assertEqual(self.errors(problem(epics__1__workloads={'Qa': 1})),
+                         ['epics[1].workloads.Qa: no team member has profile Qa, did you mean QA?'])
+
+    def test_workload_without_a_member_on_the_product(self):
+        self.assertEqual(self.errors(problem(teamMembers__2__product='P1')),
+                         ['epics[1].workloads.DEV: no DEV team member works on product P2'])
+
+    def test_window_beyond_the_capacity(self):
+        # Alice has 2 days from 2023-05-02 to 2023-05-04 and Carol 3
+        self.assertEqual(self.errors(problem(epics__0__workloads={'DEV': 6})),
+                         ['epics[0]: 6 DEV days needed from 2023-05-02 and before 2023-05-04, '
+                          'eligible members only have 5'])
+
+    def test_dead_line_beyond_the_capacity(self):
+        # Alice and Carol have 2 days each up to 2023-05-02
+        self.assertEqual(self.errors(problem(epics__0__startDate=None, epics__0__deadLine='2023-05-02',
+                                             epics__0__workloads={'DEV': 4.5})),
+                         ['epics[0]: 4.5 DEV days needed before 2023-05-02, eligible members only have 4'])
+
+    def test_demand_beyond_the_capacity(self):
+        self.assertEqual(self.errors(problem(epics__1__workloads={'DEV': 1, 'QA': 6})),
+                         ['epics: 6 QA days needed on P2, eligible members only have 5',
+                          'epics: 6 QA days needed, QA members only have 5'])
+
+    def test_capacity_checks_can_be_skipped(self):
+        check_problem(problem(epics__0__workloads={'DEV': 6}), capacity_checks=False)
+
+
+if __name__ == '__main__':
+    unittest.main()
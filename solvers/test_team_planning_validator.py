@@ -0,0 +1,152 @@
+"""
+Scores small hand-checked plans with the validator, one broken constraint at a
+time, and against the solver's planning_constraints when optapy is installed.
+
+Usage: python -m unittest test_team_planning_validator
+"""
+import importlib.util
+import unittest
+from collections import deque
+from datetime import date
+
+from problem_schema import check_problem
+from team_planning_validator import ProblemArrays, Assignment, validate
+
+
+# Monday 2023-05-01 to Friday 2023-05-05
+PROBLEM = {
+    'version': 1,
+    'title': 'Validator fixture',
+    'workDayRange': {'begin': '2023-05-01', 'end': '2023-05-05', 'teamDaysOff': []},
+    'teamMembers': [
+        {'name': 'Alice', 'profile': 'DEV', 'product': 'P1', 'daysOff': ['2023-05-03']},
+        {'name': 'Bob', 'profile': 'QA', 'product': '*', 'daysOff': []},
+        {'name': 'Carol', 'profile': 'DEV', 'product': '*', 'daysOff': []}
+    ],
+    'epics': [
+        {'name': 'E1', 'product': 'P1', 'priority': 1, 'startDate': '2023-05-02', 'deadLine': '2023-05-04',
+         'workloads': {'DEV': 2}},
+        {'name': 'E2', 'product': 'P2', 'priority': 2, 'workloads': {'DEV': 1, 'QA': 1}}
+    ]
+}
+
+
+def row(day, member, epic, profile):
+    product = next(epic_def['product'] for epic_def in PROBLEM['epics'] if epic_def['name'] == epic)
+    return {'date': day, 'product': product, 'epicName': epic, 'profile': profile, 'teamMember': member}
+
+
+# Every item assigned without breaking anything
+FEASIBLE = [
+    row('2023-05-02', 'Alice', 'E1', 'DEV'),
+    row('2023-05-04', 'Alice', 'E1', 'DEV'),
+    row('2023-05-01', 'Carol', 'E2', 'DEV'),
+    row('2023-05-01', 'Bob', 'E2', 'QA')
+]
+
+# Rows breaking one constraint each, with the penalty the validator must find
+BROKEN = {
+    # Two items on a one item day
+    'Team member issue: Capacity': ([row('2023-05-02', 'Alice', 'E1', 'DEV'), row('2023-05-02', 'Alice', 'E1', 'DEV')], 1),
+    # Alice only works on P1
+    'Team member issue: Product': ([row('2023-05-01', 'Alice', 'E2', 'DEV')], 1),
+    # Carol is no QA
+    'Team member issue: Profile': ([row('2023-05-01', 'Carol', 'E2', 'QA')], 1),
+    'Team member issue: Day Off': ([row('2023-05-03', 'Alice', 'E1', 'DEV')], 1),
+    'Start date fail': ([row('2023-05-01', 'Alice', 'E1', 'DEV')], 1),
+    'Dead line fail': ([row('2023-05-05', 'Alice', 'E1', 'DEV'), row('2023-05-04', 'Alice', 'E1', 'DEV')], 1),
+    # Two epics for Carol, soft
+    'Team member issue: Focus': ([row('2023-05-02', 'Carol', 'E1', 'DEV'), row('2023-05-03', 'Carol', 'E2', 'DEV')], 1)
+}
+
+
+def solver_score(rows):
+    """Score of planning_constraints for the rows, the n-th row of an epic/profile going to its n-th item"""
+    # Imported here, it starts the JVM
+    from team_planning_solver import PlanningProblem, TeamPlanning
+
+    problem = PlanningProblem()
+    problem.load_from_content(PROBLEM)
+    work_days = {work_day.date.isoformat(): work_day for work_day in problem.work_days}
+    team_members = {team_member.name: team_member for team_member in problem.team_members}
+    items = {}
+    for item in problem.planning_items:
+        items.setdefault((item.epic, item.profile), deque()).append(item)
+    for assignment in rows:
+        item = items[(assignment['epicName'], assignment['profile'])].popleft()
+        item.set_work_day(work_days[assignment['date']])
+        item.set_team_member(team_members[assignment['teamMember']])
+    score = problem.score_manager().updateScore(TeamPlanning(problem.work_days, problem.team_members,
+                                                             problem.planning_items))
+    return score.getHardScore(), score.getSoftScore()
+
+
+class ValidatorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.problem = ProblemArrays.from_content(PROBLEM)
+
+    def report(self, rows):
+        return validate(self.problem, Assignment.from_rows(self.problem, rows))
+
+    def test_fixture_is_a_valid_problem(self):
+        check_problem(PROBLEM)
+        self.assertEqual([date.fromordinal(ordinal).isoformat() for ordinal in self.problem.work_days.tolist()],
+                         ['2023-05-01', '2023-05-02', '2023-05-03', '2023-05-04', '2023-05-05'])
+
+    def test_feasible_plan_has_no_penalty(self):
+        report = self.report(FEASIBLE)
+        self.assertEqual(report['score'], '0hard/0soft')
+        self.assertTrue(report['feasible'])
+        self.assertEqual(report['penalties']['Epic priority'], 1 + 1 + 2 + 2)
+        self.assertEqual(report['kpis']['assignedItems'], 4)
+
+    def test_every_constraint_counts_its_own_penalty(self):
+        for constraint, (rows, penalty) in BROKEN.items():
+            with self.subTest(constraint=constraint):
+                report = self.report(rows)
+                self.assertEqual(report['penalties'][constraint], penalty)
+                # And nothing else
+                self.assertEqual({name: value for name, value in report['penalties'].items()
+                                  if name not in (constraint, 'Epic priority') and value != 0}, {})
+                if constraint == 'Team member issue: Focus':
+                    self.assertEqual((report['hard'], report['soft']), (0, -penalty))
+                else:
+                    self.assertEqual((report['hard'], report['soft']), (-penalty, 0))
+                    self.assertFalse(report['feasible'])
+
+    def test_penalties_add_up(self):
+        # More rows than items, the validator does not need them to match
+        report = self.report([assignment for rows, penalty in BROKEN.values() for assignment in rows])
+        # Alice has two items on 2023-05-01 and on 2023-05-02, Alice and Carol two epics each
+        self.assertEqual(report['penalties']['Team member issue: Capacity'], 2)
+        self.assertEqual(report['penalties']['Team member issue: Focus'], 2)
+        self.assertEqual(report['score'], '-7hard/-2soft')
+
+    def test_priority_is_soft_only_when_included(self):
+        report = validate(self.problem, Assignment.from_rows(self.problem, FEASIBLE), include_priority=True)
+        self.assertEqual(report['soft'], -6)
+
+    def test_unknown_member_is_an_error(self):
+        with self.assertRaises(ValueError):
+            self.report([row('2023-05-01', 'Dave', 'E2', 'DEV')])
+
+    def test_weekend_is_no_work_day(self):
+        with self.assertRaises(ValueError):
+            self.report([row('2023-05-06', 'Carol', 'E2', 'DEV')])
+
+
+@unittest.skipUnless(importlib.util.find_spec('optapy') is not None, 'optapy is not installed')
+class SolverScoreTest(unittest.TestCase):
+
+    def test_validator_scores_as_the_solver(self):
+        problem = ProblemArrays.from_content(PROBLEM)
+        plans = dict({constraint: rows for constraint, (rows, penalty) in BROKEN.items()}, feasible=FEASIBLE)
+        for name, rows in plans.items():
+            with self.subTest(plan=name):
+                report = validate(problem, Assignment.from_rows(problem, rows))
+                self.assertEqual(solver_score(rows), (report['hard'], report['soft']))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+"""
+Termination settings and the reasons TerminationReport gives from what a
+solver scope recorded. Solver and scores are stand-ins, no JVM is started.
+
+Usage: python -m unittest test_termination
+"""
+import unittest
+
+from termination import termination_settings, TerminationReport
+
+
+class Score:
+
+    def __init__(self, hard, soft):
+        self.hard = hard
+        self.soft = soft
+
+    def getHardScore(self):
+        return self.hard
+
+    def getSoftScore(self):
+        return self.soft
+
+
+class SolverScope:
+
+    def __init__(self, spent_millis, best_solution_millis, best_score):
+        self.spent_millis = spent_millis
+        self.best_solution_millis = best_solution_millis
+        self.best_score = best_score
+
+    def getTimeMillisSpent(self):
+        return self.spent_millis
+
+    def getBestSolutionTimeMillisSpent(self):
+        return self.best_solution_millis
+
+    def getBestScore(self):
+        return self.best_score
+
+
+class Solver:
+
+    def __init__(self, solver_scope, terminated_early=False):
+        self.solver_scope = solver_scope
+        self.terminated_early = terminated_early
+
+    def getSolverScope(self):
+        return self.solver_scope
+
+    def isTerminateEarly(self):
+        return self.terminated_early
+
+
+def reasons(settings, spent_millis, best_solution_millis, best_score, terminated_early=False):
+    report = TerminationReport(settings).listen(
+        Solver(SolverScope(spent_millis, best_solution_millis, best_score), terminated_early))
+    report.start()
+    report.stop()
+    return report.reasons(best_score)
+
+
+class TerminationSettingsTest(unittest.TestCase):
+
+    def test_default_spent_limit(self):
+        self.assertEqual(termination_settings(None, {}, 5), {'spentLimit': 5})
+
+    def test_step_count_limit_keeps_the_default_spent_limit(self):
+        self.assertEqual(termination_settings(None, {'stepCountLimit': 100}, 5), {'stepCountLimit': 100, 'spentLimit': 5})
+        self.assertEqual(termination_settings(None, {'bestScoreLimit': '0hard/*soft'}, 5), {'bestScoreLimit': '0hard/*soft'})
+
+    def test_invalid_best_score_limit(self):
+        with self.assertRaises(ValueError):
+            termination_settings(None, {'bestScoreLimit': '0hard'}, 5)
+
+
+class TerminationReportTest(unittest.TestCase):
+
+    def test_spent_limit(self):
+        self.assertEqual(reasons({'spentLimit': 5}, 5000, 1000, Score(-1, 0)), ['spent limit of 5s reached'])
+
+    def test_unimproved_spent_limit(self):
+        self.assertEqual(reasons({'spentLimit': 5, 'unimprovedSpentLimit': 2}, 3000, 1000, Score(-1, 0)),
+                         ['no improvement for 2s'])
+
+    def test_best_score_limit(self):
+        self.assertEqual(reasons({'bestScoreLimit': '0hard/*soft', 'spentLimit': 5}, 800, 800, Score(0, -3)),
+                         ['best score limit 0hard/*soft reached'])
+        self.assertEqual(reasons({'bestScoreLimit': '0hard/-2soft', 'stepCountLimit': 10}, 800, 800, Score(0, -3)),
+                         ['step count limit of 10 reached'])
+
+    def test_and_composition_needs_every_limit(self):
+        settings = {'bestScoreLimit': '0hard/*soft', 'spentLimit': 5, 'compositionStyle': 'AND', 'stepCountLimit': 10}
+        # The best score is reached before the spent limit: the local search ended on its step count
+        self.assertEqual(reasons(settings, 2000, 1000, Score(0, 0)), ['step count limit of 10 reached'])
+        self.assertEqual(reasons(settings, 5000, 1000, Score(0, 0)),
+                         ['best score limit 0hard/*soft reached', 'spent limit of 5s reached'])
+
+    def test_terminated_early(self):
+        self.assertEqual(reasons({'spentLimit': 5}, 1000, 500, Score(-1, 0), terminated_early=True), ['terminated early'])
+
+    def test_phases_ended(self):
+        self.assertEqual(reasons({'spentLimit': 5}, 1000, 500, Score(0, 0)), ['all solver phases ended'])
+
+
+if __name__ == '__main__':
+    unittest.main()